@@ -0,0 +1 @@
+"""指数对比分析工具的公共数据与计算模块，供各页面共享"""
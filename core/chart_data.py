@@ -0,0 +1,84 @@
+"""时间序列图表数据降采样
+
+长区间的日频序列点数远超屏幕像素，全部传给浏览器会让图表体积过大、悬停卡顿。
+这里用LTTB（Largest-Triangle-Three-Buckets）算法把每条序列降到屏幕分辨率附近的点数，
+保留峰谷等形状特征；总点数仍然较多时改用WebGL渲染。
+"""
+import numpy as np
+import pandas as pd
+
+# 每条序列保留的最大点数，约为图表像素宽度的一半，LTTB在此点数下折线形状与原序列基本一致
+MAX_POINTS = 500
+# 图表总点数超过该值时使用WebGL渲染
+WEBGL_THRESHOLD = 2000
+
+
+def lttb_indices(x, y, n_out):
+    """
+    LTTB降采样，返回保留点的位置。
+
+    参数:
+    x, y (np.ndarray): 横纵坐标，x需单调递增且不含缺失值
+    n_out (int): 输出点数，不小于3
+
+    返回:
+    np.ndarray: 保留点在原序列中的位置，包含首尾两点
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # 首尾两点固定保留，中间的点平均分到n_out - 2个桶中
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # 下一个桶的平均点作为三角形的第三个顶点
+        next_start, next_end = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        # 选取与上一个保留点、下一个桶平均点组成三角形面积最大的点
+        area = np.abs((x[previous] - avg_x) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (avg_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        selected[i + 1] = previous
+    return selected
+
+
+def downsample_series(series, max_points=MAX_POINTS):
+    """对以日期为索引的序列做LTTB降采样，缺失值先剔除"""
+    series = series.dropna()
+    if len(series) <= max_points:
+        return series
+    x = pd.DatetimeIndex(series.index).asi8.astype(float)
+    return series.iloc[lttb_indices(x, series.to_numpy(dtype=float), max_points)]
+
+
+def downsample_long(data, x, y, group, max_points=MAX_POINTS):
+    """对长格式数据按分组分别降采样，返回保留的行"""
+    data = data.dropna(subset=[y]).sort_values([group, x])
+    keep = []
+    for __, part in data.groupby(group, sort=False):
+        if len(part) <= max_points:
+            keep.append(part.index.to_numpy())
+            continue
+        positions = lttb_indices(pd.DatetimeIndex(part[x]).asi8.astype(float), part[y].to_numpy(dtype=float), max_points)
+        keep.append(part.index.to_numpy()[positions])
+    if not keep:
+        return data
+    return data.loc[np.concatenate(keep)]
+
+
+def downsample_wide(data, value_name, group_name, max_points=MAX_POINTS):
+    """将以日期为索引、每列一条序列的宽格式数据转为长格式，并按列分别降采样"""
+    long_data = data.rename_axis('date').reset_index().melt(id_vars='date', var_name=group_name, value_name=value_name)
+    long_data['date'] = pd.to_datetime(long_data['date'])
+    return downsample_long(long_data, 'date', value_name, group_name, max_points)
+
+
+def use_webgl(n_points):
+    """总点数超过阈值时使用WebGL渲染"""
+    return n_points > WEBGL_THRESHOLD
@@ -0,0 +1,49 @@
+"""指数成分股表格的分组统计
+
+成分股数据为所有指数成分股纵向拼接的长表格，每行为一个(指数代码, 股票代码)。
+这里的统计只依赖该表格本身，一次分组得到所有指数的结果，页面的loader负责获取数据和缓存。
+"""
+
+
+def top_constituents(component_data, indexes, top_n):
+    """
+    按权重取每个指数的前N大成分股。
+
+    参数:
+    component_data (pd.DataFrame): 含指数代码、股票代码和权重列的成分股数据
+    indexes (list): 指数代码，决定返回结果的顺序
+    top_n (int): 每个指数保留的成分股数量，权重相同时保持原有顺序
+
+    返回:
+    tuple: (前N大成分股权重合计pd.Series, {指数代码: 按权重降序的股票代码列表}, 去重后的全部股票代码列表)
+    """
+    top_components = component_data.sort_values('权重', ascending=False, kind='stable') \
+        .groupby('指数代码', sort=False, observed=True).head(top_n)
+    # 前N大成分股集中度，没有成分股的指数为NaN
+    concentration = top_components.groupby('指数代码', observed=True)['权重'].sum().reindex(indexes)
+    top_codes = {index: top_components.loc[top_components['指数代码'] == index, '股票代码'].tolist() for index in indexes}
+    all_codes = list(dict.fromkeys(top_components['股票代码']))
+    return concentration, top_codes, all_codes
+
+
+def industry_cube(component_data, indexes, industry_columns):
+    """
+    按 指数 × 行业分类标准 × 行业 统计成分股数量和权重。
+
+    参数:
+    component_data (pd.DataFrame): 含指数代码、权重和各行业分类列的成分股数据
+    indexes (list): 指数代码，决定返回结果的列顺序
+    industry_columns (list): 行业分类列名，如申万一级行业、中信一级行业
+
+    返回:
+    pd.DataFrame: 以(分类标准, 行业)为索引，列为(统计口径, 指数代码)，统计口径为"数量"和"权重"，未涉及的行业为0
+    """
+    # 成分股数据中已有万德返回的"行业"列，长格式中使用"所属行业"避免重名
+    long_data = component_data.melt(id_vars=['指数代码', '权重'], value_vars=list(industry_columns),
+                                    var_name='分类标准', value_name='所属行业')
+    # 数量按行计数，未披露权重(NaN)的成分股同样计入，权重求和时NaN按0处理
+    cube = long_data.groupby(['分类标准', '所属行业', '指数代码'], observed=True)['权重'] \
+        .agg(数量='size', 权重='sum').unstack('指数代码', fill_value=0)
+    cube.columns.names = [None, '指数代码']
+    cube.index.names = ['分类标准', '行业']
+    return cube.reindex(columns=indexes, level=1)
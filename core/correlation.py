@@ -0,0 +1,86 @@
+"""基于对数收益率的相关系数计算
+
+各序列先对齐到同一交易日历，再计算日对数收益率，缺失日期不向前填充，
+每对序列只使用两者同时有收益率的交易日（pairwise-complete）。
+收益率以float32存储，相关系数由掩码矩阵乘法一次得到，不依赖DataFrame.corr逐对计算。
+资产一侧的收益率块和资产之间的相关系数可以单独缓存，切换指数时只需重新计算指数所在的行。
+"""
+import numpy as np
+import pandas as pd
+
+
+def aligned_log_returns(close, calendar):
+    """将收盘价对齐到交易日历后计算日对数收益率，前一交易日或当日缺失时为NaN"""
+    close = close.sort_index()
+    close.index = pd.to_datetime(close.index)
+    close = close.reindex(pd.DatetimeIndex(calendar))
+    return np.log(close.where(close > 0)).diff().iloc[1:]
+
+
+class ReturnBlock:
+    """一组证券在同一交易日历上的收益率，保存计算相关系数所需的去均值收益率、平方和有效掩码"""
+
+    def __init__(self, returns, window=None):
+        if window:
+            returns = returns.iloc[-window:]
+        self.index = returns.index
+        self.columns = list(returns.columns)
+        values = returns.to_numpy(dtype=np.float32)
+        self.valid = (~np.isnan(values)).astype(np.float32)
+        values = np.where(self.valid > 0, values, 0)
+        # 按列去均值，减小矩阵乘法后相减带来的float32精度损失
+        mean = values.sum(axis=0) / np.maximum(self.valid.sum(axis=0), 1)
+        self.values = np.where(self.valid > 0, values - mean, 0).astype(np.float32)
+        self.squares = self.values * self.values
+
+
+def cross_correlation(a, b, min_periods=20):
+    """
+    计算两组证券之间的相关系数矩阵，两个ReturnBlock需基于同一交易日历和窗口。
+
+    返回:
+    pd.DataFrame: 行为a中的证券，列为b中的证券，共同有效天数不足min_periods时为NaN
+    """
+    if not a.index.equals(b.index):
+        raise ValueError("两组收益率的交易日历不一致")
+    count = a.valid.T @ b.valid
+    sum_a = a.values.T @ b.valid
+    sum_b = a.valid.T @ b.values
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = a.values.T @ b.values - sum_a * sum_b / count
+        var_a = a.squares.T @ b.valid - sum_a * sum_a / count
+        var_b = a.valid.T @ b.squares - sum_b * sum_b / count
+        corr = np.clip(cov / np.sqrt(var_a * var_b), -1, 1)
+    corr[count < min_periods] = np.nan
+    return pd.DataFrame(corr.astype(float), index=a.columns, columns=b.columns)
+
+
+def shrink_correlation(corr, intensity):
+    """将相关系数矩阵向单位矩阵收缩，intensity为收缩强度，取值0到1"""
+    identity = np.eye(len(corr))
+    return corr * (1 - intensity) + pd.DataFrame(identity, index=corr.index, columns=corr.columns) * intensity
+
+
+def correlation_matrix(index_block, asset_block, asset_corr=None, shrinkage=0.0):
+    """
+    拼接指数与资产的完整相关系数矩阵。
+
+    参数:
+    index_block, asset_block (ReturnBlock): 指数和资产的收益率块
+    asset_corr (pd.DataFrame): 已缓存的资产之间的相关系数，为None时重新计算
+    shrinkage (float): 向单位矩阵收缩的强度，0为样本相关系数
+
+    返回:
+    pd.DataFrame: 指数在前、资产在后的对称相关系数矩阵
+    """
+    if asset_corr is None:
+        asset_corr = cross_correlation(asset_block, asset_block)
+    index_corr = cross_correlation(index_block, index_block)
+    index_asset_corr = cross_correlation(index_block, asset_block)
+    corr = pd.concat([
+        pd.concat([index_corr, index_asset_corr], axis=1),
+        pd.concat([index_asset_corr.T, asset_corr], axis=1),
+    ])
+    if shrinkage:
+        corr = shrink_correlation(corr, shrinkage)
+    return corr
@@ -0,0 +1,74 @@
+"""回撤区间识别与修复统计
+
+输入为以日期为索引、证券代码为列的收盘价宽表。所有证券的历史最高点、回撤序列和
+回撤区间编号在一次二维数组运算中得到，再按(证券, 区间)分组汇总每段回撤的统计量。
+回撤幅度单位为%，持续时间单位为交易日。
+"""
+import numpy as np
+import pandas as pd
+
+
+def underwater(close):
+    """计算每个交易日相对此前最高收盘价的回撤（%），创新高时为0"""
+    close = close.sort_index().ffill()
+    prices = close.to_numpy(dtype=float)
+    running_max = np.fmax.accumulate(prices, axis=0)
+    return pd.DataFrame((prices / running_max - 1) * 100, index=close.index, columns=close.columns)
+
+
+def drawdown_episodes(close, threshold=5.0):
+    """
+    识别每个证券所有最大回撤超过阈值的回撤区间。
+
+    一段回撤从前一个最高点开始，到收盘价重新回到该最高点结束，期间的最低点为谷底。
+    截至最后一个交易日仍未修复的回撤，修复日期和修复天数为空。
+
+    参数:
+    close (pd.DataFrame): 收盘价宽表
+    threshold (float): 回撤幅度阈值（%），只保留最大回撤不小于该值的区间
+
+    返回:
+    pd.DataFrame: 每行为一段回撤，按证券代码和峰值日期排序
+    """
+    columns = ['代码', '峰值日期', '谷底日期', '修复日期', '回撤幅度(%)', '下跌天数', '修复天数', '水下天数']
+    drawdown = underwater(close)
+    dates = drawdown.index
+    values = drawdown.to_numpy()
+    n_rows = len(values)
+
+    # 处于回撤中的位置，每段连续回撤的第一个位置开始一个新区间，区间编号按列累加
+    under = values < 0
+    starts = under & ~np.vstack([np.zeros((1, under.shape[1]), dtype=bool), under[:-1]])
+    episode_ids = np.cumsum(starts, axis=0)
+
+    rows, cols = np.nonzero(under)
+    if len(rows) == 0:
+        return pd.DataFrame(columns=columns)
+    long = pd.DataFrame({
+        'col': cols,
+        'episode': episode_ids[rows, cols],
+        'row': rows,
+        'drawdown': values[rows, cols],
+    })
+    grouped = long.groupby(['col', 'episode'], sort=False)
+    summary = grouped.agg(first_row=('row', 'min'), last_row=('row', 'max'), depth=('drawdown', 'min'))
+    summary['trough_row'] = long.loc[grouped['drawdown'].idxmin(), 'row'].to_numpy()
+    summary = summary[summary['depth'] <= -threshold].reset_index()
+
+    # 峰值为回撤开始的前一个交易日，修复日为回撤结束的后一个交易日
+    peak_row = summary['first_row'] - 1
+    recovered = summary['last_row'] < n_rows - 1
+    recovery_row = (summary['last_row'] + 1).where(recovered)
+    end_row = recovery_row.fillna(n_rows - 1)
+
+    episodes = pd.DataFrame({
+        '代码': drawdown.columns[summary['col']],
+        '峰值日期': dates[peak_row],
+        '谷底日期': dates[summary['trough_row']],
+        '修复日期': pd.Series(dates[recovery_row.fillna(0).astype(int)]).where(recovered),
+        '回撤幅度(%)': summary['depth'],
+        '下跌天数': summary['trough_row'] - peak_row,
+        '修复天数': recovery_row - summary['trough_row'],
+        '水下天数': (end_row - peak_row).astype(int),
+    })
+    return episodes.sort_values(['代码', '峰值日期'], ignore_index=True)
@@ -0,0 +1,160 @@
+"""已披露年报数据及一致预期数据存储
+
+以（指数代码, 报告年度）为键永久保存已披露的年报数据。年报披露后基本不再变化，
+只要某年度的各字段都已有数值就不再请求万德；尚未披露（存在空值）的年度每次重新请求。
+一致预期以（指数代码, 预测年度, 交易日）为键保存，历史交易日的预期值不再变化，保存到本地磁盘；
+当天的预期值盘中可能变化，只保留在内存中。
+万德会话串行处理请求，各年度的缺失数据依次请求。
+"""
+import datetime
+import os
+import threading
+
+import pandas as pd
+
+from core.series_store import DEFAULT_DATA_DIR
+
+
+class EarningsStore:
+    """年报数据和一致预期数据各保存在一个Parquet文件中，索引分别为（代码, 报告年度）和（代码, 预测年度, 交易日）"""
+
+    def __init__(self, root):
+        self.path = os.path.join(root, "earnings.parquet")
+        self.forecast_path = os.path.join(root, "forecasts.parquet")
+        self._lock = threading.RLock()
+        self._frame = None
+        self._forecasts = None
+
+    def _load(self):
+        if self._frame is None:
+            if os.path.exists(self.path):
+                self._frame = pd.read_parquet(self.path)
+            else:
+                self._frame = pd.DataFrame(index=pd.MultiIndex.from_tuples([], names=["code", "year"]))
+        return self._frame
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        self._frame.to_parquet(tmp_path)
+        os.replace(tmp_path, self.path)
+
+    def _lookup(self, codes, year, fields):
+        """返回已保存的数据，以代码为索引，未保存的为空值"""
+        keys = pd.MultiIndex.from_arrays([codes, [year] * len(codes)], names=["code", "year"])
+        data = self._load().reindex(index=keys, columns=fields)
+        data.index = pd.Index(codes)
+        return data.astype("float64")
+
+    def get(self, codes, years, fields, fetch):
+        """
+        获取多个代码多个报告年度的年报数据，缺失的年度依次调用fetch补齐。
+
+        参数:
+        codes (list): 指数代码列表
+        years (list): 报告年度列表
+        fields (list): 字段名列表，与fetch返回的列名一致
+        fetch (callable): fetch(codes, year)，返回以代码为索引的DataFrame，失败返回None
+
+        返回:
+        dict: {报告年度: 以代码为索引、fields为列的DataFrame}
+        """
+        codes = list(codes)
+        with self._lock:
+            result = {year: self._lookup(codes, year, fields) for year in years}
+        requests = {}
+        for year, data in result.items():
+            missing = data.index[data.isna().any(axis=1)].tolist()
+            if missing:
+                requests[year] = missing
+        if not requests:
+            return result
+
+        fetched = {year: fetch(missing, year) for year, missing in requests.items()}
+
+        with self._lock:
+            frame = self._load()
+            for year, new_data in fetched.items():
+                if new_data is None:
+                    continue
+                new_data = new_data[fields].astype("float64")
+                result[year].update(new_data)
+                # 只保存各字段均有数值的记录，未披露的年度下次重新请求
+                final = new_data[new_data.notna().all(axis=1)]
+                if final.empty:
+                    continue
+                final.index = pd.MultiIndex.from_arrays([final.index, [year] * len(final)], names=["code", "year"])
+                frame = pd.concat([frame[~frame.index.isin(final.index)], final]) if not frame.empty else final
+            if frame is not self._frame:
+                self._frame = frame.sort_index()
+                self._save()
+        return result
+
+    # ————————————————————————————————一致预期————————————————————————————————
+
+    def _load_forecasts(self):
+        if self._forecasts is None:
+            if os.path.exists(self.forecast_path):
+                self._forecasts = pd.read_parquet(self.forecast_path)
+            else:
+                self._forecasts = pd.DataFrame(index=pd.MultiIndex.from_tuples([], names=["code", "year", "trade_date"]))
+        return self._forecasts
+
+    def _save_forecasts(self):
+        # 当天的预期值盘中可能变化，不写入磁盘
+        frame = self._forecasts
+        frame = frame[frame.index.get_level_values("trade_date") < datetime.date.today().isoformat()]
+        os.makedirs(os.path.dirname(self.forecast_path), exist_ok=True)
+        tmp_path = self.forecast_path + ".tmp"
+        frame.to_parquet(tmp_path)
+        os.replace(tmp_path, self.forecast_path)
+
+    def get_forecast(self, codes, year, trade_date, fields, fetch):
+        """
+        获取多个代码某个预测年度在某个交易日的一致预期，只对未保存的代码调用fetch。
+
+        参数:
+        codes (list): 指数代码列表
+        year (int): 预测年度
+        trade_date (str): 交易日，格式YYYY-MM-DD
+        fields (list): 字段名列表，与fetch返回的列名一致
+        fetch (callable): fetch(missing_codes)，返回以代码为索引的DataFrame，失败返回None
+
+        返回:
+        pd.DataFrame: 以代码为索引、fields为列的数据，万德返回的空值也会保存
+        """
+        codes = list(codes)
+        with self._lock:
+            frame = self._load_forecasts()
+            keys = pd.MultiIndex.from_arrays([codes, [year] * len(codes), [trade_date] * len(codes)],
+                                             names=["code", "year", "trade_date"])
+            missing = [code for code, key in zip(codes, keys) if key not in frame.index]
+        if missing:
+            new_data = fetch(missing)
+            if new_data is not None:
+                new_data = new_data.reindex(index=missing, columns=fields).astype("float64")
+                new_data.index = pd.MultiIndex.from_arrays(
+                    [new_data.index, [year] * len(missing), [trade_date] * len(missing)],
+                    names=["code", "year", "trade_date"])
+                with self._lock:
+                    frame = self._load_forecasts()
+                    frame = pd.concat([frame[~frame.index.isin(new_data.index)], new_data]) if not frame.empty else new_data
+                    self._forecasts = frame.sort_index()
+                    self._save_forecasts()
+        with self._lock:
+            data = self._load_forecasts().reindex(index=keys, columns=fields)
+        data.index = pd.Index(codes)
+        return data.astype("float64")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_earnings_store():
+    """获取进程内共享的年报数据存储"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = EarningsStore(DEFAULT_DATA_DIR)
+        return _store
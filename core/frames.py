@@ -0,0 +1,39 @@
+"""加载数据时统一DataFrame的列类型
+
+万德返回的数据和个股字段缓存中的数据大多是object列，数值、文本和空值混在一起。
+@st.cache_data每次命中都要逐个对象地反序列化，st.dataframe也要逐个对象地转换为Arrow，
+混合类型的列还会导致Arrow转换失败。这里在loader返回前统一列类型：
+低基数文本列转为category，数值列转为float32，日期列转为datetime64，其余文本列转为Arrow字符串。
+这些列类型在pickle和转换为Arrow时都以整块缓冲区处理，不再逐个对象复制。
+"""
+import pandas as pd
+
+# Arrow字符串列类型，序列化和传给浏览器时无需逐个对象转换
+ARROW_STRING = "string[pyarrow]"
+
+
+def compact_frame(data, categories=(), floats=(), dates=()):
+    """
+    统一DataFrame的列类型，返回新的DataFrame。
+
+    参数:
+    data (pd.DataFrame): 原始数据
+    categories (list): 转为category的低基数文本列，如行业、指数名称
+    floats (list): 转为float32的数值列，已是float64的列也会转为float32
+    dates (list): 转为datetime64的日期列
+
+    返回:
+    pd.DataFrame: 列类型统一后的数据，未列出的纯文本object列转为Arrow字符串，混合类型的列保持不变
+    """
+    data = data.copy()
+    for col in data.columns:
+        series = data[col]
+        if col in categories:
+            data[col] = series.astype("category")
+        elif col in dates:
+            data[col] = pd.to_datetime(series, errors="coerce")
+        elif col in floats or series.dtype == "float64":
+            data[col] = pd.to_numeric(series, errors="coerce").astype("float32")
+        elif series.dtype == "object" and pd.api.types.infer_dtype(series, skipna=True) in ("string", "empty"):
+            data[col] = series.astype(ARROW_STRING)
+    return data
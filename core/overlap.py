@@ -0,0 +1,93 @@
+"""指数成分股重合度计算
+
+将成分股权重整理为 指数 × 股票 的稀疏矩阵，所有指数两两之间的统计量都由稀疏矩阵乘法一次得到，
+指数数量增加到数百个时计算量只随非零元素增长。
+
+权重重合度为两指数共同成分股权重较小值之和。min(a, b)可以写成按权重分层的指示函数之和：
+把同一股票在各指数中的不同权重排序为 0 < t1 < t2 < ...，每一层宽度为 t_j - t_{j-1}，
+权重不低于 t_j 的指数在该层取1，于是 min(a, b) = Σ 宽度 × 1[a≥t_j] × 1[b≥t_j]，
+所有指数对的权重重合度即为 L · diag(宽度) · Lᵀ。
+"""
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+def weight_matrix(component_data, indexes):
+    """
+    构建指数 × 股票的稀疏权重矩阵，每个指数的权重归一化为合计100%。
+
+    返回:
+    tuple: (scipy.sparse.csr_matrix, 股票代码列表)
+    """
+    data = component_data[component_data['指数代码'].isin(indexes)]
+    data = data.groupby(['指数代码', '股票代码'], as_index=False, observed=True)['权重'].sum()
+    data = data[data['权重'] > 0]
+    data['权重'] = data['权重'] / data.groupby('指数代码', observed=True)['权重'].transform('sum') * 100
+
+    rows = pd.Categorical(data['指数代码'], categories=indexes).codes
+    stocks = pd.Categorical(data['股票代码'])
+    matrix = sparse.csr_matrix((data['权重'].to_numpy(dtype=float), (rows, stocks.codes)),
+                               shape=(len(indexes), len(stocks.categories)))
+    return matrix, list(stocks.categories)
+
+
+def holding_matrix(component_data, indexes):
+    """
+    构建指数 × 股票的0/1持有矩阵，未披露权重(NaN)的成分股同样计入，权重为0的不计入。
+
+    返回:
+    tuple: (scipy.sparse.csr_matrix, 股票代码列表)
+    """
+    data = component_data[component_data['指数代码'].isin(indexes) & ~(component_data['权重'] <= 0)]
+    data = data[['指数代码', '股票代码']].drop_duplicates()
+
+    rows = pd.Categorical(data['指数代码'], categories=indexes).codes
+    stocks = pd.Categorical(data['股票代码'])
+    matrix = sparse.csr_matrix((np.ones(len(data)), (rows, stocks.codes)),
+                               shape=(len(indexes), len(stocks.categories)))
+    return matrix, list(stocks.categories)
+
+
+def _layer_matrix(weights):
+    """按股票把权重分层，返回指数 × 层的0/1稀疏矩阵和每层的宽度"""
+    coo = weights.tocoo()
+    holders = pd.DataFrame({'index': coo.row, 'stock': coo.col, 'weight': coo.data})
+
+    # 每只股票在各指数中的不同权重水平，相邻水平之差为层宽
+    levels = holders[['stock', 'weight']].drop_duplicates().sort_values(['stock', 'weight'], ignore_index=True)
+    levels['width'] = levels.groupby('stock')['weight'].diff().fillna(levels['weight'])
+    levels['layer'] = np.arange(len(levels))
+
+    # 指数在权重不超过自身权重的每一层上取1
+    entries = holders.merge(levels, on='stock', suffixes=('', '_level'))
+    entries = entries[entries['weight_level'] <= entries['weight']]
+    layers = sparse.csr_matrix((np.ones(len(entries)), (entries['index'], entries['layer'])),
+                               shape=(weights.shape[0], len(levels)))
+    return layers, levels['width'].to_numpy()
+
+
+def overlap_tables(component_data, indexes):
+    """
+    计算所选指数两两之间的成分股重合情况。
+
+    返回:
+    dict: {"共同成分股数量", "权重重合度(%)", "主动份额(%)"}，每项均为以指数代码为行列的DataFrame，
+    没有任何权重数据的指数，其权重重合度和主动份额为NaN
+    """
+    holdings, __ = holding_matrix(component_data, indexes)
+    count = (holdings @ holdings.T).toarray()
+
+    weights, __ = weight_matrix(component_data, indexes)
+    layers, widths = _layer_matrix(weights)
+    weighted = (layers @ sparse.diags(widths) @ layers.T).toarray()
+    unweighted = np.asarray(weights.sum(axis=1)).ravel() == 0
+    weighted[unweighted, :] = np.nan
+    weighted[:, unweighted] = np.nan
+
+    frame = lambda values: pd.DataFrame(values, index=indexes, columns=indexes)
+    return {
+        "共同成分股数量": frame(count.astype(int)),
+        "权重重合度(%)": frame(weighted),
+        "主动份额(%)": frame(100 - weighted),
+    }
@@ -0,0 +1,142 @@
+"""估值分位数与均值、标准差通道的增量计算
+
+对每条估值序列（如pe_ttm、pb_lf）逐日维护一个有序列表，新一天的估值用二分插入，
+滚动窗口移出的旧值用二分查找删除，当天的分位数即不高于当天估值的样本占比（%）。
+均值和标准差由累计和与平方和得到。计算状态按（字段, 代码, 窗口）保存在内存中，
+序列向后追加新交易日时只处理新增的日期，不重新计算历史。
+序列的最后一天（通常为当天）的估值在收盘前后可能更新，不写入计算状态，每次调用时单独计算。
+"""
+import math
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+
+import pandas as pd
+
+
+class ValuationTracker:
+    """单条估值序列的分位数、均值和标准差，window为None时为扩展窗口"""
+
+    def __init__(self, window=None):
+        self.window = window
+        self.first_date = None
+        self.last_date = None
+        self._sorted = []
+        self._queue = deque()
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._rows = []
+        # 序列最后一天的结果，不计入有序列表和累计和
+        self._pending = None
+
+    def append(self, date, value):
+        """追加一个交易日的估值，缺失值跳过"""
+        self.last_date = date
+        if value is None or math.isnan(value):
+            return
+        insort(self._sorted, value)
+        self._queue.append(value)
+        self._sum += value
+        self._sum_sq += value * value
+        if self.window and len(self._queue) > self.window:
+            old = self._queue.popleft()
+            del self._sorted[bisect_left(self._sorted, old)]
+            self._sum -= old
+            self._sum_sq -= old * old
+
+        self._rows.append(self._row(date, bisect_right(self._sorted, value), len(self._queue),
+                                    self._sum, self._sum_sq))
+
+    def peek(self, date, value):
+        """计算追加一个交易日后当天的结果，不改变计算状态，缺失值返回None"""
+        if value is None or math.isnan(value):
+            return None
+        rank = bisect_right(self._sorted, value) + 1
+        n = len(self._queue) + 1
+        total = self._sum + value
+        total_sq = self._sum_sq + value * value
+        if self.window and n > self.window:
+            old = self._queue[0]
+            rank -= old <= value
+            n -= 1
+            total -= old
+            total_sq -= old * old
+        return self._row(date, rank, n, total, total_sq)
+
+    @staticmethod
+    def _row(date, rank, n, total, total_sq):
+        """由不高于当天估值的样本数、样本数、累计和与平方和得到当天的结果"""
+        mean = total / n
+        std = math.sqrt(max(total_sq - n * mean * mean, 0.0) / (n - 1)) if n > 1 else float("nan")
+        return date, rank / n * 100, mean, std
+
+    def update(self, series):
+        """
+        用完整序列更新状态：起始日变化时重新计算，否则只追加新增的交易日。
+        最后一天的估值可能随当天数据刷新而变化，只由peek计算，下一个交易日出现后才写入状态。
+        """
+        series = series.sort_index()
+        self._pending = None
+        if series.empty:
+            return
+        if self.first_date != series.index[0]:
+            self.__init__(self.window)
+            self.first_date = series.index[0]
+        if self.last_date is not None:
+            series = series.loc[series.index > self.last_date]
+        if series.empty:
+            return
+        for date, value in series.iloc[:-1].items():
+            self.append(date, float(value))
+        self._pending = self.peek(series.index[-1], float(series.iloc[-1]))
+
+    def frame(self):
+        """返回以日期为索引的分位数、均值和标准差"""
+        rows = self._rows if self._pending is None else self._rows + [self._pending]
+        return pd.DataFrame(rows, columns=["日期", "分位数", "均值", "标准差"]).set_index("日期")
+
+
+class PercentileEngine:
+    """在会话之间共享的估值分位数计算状态"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._trackers = {}
+
+    def get(self, data, field, window=None):
+        """
+        计算宽表中每条估值序列的逐日分位数。
+
+        参数:
+        data (pd.DataFrame): 以日期为索引、证券代码为列的估值宽表
+        field (str): 估值字段名，用于区分计算状态
+        window (int): 滚动窗口的交易日数，为None时为扩展窗口
+
+        返回:
+        dict: {代码: pd.DataFrame}，列为分位数、均值和标准差
+        """
+        result = {}
+        with self._lock:
+            for code in data.columns:
+                tracker = self._trackers.setdefault((field, code, window), ValuationTracker(window))
+                series = data[code]
+                # 请求区间早于已计算的最后一天时，从头重新计算
+                if tracker.last_date is not None and series.index.max() < tracker.last_date:
+                    tracker.first_date = None
+                    tracker.last_date = None
+                tracker.update(series)
+                result[code] = tracker.frame()
+        return result
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_percentile_engine():
+    """获取进程内共享的估值分位数计算状态"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = PercentileEngine()
+        return _engine
@@ -0,0 +1,46 @@
+"""页面数据预取调度
+
+表单提交后，将各板块需要的数据加载函数一次性提交到有界线程池并发执行，
+各板块渲染前只等待自己依赖的加载任务，先就绪的板块先显示。
+相同函数和参数的任务只提交一次，多个板块共享同一个任务。
+工作线程不绑定页面的运行上下文：@st.cache_data的缓存是进程级的，无需上下文即可写入，
+而绑定上下文后缓存未命中时显示的加载提示会插入到页面中不确定的位置。
+"""
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# 默认并发线程数
+DEFAULT_MAX_WORKERS = 4
+
+
+class PrefetchScheduler:
+    """按板块管理预取任务的调度器"""
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._tasks = {}
+        self._sections = {}
+
+    def submit(self, section, loader, *args):
+        """为板块提交一个加载任务，相同的加载函数和参数只执行一次"""
+        key = (loader.__name__, repr(args))
+        if key not in self._tasks:
+            self._tasks[key] = self._executor.submit(loader, *args)
+        self._sections.setdefault(section, []).append(self._tasks[key])
+
+    def submit_plan(self, plan):
+        """按 {板块: [(加载函数, 参数元组), ...]} 的预取计划提交所有任务"""
+        for section, loaders in plan.items():
+            for loader, args in loaders:
+                self.submit(section, loader, *args)
+
+    def wait(self, section):
+        """等待板块依赖的任务完成，加载出错时交由板块自身重新调用时报错"""
+        futures = self._sections.get(section, [])
+        if futures:
+            wait(futures)
+
+    def shutdown(self):
+        """取消尚未开始的任务并释放线程池"""
+        for future in self._tasks.values():
+            future.cancel()
+        self._executor.shutdown(wait=False)
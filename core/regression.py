@@ -0,0 +1,87 @@
+"""变量两两之间的一元线性回归
+
+对所有变量对同时做 y = a + b·x 的最小二乘回归，使用闭式解而不是逐对拟合模型：
+每个分组的样本量、一阶矩和全部二阶交叉矩由一次groupby求和得到，
+斜率、截距、R²、t值和p值都由这些矩直接计算，样本量增加到数千只基金时只多一次求和。
+"""
+from itertools import combinations_with_replacement, permutations
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+# 全部样本所在分组的名称
+ALL_GROUP = "全部"
+
+
+def pairwise_ols(data, columns, group_col=None):
+    """
+    对columns中每个有序变量对(x, y)拟合 y = a + b·x。
+
+    参数:
+    data (pd.DataFrame): 输入数据，含有缺失值的行会被剔除
+    columns (list): 参与回归的变量列名
+    group_col (str): 分组列名，除全部样本外还会对每个分组单独回归，为None时只回归全部样本
+
+    返回:
+    pd.DataFrame: 每行为一个(分组, 因变量, 自变量)的回归结果
+    """
+    data = data.dropna(subset=columns)
+    values = data[columns].astype(float)
+    groups = pd.Series(ALL_GROUP, index=data.index)
+
+    # 一次构造全部一阶矩和二阶交叉矩列，再按分组求和
+    moments = {('n', None): pd.Series(1.0, index=data.index)}
+    for col in columns:
+        moments[('sum', col)] = values[col]
+    for a, b in combinations_with_replacement(columns, 2):
+        moments[(a, b)] = values[a] * values[b]
+    moments = pd.DataFrame(moments)
+
+    sums = moments.groupby(groups).sum()
+    if group_col is not None:
+        sums = pd.concat([sums, moments.groupby(data[group_col]).sum()])
+
+    cross = lambda a, b: sums[(a, b) if (a, b) in sums.columns else (b, a)]
+    n = sums[('n', None)]
+    results = []
+    for x, y in permutations(columns, 2):
+        mean_x = sums[('sum', x)] / n
+        mean_y = sums[('sum', y)] / n
+        # 去均值后的离差平方和与离差积和
+        sxx = cross(x, x) - n * mean_x ** 2
+        syy = cross(y, y) - n * mean_y ** 2
+        sxy = cross(x, y) - n * mean_x * mean_y
+        with np.errstate(invalid="ignore", divide="ignore"):
+            slope = sxy / sxx
+            intercept = mean_y - slope * mean_x
+            rsquared = sxy ** 2 / (sxx * syy)
+            dof = n - 2
+            residual_var = (syy - slope * sxy).clip(lower=0) / dof
+            slope_se = np.sqrt(residual_var / sxx)
+            intercept_se = np.sqrt(residual_var * (1 / n + mean_x ** 2 / sxx))
+            t_slope = slope / slope_se
+            t_intercept = intercept / intercept_se
+        results.append(pd.DataFrame({
+            '分组': sums.index,
+            '因变量': y,
+            '自变量': x,
+            '样本数': n.astype(int).to_numpy(),
+            '截距': intercept.to_numpy(),
+            '斜率': slope.to_numpy(),
+            'R²': rsquared.to_numpy(),
+            't值': t_slope.to_numpy(),
+            'p值': _p_value(t_slope, dof),
+            '截距p值': _p_value(t_intercept, dof),
+        }))
+    return pd.concat(results, ignore_index=True)
+
+
+def _p_value(t_values, dof):
+    """双侧t检验p值，自由度不足时为NaN"""
+    t_values = np.asarray(t_values, dtype=float)
+    dof = np.asarray(dof, dtype=float)
+    p_values = np.full(t_values.shape, np.nan)
+    valid = (dof > 0) & ~np.isnan(t_values)
+    p_values[valid] = 2 * stats.t.sf(np.abs(t_values[valid]), dof[valid])
+    return p_values
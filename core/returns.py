@@ -0,0 +1,62 @@
+"""基于日频收盘价的收益率计算
+
+输入均为以日期为索引、证券代码为列的收盘价宽表，所有证券一次向量化计算，收益率单位为%。
+区间收益率的基期为区间起始日之前最后一个交易日的收盘价，与万德pct_chg_per口径一致。
+"""
+import pandas as pd
+
+
+def period_returns(close, freq):
+    """
+    按日历周期计算收益率，每期以期末收盘价相对上一期期末收盘价计算。
+
+    参数:
+    close (pd.DataFrame): 收盘价宽表
+    freq (str): pandas重采样频率，如"YE"为年度、"ME"为月度
+
+    返回:
+    pd.DataFrame: 以期末日期为索引、证券代码为列的收益率，第一期没有基期，已剔除
+    """
+    close = close.sort_index()
+    period_close = close.resample(freq).last()
+    # 期内有交易日时才计算当期收益，停牌期间不向前填充
+    has_data = close.notna().resample(freq).sum() > 0
+    returns = period_close.ffill().pct_change(fill_method=None) * 100
+    return returns.where(has_data).iloc[1:]
+
+
+def yearly_returns(close):
+    """计算各日历年度收益率，最后一年截至最新交易日，即年初至今收益率"""
+    returns = period_returns(close, "YE")
+    returns.index = returns.index.year
+    return returns
+
+
+def monthly_returns(close):
+    """计算各月收益率，最后一个月截至最新交易日"""
+    returns = period_returns(close, "ME")
+    returns.index = returns.index.to_period("M")
+    return returns
+
+
+def window_close(close, start_date, end_date):
+    """
+    截取区间收盘价，并在首行保留起始日之前最后一个交易日的收盘价作为基期。
+
+    起始日之前没有数据时以区间第一个交易日为基期。停牌等缺失值向前填充。
+    """
+    close = close.sort_index().loc[:pd.Timestamp(end_date)].ffill()
+    start = pd.Timestamp(start_date)
+    before = close.loc[close.index < start]
+    window = close.loc[close.index >= start]
+    if not before.empty:
+        window = pd.concat([before.iloc[[-1]], window])
+    return window
+
+
+def range_return(close, start_date, end_date):
+    """计算任意区间的收益率，基期见window_close，区间内才上市的证券以其首个有效收盘价为基期"""
+    window = window_close(close, start_date, end_date)
+    if len(window) < 2:
+        return pd.Series(float("nan"), index=close.columns)
+    return (window.iloc[-1] / window.bfill().iloc[0] - 1) * 100
@@ -0,0 +1,167 @@
+"""基于日频收盘价的区间收益风险指标计算
+
+输入为以日期为索引、证券代码为列的收盘价宽表，所有证券在NumPy中一次向量化计算，
+替代万德wss的pct_chg_per、stdevry、sharpe、risk_calmar、risk_maxupside2、
+risk_maxdownside2和beta等区间指标，任意区间都可以在本地重新计算。
+收益率类指标单位为%，区间截取和基期规则统一使用returns模块的window_close和range_return。
+"""
+import numpy as np
+import pandas as pd
+
+from core.returns import range_return, window_close
+
+# 年化使用的年交易日数
+TRADING_DAYS = 252
+
+
+def _drawdown_paths(prices):
+    """返回回撤序列、创新高位置，prices为已前向填充的二维数组"""
+    running_max = np.fmax.accumulate(prices, axis=0)
+    drawdown = prices / running_max - 1
+    # 每个位置之前最近一次创新高的行号，用于确定最大回撤的起始日
+    rows = np.arange(len(prices))[:, None]
+    peak_rows = np.maximum.accumulate(np.where(prices >= running_max, rows, 0), axis=0)
+    return drawdown, peak_rows
+
+
+def _run_up_paths(prices):
+    """返回上涨序列、创新低位置，与_drawdown_paths对称"""
+    running_min = np.fmin.accumulate(prices, axis=0)
+    run_up = prices / running_min - 1
+    # 每个位置之前最近一次创新低的行号，用于确定最大上涨的起始日
+    rows = np.arange(len(prices))[:, None]
+    trough_rows = np.maximum.accumulate(np.where(prices <= running_min, rows, 0), axis=0)
+    return run_up, trough_rows
+
+
+def _extreme_dates(dates, path, start_rows, extreme, pick):
+    """按最大回撤或最大上涨的结束位置和此前的起点位置生成起止日期，极值为0或缺失时为None"""
+    end_rows = pick(np.where(np.isnan(path), 0, path), axis=0)
+    result = []
+    for col, end in enumerate(end_rows):
+        if np.isnan(extreme[col]) or extreme[col] == 0:
+            result.append(None)
+            continue
+        start = start_rows[end, col]
+        result.append(f"{dates[start]:%Y-%m-%d}至{dates[end]:%Y-%m-%d}")
+    return result
+
+
+def _nan_reduce(func, values, axis=0):
+    """全为缺失值的列返回NaN，不触发警告"""
+    has_data = ~np.isnan(values).all(axis=axis)
+    result = np.full(values.shape[1 - axis], np.nan)
+    if has_data.any():
+        result[has_data] = func(values[:, has_data], axis=axis)
+    return result
+
+
+def risk_metrics(close, start_date, end_date, benchmark=None, turnover=None, risk_free_rate=0.0):
+    """
+    计算区间收益风险指标。
+
+    参数:
+    close (pd.DataFrame): 收盘价宽表，需包含起始日之前至少一个交易日以确定基期
+    start_date, end_date (str): 区间起止日期
+    benchmark (pd.Series): 基准指数收盘价，用于计算Beta，为None时不计算
+    turnover (pd.DataFrame): 日换手率宽表（%），区间内求和得到区间换手率，为None时不计算
+    risk_free_rate (float): 年化无风险利率（%），用于计算夏普比率
+
+    返回:
+    pd.DataFrame: 以证券代码为索引的指标表，列名与原万德指标的中文名称一致
+    """
+    window = window_close(close, start_date, end_date)
+    codes = close.columns
+    table = pd.DataFrame(index=codes)
+    if len(window) < 2:
+        return table.assign(区间涨跌幅=np.nan)
+
+    dates = window.index
+    prices = window.to_numpy(dtype=float)
+    total_return = range_return(close, start_date, end_date).to_numpy(dtype=float) / 100
+
+    daily_returns = prices[1:] / prices[:-1] - 1
+    n_days = (~np.isnan(daily_returns)).sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        annual_return = (1 + total_return) ** (TRADING_DAYS / np.where(n_days > 0, n_days, np.nan)) - 1
+        volatility = _nan_reduce(lambda x, axis: np.nanstd(x, axis=axis, ddof=1), daily_returns) * np.sqrt(TRADING_DAYS)
+        sharpe = (annual_return - risk_free_rate / 100) / volatility
+
+    drawdown, peak_rows = _drawdown_paths(prices)
+    # 最大上涨与最大回撤对称：相对此前最低点的最大涨幅
+    run_up, trough_rows = _run_up_paths(prices)
+    max_drawdown = _nan_reduce(np.nanmin, drawdown)
+    max_run_up = _nan_reduce(np.nanmax, run_up)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        calmar = np.where(max_drawdown < 0, annual_return / -max_drawdown, np.nan)
+
+    drawdown_dates = _extreme_dates(dates, drawdown, peak_rows, max_drawdown, np.argmin)
+    run_up_dates = _extreme_dates(dates, run_up, trough_rows, max_run_up, np.argmax)
+
+    table["区间涨跌幅"] = total_return * 100
+    if turnover is not None:
+        turn = turnover.sort_index().loc[pd.Timestamp(start_date):pd.Timestamp(end_date)]
+        table["区间换手率"] = turn.reindex(columns=codes).sum(min_count=1)
+    table["区间年化波动率"] = volatility * 100
+    table["区间年化夏普比率"] = sharpe
+    table["区间年化卡玛比率"] = calmar
+    table["最大上涨"] = max_run_up * 100
+    table["最大上涨起止日期"] = run_up_dates
+    table["最大回撤"] = max_drawdown * 100
+    table["最大回撤起止日期"] = drawdown_dates
+
+    if benchmark is not None:
+        table["Beta"] = beta(window, benchmark)
+    return table
+
+
+def beta(close, benchmark):
+    """
+    计算各证券日收益率相对基准的Beta。
+
+    每个证券只使用与基准同时有收益率的交易日，全部证券一次矩阵运算得到。
+    """
+    benchmark = benchmark.reindex(close.index).ffill()
+    returns = close.pct_change(fill_method=None).iloc[1:].to_numpy(dtype=float)
+    bench = benchmark.pct_change(fill_method=None).iloc[1:].to_numpy(dtype=float)[:, None]
+
+    valid = ~np.isnan(returns) & ~np.isnan(bench)
+    count = valid.sum(axis=0)
+    x = np.where(valid, bench, 0.0)
+    y = np.where(valid, returns, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        x_mean = x.sum(axis=0) / count
+        y_mean = y.sum(axis=0) / count
+        x_dev = np.where(valid, x - x_mean, 0.0)
+        y_dev = np.where(valid, y - y_mean, 0.0)
+        result = (x_dev * y_dev).sum(axis=0) / (x_dev ** 2).sum(axis=0)
+    return np.where(count > 1, result, np.nan)
+
+
+def beta_matrix(close):
+    """
+    计算全部证券两两之间的Beta矩阵。
+
+    由一次掩码矩阵乘法得到所有证券对在共同有效交易日上的协方差和方差，
+    不需要按基准逐个计算。
+
+    返回:
+    pd.DataFrame: 行为证券、列为基准，元素为行证券相对列基准的Beta，对角线为1
+    """
+    returns = close.sort_index().pct_change(fill_method=None).iloc[1:]
+    values = returns.to_numpy(dtype=float)
+    valid = (~np.isnan(values)).astype(float)
+    x = np.where(valid > 0, values, 0.0)
+
+    # count[i, j]为i、j同时有效的天数，sums[i, j]为j有效时i的收益率之和，squares同理
+    count = valid.T @ valid
+    sums = x.T @ valid
+    squares = (x * x).T @ valid
+    products = x.T @ x
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = (products - sums * sums.T / count) / (count - 1)
+        # 基准j在与i共同有效日期上的方差
+        bench_var = (squares.T - sums.T * sums.T / count) / (count - 1)
+        result = cov / bench_var
+    result[count < 2] = np.nan
+    return pd.DataFrame(result, index=returns.columns, columns=returns.columns)
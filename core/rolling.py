@@ -0,0 +1,83 @@
+"""滚动窗口统计量计算
+
+输入为以日期为索引、证券代码为列的日收益率宽表。所有窗口统计量都由累积和相减得到，
+每个窗口的更新为O(1)，整段序列为O(n)，不逐窗口重新计算。
+计算前先按列去均值，减小累积和相减带来的数值误差。窗口内有效样本不足min_periods时为NaN。
+"""
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+# 页面提供的滚动窗口长度（交易日）
+ROLLING_WINDOWS = (20, 60, 120, 250)
+
+TRADING_DAYS = 252
+
+
+def _window_sums(values, window):
+    """按列计算滚动窗口内的和，缺失值按0计入，values为二维数组；序列开头不足一个窗口时为已有部分的和"""
+    cumsum = np.cumsum(np.vstack([np.zeros((1, values.shape[1])), values]), axis=0)
+    window_start = np.maximum(np.arange(len(values)) + 1 - window, 0)
+    return cumsum[1:] - cumsum[window_start]
+
+
+def _pair_moments(x, y, window):
+    """计算两组序列在共同有效日期上的滚动样本数、协方差和各自方差"""
+    valid = ~np.isnan(x) & ~np.isnan(y)
+    count = np.maximum(valid.sum(axis=0), 1)
+    x = np.where(valid, x, 0.0)
+    y = np.where(valid, y, 0.0)
+    x = np.where(valid, x - x.sum(axis=0) / count, 0.0)
+    y = np.where(valid, y - y.sum(axis=0) / count, 0.0)
+    n = _window_sums(valid.astype(float), window)
+    sx, sy = _window_sums(x, window), _window_sums(y, window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = (_window_sums(x * y, window) - sx * sy / n) / (n - 1)
+        var_x = (_window_sums(x * x, window) - sx * sx / n) / (n - 1)
+        var_y = (_window_sums(y * y, window) - sy * sy / n) / (n - 1)
+    return n, cov, var_x, var_y
+
+
+def rolling_volatility(returns, window, min_periods=None):
+    """滚动年化波动率（%）"""
+    min_periods = min_periods or window
+    values = returns.to_numpy(dtype=float)
+    n, __, var, __ = _pair_moments(values, values, window)
+    with np.errstate(invalid="ignore"):
+        volatility = np.sqrt(np.clip(var, 0, None) * TRADING_DAYS) * 100
+    volatility[~(n >= min_periods)] = np.nan
+    return pd.DataFrame(volatility, index=returns.index, columns=returns.columns)
+
+
+def rolling_beta(returns, benchmark, window, min_periods=None):
+    """各证券相对基准收益率的滚动Beta"""
+    min_periods = min_periods or window
+    values = returns.to_numpy(dtype=float)
+    bench = np.broadcast_to(benchmark.reindex(returns.index).to_numpy(dtype=float)[:, None], values.shape)
+    n, cov, __, var_bench = _pair_moments(values, bench, window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        beta = cov / var_bench
+    beta[~(n >= min_periods)] = np.nan
+    return pd.DataFrame(beta, index=returns.index, columns=returns.columns)
+
+
+def rolling_correlation(returns, window, min_periods=None):
+    """
+    所有证券两两之间的滚动相关系数。
+
+    返回:
+    pd.DataFrame: 列为(代码1, 代码2)组成的MultiIndex，每对证券只保留一列
+    """
+    min_periods = min_periods or window
+    pairs = list(combinations(returns.columns, 2))
+    if not pairs:
+        return pd.DataFrame(index=returns.index)
+    values = returns.to_numpy(dtype=float)
+    left = [returns.columns.get_loc(a) for a, __ in pairs]
+    right = [returns.columns.get_loc(b) for __, b in pairs]
+    n, cov, var_x, var_y = _pair_moments(values[:, left], values[:, right], window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        corr = np.clip(cov / np.sqrt(var_x * var_y), -1, 1)
+    corr[~(n >= min_periods)] = np.nan
+    return pd.DataFrame(corr, index=returns.index, columns=pd.MultiIndex.from_tuples(pairs))
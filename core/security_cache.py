@@ -0,0 +1,139 @@
+"""个股字段缓存
+
+以（股票代码, 字段, 交易日）为键缓存个股字段数据，在不同指数、不同会话之间共享。
+成分股加载时先查缓存，只对缺失的单元格请求万德。历史交易日的数据不会再变化，
+会同时保存到本地磁盘；当天的数据盘中可能变化，只保留在内存中。
+向万德请求时不持有缓存的锁，请求期间其他线程仍可读取已缓存的单元格，同一单元格同时只请求一次。
+"""
+import datetime
+import os
+import threading
+
+import pandas as pd
+
+from core.series_store import DEFAULT_DATA_DIR
+
+
+class SecurityAttributeCache:
+    """按 交易日/字段.parquet 保存的个股字段缓存"""
+
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.RLock()
+        # {(字段, 交易日): pd.Series(index=股票代码)}，万德返回的空值也会缓存
+        self._cells = {}
+        # 正在向万德请求的单元格 {(字段, 交易日, 股票代码): threading.Event}
+        self._inflight = {}
+
+    def _path(self, field, trade_date):
+        return os.path.join(self.root, "security", trade_date, f"{field}.parquet")
+
+    def _load(self, field, trade_date):
+        key = (field, trade_date)
+        if key not in self._cells:
+            path = self._path(field, trade_date)
+            if os.path.exists(path):
+                self._cells[key] = pd.read_parquet(path)["value"]
+            else:
+                self._cells[key] = pd.Series(dtype="object")
+        return self._cells[key]
+
+    def _save(self, field, trade_date):
+        # 当天数据盘中可能变化，不写入磁盘
+        if trade_date >= datetime.date.today().isoformat():
+            return
+        path = self._path(field, trade_date)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        self._cells[(field, trade_date)].rename("value").to_frame().to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+
+    def _merge(self, fetched, fields, trade_date):
+        """将新获取的单元格合并到缓存中，同一股票以新数据为准"""
+        for field in fields:
+            series = self._load(field, trade_date)
+            new_values = fetched[field]
+            if series.empty:
+                series = new_values.copy()
+            else:
+                series = pd.concat([series[~series.index.isin(new_values.index)], new_values])
+            self._cells[(field, trade_date)] = series
+            self._save(field, trade_date)
+
+    def get(self, codes, fields, trade_date, fetch):
+        """
+        获取一组股票在某个交易日的多个字段，只对缓存中缺失的股票调用fetch。
+
+        参数:
+        codes (list): 股票代码列表
+        fields (list): 字段名列表，与fetch返回的列名一致
+        trade_date (str): 交易日，格式YYYY-MM-DD
+        fetch (callable): fetch(missing_codes)，返回以股票代码为索引、包含fields各列的DataFrame，失败返回None
+
+        返回:
+        pd.DataFrame: 以股票代码为索引、fields为列的数据
+        """
+        trade_date = str(trade_date)[:10]
+        # 已请求过的股票，请求失败时不在本次调用中重复请求
+        attempted = set()
+        while True:
+            with self._lock:
+                # 任一字段尚未缓存的股票都需要请求；其他线程正在请求的股票等其完成后重新检查
+                cached = set(codes)
+                for field in fields:
+                    cached &= set(self._load(field, trade_date).index)
+                missing = []
+                pending = set()
+                for code in codes:
+                    if code in cached or code in attempted:
+                        continue
+                    events = [self._inflight[key] for key in ((field, trade_date, code) for field in fields)
+                              if key in self._inflight]
+                    if events:
+                        pending.update(events)
+                    else:
+                        missing.append(code)
+                if missing:
+                    event = threading.Event()
+                    for code in missing:
+                        for field in fields:
+                            self._inflight[(field, trade_date, code)] = event
+
+            if not missing and not pending:
+                break
+
+            try:
+                if missing:
+                    attempted.update(missing)
+                    # 万德请求在锁外进行
+                    fetched = fetch(missing)
+                    if fetched is not None:
+                        with self._lock:
+                            self._merge(fetched, fields, trade_date)
+            finally:
+                if missing:
+                    with self._lock:
+                        for code in missing:
+                            for field in fields:
+                                self._inflight.pop((field, trade_date, code), None)
+                    event.set()
+
+            for pending_event in pending:
+                pending_event.wait()
+
+        with self._lock:
+            data = pd.DataFrame({field: self._load(field, trade_date).reindex(codes) for field in fields})
+        return data.infer_objects()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_security_cache():
+    """获取进程内共享的个股字段缓存"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SecurityAttributeCache(DEFAULT_DATA_DIR)
+        return _cache
@@ -0,0 +1,247 @@
+"""日频时间序列本地存储
+
+按字段和证券代码分区，将万德w.wsd获取的日频序列以Parquet格式保存在本地，
+并记录每条序列已覆盖的日期区间。再次请求时只向万德请求缺失的日期，其余从磁盘读取。
+读取过的序列和覆盖区间同时保留在内存中，请求区间被已覆盖区间包含时直接切片返回。
+向万德请求时不持有存储的锁，请求期间其他线程仍可读取已覆盖的序列。
+当天的数据盘中可能还会变化，不计入覆盖区间，只在内存中记录获取时间，INTRADAY_TTL秒内不再重复请求。
+返回结果中缺少的代码、全部为空值的代码以及末尾尚未公布的日期同样不计入覆盖区间，按当天数据的方式处理。
+"""
+import datetime
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+# 默认存储目录，可通过环境变量INDEX_ANALYSIS_DATA_DIR修改
+DEFAULT_DATA_DIR = os.environ.get("INDEX_ANALYSIS_DATA_DIR", os.path.join(os.getcwd(), "data_cache"))
+
+ONE_DAY = datetime.timedelta(days=1)
+
+# 当天数据的有效时长（秒），期间重复请求当天数据直接使用内存中的结果
+INTRADAY_TTL = 300
+
+
+class SeriesStore:
+    """按 字段/代码.parquet 分区的日频序列存储"""
+
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.RLock()
+        # 内存中的序列 {(field, code): pd.Series} 和覆盖区间 {field: {code: [start, end]}}
+        self._series = {}
+        self._coverage = {}
+        # 未计入覆盖区间的请求记录 {(field, code): (缺口起始日, 缺口结束日, 获取时间)}
+        self._intraday = {}
+        # 正在向万德请求的序列 {(field, code): threading.Event}，请求在锁外进行，同一序列同时只请求一次
+        self._inflight = {}
+
+    # ————————————————————————————————路径与元数据————————————————————————————————
+
+    def _field_dir(self, field):
+        return os.path.join(self.root, "wsd", field)
+
+    def _series_path(self, field, code):
+        return os.path.join(self._field_dir(field), f"{code}.parquet")
+
+    def _coverage_path(self, field):
+        return os.path.join(self._field_dir(field), "_coverage.json")
+
+    def _load_coverage(self, field):
+        """读取字段下各代码已覆盖的日期区间 {code: [start, end]}"""
+        if field not in self._coverage:
+            path = self._coverage_path(field)
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    self._coverage[field] = json.load(f)
+            else:
+                self._coverage[field] = {}
+        return self._coverage[field]
+
+    def _save_coverage(self, field, coverage):
+        path = self._coverage_path(field)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(coverage, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, path)
+
+    # ————————————————————————————————序列读写————————————————————————————————
+
+    def read(self, field, code):
+        """读取单条序列，不存在时返回空序列"""
+        key = (field, code)
+        if key not in self._series:
+            path = self._series_path(field, code)
+            if os.path.exists(path):
+                series = pd.read_parquet(path)["value"]
+            else:
+                series = pd.Series(dtype="float64", index=pd.DatetimeIndex([]))
+            series.name = code
+            self._series[key] = series
+        return self._series[key]
+
+    def _write(self, field, code, series):
+        os.makedirs(self._field_dir(field), exist_ok=True)
+        path = self._series_path(field, code)
+        tmp_path = path + ".tmp"
+        series.rename("value").to_frame().to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+        self._series[(field, code)] = series.rename(code)
+
+    def _merge(self, field, code, new_series):
+        """将新获取的数据合并到已有序列中，同一日期以新数据为准"""
+        series = self.read(field, code)
+        series = pd.concat([series, new_series.astype("float64")])
+        series = series[~series.index.duplicated(keep="last")].sort_index()
+        self._write(field, code, series)
+
+    # ————————————————————————————————缺口计算————————————————————————————————
+
+    def _intraday_fresh(self, field, code, gap):
+        """缺口在INTRADAY_TTL秒内已请求过、但数据尚未公布而未计入覆盖区间时无需再次请求"""
+        gap_start, gap_end = gap
+        fetched = self._intraday.get((field, code))
+        return (fetched is not None and fetched[0] <= gap_start and fetched[1] >= gap_end
+                and time.monotonic() - fetched[2] < INTRADAY_TTL)
+
+    @staticmethod
+    def _covered_end(values, covered, gap_start, gap_end, last_final_day):
+        """
+        计算一次请求后覆盖区间可以延伸到的日期，无法确认数据已公布时返回None。
+
+        已覆盖区间之前的缺口为上市前或更早的历史，空值也计入覆盖区间；
+        其余缺口只覆盖到最后一个有数据的交易日，之后返回了空值的交易日视为数据尚未公布。
+        """
+        covered_end = min(gap_end, last_final_day)
+        if covered_end < gap_start:
+            return None
+        if covered is not None and gap_end < datetime.date.fromisoformat(covered[0]):
+            return covered_end
+        valid = values.dropna().index
+        if valid.empty:
+            return None
+        last_valid = valid.max().date()
+        dates = values.index.date
+        if ((dates > last_valid) & (dates <= covered_end)).any():
+            return last_valid if last_valid >= gap_start else None
+        return covered_end
+
+    @staticmethod
+    def _missing_ranges(covered, start, end):
+        """计算请求区间相对已覆盖区间的缺口，缺口总与已覆盖区间相邻以保持覆盖区间连续"""
+        if covered is None:
+            return [(start, end)]
+        covered_start, covered_end = (datetime.date.fromisoformat(d) for d in covered)
+        gaps = []
+        if start < covered_start:
+            gaps.append((start, covered_start - ONE_DAY))
+        if end > covered_end:
+            gaps.append((covered_end + ONE_DAY, end))
+        return gaps
+
+    def get(self, codes, field, start_date, end_date, fetch):
+        """
+        获取多个代码在指定区间的日频序列，缺失部分调用fetch补齐。
+
+        参数:
+        codes (list): 证券代码列表
+        field (str): 万德字段，如close、pe_ttm
+        start_date, end_date (str): 起止日期，格式YYYY-MM-DD
+        fetch (callable): fetch(codes, field, start_date, end_date)，返回以日期为索引、代码为列的DataFrame，失败返回None
+
+        返回:
+        pd.DataFrame: 以日期为索引、代码为列的宽格式数据
+        """
+        codes = list(dict.fromkeys(codes))
+        start = datetime.date.fromisoformat(str(start_date)[:10])
+        end = datetime.date.fromisoformat(str(end_date)[:10])
+        # 当天数据盘中可能还会变化，覆盖区间最多记到昨天，下次请求时重新获取当天数据
+        last_final_day = datetime.date.today() - ONE_DAY
+
+        # 已请求过的(代码, 缺口)，请求失败时不在本次调用中重复请求
+        attempted = set()
+        while True:
+            with self._lock:
+                coverage = self._load_coverage(field)
+
+                # 将缺口相同的代码合并为一次请求；其他线程正在请求的代码等其完成后重新检查缺口
+                requests = {}
+                pending = []
+                for code in codes:
+                    gaps = [gap for gap in self._missing_ranges(coverage.get(code), start, end)
+                            if (code, gap) not in attempted
+                            and not self._intraday_fresh(field, code, gap)]
+                    if not gaps:
+                        continue
+                    if (field, code) in self._inflight:
+                        pending.append(self._inflight[(field, code)])
+                        continue
+                    self._inflight[(field, code)] = threading.Event()
+                    for gap in gaps:
+                        requests.setdefault(gap, []).append(code)
+
+            if not requests and not pending:
+                break
+
+            try:
+                # 万德请求在锁外进行，其他线程读取已覆盖的序列时无需等待
+                for (gap_start, gap_end), gap_codes in requests.items():
+                    attempted.update((code, (gap_start, gap_end)) for code in gap_codes)
+                    fetched = fetch(gap_codes, field, gap_start.isoformat(), gap_end.isoformat())
+                    if fetched is None:
+                        continue
+                    fetched.index = pd.to_datetime(fetched.index)
+                    with self._lock:
+                        for code in gap_codes:
+                            covered = coverage.get(code)
+                            covered_end = None
+                            if code in fetched.columns:
+                                self._merge(field, code, fetched[code])
+                                covered_end = self._covered_end(fetched[code], covered, gap_start, gap_end,
+                                                                last_final_day)
+                            # 缺口未被完全覆盖时记录请求时间，INTRADAY_TTL秒后再重新请求
+                            if covered_end is None or covered_end < gap_end:
+                                self._intraday[(field, code)] = (gap_start, gap_end, time.monotonic())
+                            # 更新覆盖区间
+                            if covered_end is None:
+                                continue
+                            if covered is None:
+                                coverage[code] = [gap_start.isoformat(), covered_end.isoformat()]
+                            else:
+                                coverage[code] = [min(covered[0], gap_start.isoformat()),
+                                                  max(covered[1], covered_end.isoformat())]
+
+                if requests:
+                    with self._lock:
+                        os.makedirs(self._field_dir(field), exist_ok=True)
+                        self._save_coverage(field, coverage)
+            finally:
+                with self._lock:
+                    for gap_codes in requests.values():
+                        for code in gap_codes:
+                            event = self._inflight.pop((field, code), None)
+                            if event is not None:
+                                event.set()
+
+            for event in pending:
+                event.wait()
+
+        with self._lock:
+            data = pd.concat([self.read(field, code) for code in codes], axis=1) if codes else pd.DataFrame()
+
+        return data.loc[pd.Timestamp(start):pd.Timestamp(end)]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_series_store():
+    """获取进程内共享的序列存储实例"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SeriesStore(DEFAULT_DATA_DIR)
+        return _store
@@ -0,0 +1,92 @@
+"""服务端分页、排序和筛选的表格视图
+
+成分股原始数据等大表格不再整体经过Styler.background_gradient渲染后发给浏览器：
+热力图颜色按列预先分箱，每个单元格只保存所在箱的编号；筛选和排序只计算行的位置，
+每次只对当前页的行生成样式并发送，页面耗时只与每页行数有关，与表格总行数无关。
+"""
+import numpy as np
+import pandas as pd
+from matplotlib import colormaps
+from matplotlib.colors import rgb2hex
+
+# 每页显示的行数
+PAGE_SIZE = 50
+# 热力图颜色分箱数，与连续渐变在表格中肉眼难以区分
+GRADIENT_BINS = 32
+# 背景色亮度低于该值时使用浅色文字，与pandas的background_gradient一致
+TEXT_COLOR_THRESHOLD = 0.408
+
+
+def _relative_luminance(rgba):
+    """按W3C标准计算颜色的相对亮度"""
+    r, g, b = (x / 12.92 if x <= 0.04045 else ((x + 0.055) / 1.055) ** 2.4 for x in rgba[:3])
+    return 0.2126 * r + 0.7152 * g + 0.0722 * b
+
+
+def gradient_palette(cmap="Oranges", bins=GRADIENT_BINS):
+    """生成每个分箱对应的CSS样式，列表下标即分箱编号"""
+    palette = []
+    for rgba in colormaps[cmap](np.linspace(0, 1, bins)):
+        text_color = "#f1f1f1" if _relative_luminance(rgba) < TEXT_COLOR_THRESHOLD else "#000000"
+        palette.append(f"background-color: {rgb2hex(rgba)};color: {text_color};")
+    return palette
+
+
+def gradient_bins(data, columns, bins=GRADIENT_BINS):
+    """
+    按列计算热力图分箱编号，与background_gradient相同，每列按自身的最小值和最大值线性映射。
+
+    返回:
+    pd.DataFrame: 与data行对齐的分箱编号，分箱数不超过128时为int8，缺失值为-1
+    """
+    values = data[list(columns)].to_numpy(dtype=float, na_value=np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        low = np.nanmin(values, axis=0) if len(values) else np.zeros(len(columns))
+        high = np.nanmax(values, axis=0) if len(values) else np.zeros(len(columns))
+        scaled = (values - low) / np.where(high > low, high - low, 1)
+    codes = np.floor(scaled * (bins - 1) + 0.5)
+    codes = np.where(np.isnan(codes), -1, codes).astype(np.int8 if bins <= 128 else np.int16)
+    return pd.DataFrame(codes, index=data.index, columns=list(columns))
+
+
+def query_rows(data, keyword="", sort_by=None, ascending=True):
+    """
+    筛选并排序表格，只返回行的位置，不复制数据。
+
+    参数:
+    data (pd.DataFrame): 表格数据
+    keyword (str): 在索引和文本列中查找的关键字，不区分大小写，为空时不筛选
+    sort_by (str): 排序列，为None时保持原有顺序
+    ascending (bool): 是否升序，缺失值总是排在最后
+
+    返回:
+    np.ndarray: 筛选和排序后的行位置
+    """
+    positions = np.arange(len(data))
+    keyword = keyword.strip().lower()
+    if keyword:
+        text_columns = [data.index.to_series()] + [
+            data[col] for col in data.columns
+            if isinstance(data[col].dtype, pd.CategoricalDtype) or pd.api.types.is_string_dtype(data[col])
+        ]
+        mask = np.zeros(len(data), dtype=bool)
+        for column in text_columns:
+            mask |= column.astype("string").str.lower().str.contains(keyword, regex=False).fillna(False).to_numpy(dtype=bool)
+        positions = positions[mask]
+    if sort_by is not None:
+        order = data[sort_by].iloc[positions].reset_index(drop=True)
+        order = order.sort_values(ascending=ascending, kind="stable", na_position="last").index.to_numpy()
+        positions = positions[order]
+    return positions
+
+
+def page_count(n_rows, page_size=PAGE_SIZE):
+    """总页数，空表格也算一页"""
+    return max((n_rows + page_size - 1) // page_size, 1)
+
+
+def page_styles(bins, positions, palette):
+    """将当前页各行的分箱编号映射为CSS样式，缺失值不着色"""
+    codes = bins.iloc[positions].to_numpy(dtype=int)
+    styles = np.array(palette + [""], dtype=object)[np.where(codes < 0, len(palette), codes)]
+    return pd.DataFrame(styles, index=bins.index[positions], columns=bins.columns)
@@ -0,0 +1,207 @@
+"""可替换的万德数据后端
+
+页面只通过wss/wsd/wset（usedf=True）获取数据，这里提供三种实现：
+- live：通过进程级万德会话访问真实终端
+- record：访问真实终端的同时，将每次请求的结果保存为压缩的回放文件
+- replay：不连接万德，直接从回放文件读取结果，可注入固定延迟或按录制时的耗时重现
+
+通过环境变量选择后端：
+INDEX_ANALYSIS_WIND_BACKEND   live（默认）/ record / replay
+INDEX_ANALYSIS_FIXTURE_DIR    回放文件目录，默认为 data_cache/fixtures
+INDEX_ANALYSIS_REPLAY_LATENCY 回放时每次请求的延迟秒数，填recorded则按录制时的耗时延迟
+
+fetch_wsd为各页面向日频序列存储补齐缺失日期时共用的请求函数，show_wind_status在侧边栏显示连接状态。
+"""
+import gzip
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+
+from core.series_store import DEFAULT_DATA_DIR
+from core.wind_session import get_wind_session
+
+DEFAULT_FIXTURE_DIR = os.path.join(DEFAULT_DATA_DIR, "fixtures")
+
+
+def request_key(method, args, kwargs):
+    """将一次请求的方法名和参数规范化为稳定的字符串键"""
+    normalized_args = [list(arg) if not isinstance(arg, str) and hasattr(arg, "__iter__") else arg for arg in args]
+    payload = json.dumps([method, normalized_args, sorted(kwargs.items())], ensure_ascii=False, default=str)
+    return f"{method}_{hashlib.sha1(payload.encode('utf-8')).hexdigest()[:20]}"
+
+
+class WindBackend:
+    """数据后端接口，各方法返回(error_code, DataFrame)，与WindPy在usedf=True时一致"""
+
+    name = "base"
+
+    def _request(self, method, *args, **kwargs):
+        raise NotImplementedError
+
+    def wss(self, codes, fields, *options, usedf=True):
+        return self._request("wss", codes, fields, *options, usedf=usedf)
+
+    def wsd(self, codes, fields, start_date, end_date, *options, usedf=True):
+        return self._request("wsd", codes, fields, start_date, end_date, *options, usedf=usedf)
+
+    def wset(self, table_name, *options, usedf=True):
+        return self._request("wset", table_name, *options, usedf=usedf)
+
+    def metrics(self):
+        """返回后端运行指标，字段与万德会话的指标保持一致"""
+        return {
+            "backend": self.name,
+            "connected": False,
+            "uptime_seconds": 0.0,
+            "last_connect_seconds": None,
+            "total_connect_seconds": 0.0,
+            "connect_count": 0,
+            "call_count": 0,
+        }
+
+
+class LiveBackend(WindBackend):
+    """通过进程级万德会话访问真实终端"""
+
+    name = "live"
+
+    def __init__(self, session=None):
+        self.session = session or get_wind_session()
+
+    def _request(self, method, *args, **kwargs):
+        return getattr(self.session, method)(*args, **kwargs)
+
+    def metrics(self):
+        return {"backend": self.name, **self.session.metrics()}
+
+
+class RecordingBackend(WindBackend):
+    """包装另一个后端，将每次请求的结果和耗时保存为gzip压缩的pickle文件"""
+
+    name = "record"
+
+    def __init__(self, backend, fixture_dir):
+        self.backend = backend
+        self.fixture_dir = fixture_dir
+        os.makedirs(fixture_dir, exist_ok=True)
+
+    def _request(self, method, *args, **kwargs):
+        started = time.perf_counter()
+        result = self.backend._request(method, *args, **kwargs)
+        elapsed = time.perf_counter() - started
+
+        key = request_key(method, args, kwargs)
+        path = os.path.join(self.fixture_dir, f"{key}.pkl.gz")
+        tmp_path = path + ".tmp"
+        with gzip.open(tmp_path, "wb") as f:
+            pickle.dump({
+                "method": method,
+                "args": args,
+                "kwargs": kwargs,
+                "elapsed": elapsed,
+                "result": result,
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        return result
+
+    def metrics(self):
+        return {**self.backend.metrics(), "backend": self.name}
+
+
+class ReplayBackend(WindBackend):
+    """从回放文件读取结果，不连接万德终端"""
+
+    name = "replay"
+
+    def __init__(self, fixture_dir, latency=0.0, serialize=True):
+        """
+        参数:
+        fixture_dir (str): 回放文件目录
+        latency (float或str): 每次请求注入的延迟秒数，"recorded"表示按录制时的耗时延迟
+        serialize (bool): 是否像真实万德客户端一样串行处理请求
+        """
+        self.fixture_dir = fixture_dir
+        self.latency = latency
+        self._lock = threading.Lock() if serialize else None
+        self._started_at = time.time()
+        self.call_count = 0
+
+    def _load(self, method, args, kwargs):
+        key = request_key(method, args, kwargs)
+        path = os.path.join(self.fixture_dir, f"{key}.pkl.gz")
+        if not os.path.exists(path):
+            raise LookupError(f"回放文件中没有该请求：{method}{args}")
+        with gzip.open(path, "rb") as f:
+            return pickle.load(f)
+
+    def _request(self, method, *args, **kwargs):
+        fixture = self._load(method, args, kwargs)
+        delay = fixture["elapsed"] if self.latency == "recorded" else float(self.latency)
+        if self._lock is not None:
+            with self._lock:
+                time.sleep(delay)
+                self.call_count += 1
+        else:
+            time.sleep(delay)
+            self.call_count += 1
+        return fixture["result"]
+
+    def metrics(self):
+        return {
+            **super().metrics(),
+            "connected": True,
+            "uptime_seconds": time.time() - self._started_at,
+            "last_connect_seconds": 0.0,
+            "call_count": self.call_count,
+        }
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_wind_backend():
+    """根据环境变量创建进程内共享的数据后端"""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            kind = os.environ.get("INDEX_ANALYSIS_WIND_BACKEND", "live").lower()
+            fixture_dir = os.environ.get("INDEX_ANALYSIS_FIXTURE_DIR", DEFAULT_FIXTURE_DIR)
+            if kind == "replay":
+                latency = os.environ.get("INDEX_ANALYSIS_REPLAY_LATENCY", "0")
+                _backend = ReplayBackend(fixture_dir, latency if latency == "recorded" else float(latency))
+            elif kind == "record":
+                _backend = RecordingBackend(LiveBackend(), fixture_dir)
+            else:
+                _backend = LiveBackend()
+        return _backend
+
+
+def fetch_wsd(codes, field, start_date, end_date):
+    """获取多个代码单个字段的日频序列，返回以日期为索引、代码为列的DataFrame，失败返回None"""
+    error_code, df = get_wind_backend().wsd(codes, field, start_date, end_date, usedf=True)
+    if error_code != 0:
+        return None
+    # 单个代码时万德返回的列名为字段名，统一改为代码
+    if len(codes) == 1:
+        df.columns = codes
+    return df
+
+
+def show_wind_status(backend=None):
+    """在当前位置（通常为侧边栏）显示数据后端的连接状态和请求次数"""
+    import streamlit as st
+
+    wind_metrics = (backend or get_wind_backend()).metrics()
+    with st.expander("万德连接状态"):
+        if wind_metrics["backend"] != "live":
+            st.write(f"数据后端：{wind_metrics['backend']}")
+        if wind_metrics["connected"]:
+            st.write(f"已连接，已持续 {wind_metrics['uptime_seconds'] / 60:.1f} 分钟")
+            st.write(f"最近一次连接耗时 {wind_metrics['last_connect_seconds']:.2f} 秒")
+        else:
+            st.write("尚未连接，首次请求数据时自动连接")
+        st.write(f"累计连接 {wind_metrics['connect_count']} 次，请求 {wind_metrics['call_count']} 次")
@@ -0,0 +1,120 @@
+"""进程级万德会话管理
+
+WindPy客户端不是线程安全的，且每次w.start()都要重新握手。这里在进程内维护唯一的长连接：
+首次调用时才连接，定期检查连接状态并自动重连，所有请求通过同一把锁串行执行。
+"""
+import threading
+import time
+from urllib.error import URLError
+
+# 连接超时时间（秒）
+WIND_WAIT_TIME = 120
+# 两次连接状态检查的最小间隔（秒）
+HEALTH_CHECK_INTERVAL = 30
+
+
+class WindSession:
+    """对WindPy客户端的线程安全封装，接口与w.wss/w.wsd/w.wset保持一致"""
+
+    def __init__(self, wait_time=WIND_WAIT_TIME, health_check_interval=HEALTH_CHECK_INTERVAL):
+        self.wait_time = wait_time
+        self.health_check_interval = health_check_interval
+        self._lock = threading.RLock()
+        self._client = None
+        self._last_health_check = 0.0
+        # 连接指标
+        self.connected_at = None
+        self.last_connect_seconds = None
+        self.total_connect_seconds = 0.0
+        self.connect_count = 0
+        self.call_count = 0
+
+    def _get_client(self):
+        if self._client is None:
+            from WindPy import w
+            self._client = w
+        return self._client
+
+    def _connect(self):
+        client = self._get_client()
+        started = time.perf_counter()
+        result = client.start(waitTime=self.wait_time)
+        elapsed = time.perf_counter() - started
+
+        self.last_connect_seconds = elapsed
+        self.total_connect_seconds += elapsed
+        self.connect_count += 1
+
+        if getattr(result, "ErrorCode", 0) != 0 or not client.isconnected():
+            self.connected_at = None
+            raise URLError(f"万德终端连接失败，错误代码：{getattr(result, 'ErrorCode', None)}")
+        self.connected_at = time.time()
+        self._last_health_check = time.monotonic()
+
+    def ensure_connected(self, force_check=False):
+        """确保连接可用：未连接时建立连接，超过检查间隔时检查连接状态并在断开后重连"""
+        with self._lock:
+            if self.connected_at is None:
+                self._connect()
+                return
+            now = time.monotonic()
+            if not force_check and now - self._last_health_check < self.health_check_interval:
+                return
+            self._last_health_check = now
+            if not self._get_client().isconnected():
+                self.connected_at = None
+                self._connect()
+
+    def _call(self, method, *args, **kwargs):
+        with self._lock:
+            self.ensure_connected()
+            result = getattr(self._client, method)(*args, **kwargs)
+            self.call_count += 1
+            # 调用失败且连接已断开时，重连后重试一次
+            error_code = result[0] if isinstance(result, tuple) else getattr(result, "ErrorCode", 0)
+            if error_code != 0 and not self._client.isconnected():
+                self.connected_at = None
+                self._connect()
+                result = getattr(self._client, method)(*args, **kwargs)
+                self.call_count += 1
+            return result
+
+    def wss(self, *args, **kwargs):
+        return self._call("wss", *args, **kwargs)
+
+    def wsd(self, *args, **kwargs):
+        return self._call("wsd", *args, **kwargs)
+
+    def wset(self, *args, **kwargs):
+        return self._call("wset", *args, **kwargs)
+
+    def stop(self):
+        """关闭连接，仅在进程退出或需要强制重连时使用"""
+        with self._lock:
+            if self._client is not None and self.connected_at is not None:
+                self._client.stop()
+            self.connected_at = None
+
+    def metrics(self):
+        """返回连接指标"""
+        return {
+            "connected": self.connected_at is not None,
+            "uptime_seconds": time.time() - self.connected_at if self.connected_at else 0.0,
+            "last_connect_seconds": self.last_connect_seconds,
+            "total_connect_seconds": self.total_connect_seconds,
+            "connect_count": self.connect_count,
+            "call_count": self.call_count,
+        }
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_wind_session():
+    """获取进程内所有页面和会话共享的万德会话"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = WindSession()
+        return _session
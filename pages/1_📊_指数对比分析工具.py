@@ -1,8 +1,8 @@
 from calendar import c
 import datetime
+import functools
 import re
 import numpy as np
-from WindPy import w
 
 import streamlit as st
 import pandas as pd
@@ -12,6 +12,23 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
+from core.chart_data import downsample_long, downsample_series, downsample_wide, use_webgl
+from core.constituents import industry_cube, top_constituents
+from core.correlation import ReturnBlock, aligned_log_returns, correlation_matrix, cross_correlation
+from core.drawdown import drawdown_episodes, underwater
+from core.earnings_store import get_earnings_store
+from core.frames import compact_frame
+from core.overlap import overlap_tables
+from core.percentile import get_percentile_engine
+from core.prefetch import PrefetchScheduler
+from core.returns import window_close, yearly_returns
+from core.risk import beta_matrix, risk_metrics
+from core.rolling import ROLLING_WINDOWS, rolling_beta, rolling_correlation, rolling_volatility
+from core.table_view import PAGE_SIZE, gradient_bins, gradient_palette, page_count, page_styles, query_rows
+from core.security_cache import get_security_cache
+from core.series_store import INTRADAY_TTL, get_series_store
+from core.wind_backend import fetch_wsd, get_wind_backend, show_wind_status
+
 st.set_page_config(page_title="指数对比分析工具", page_icon="📊", layout="wide")
 
 # ————————————————————————————————————————————初始配置模块————————————————————————————————————————————
@@ -19,6 +36,9 @@ st.set_page_config(page_title="指数对比分析工具", page_icon="📊", layo
 FIVE_YEARS_AGO = (datetime.datetime.now() - datetime.timedelta(days=5*365)).date().strftime('%Y-%m-%d')
 TODAY = datetime.datetime.now().date().strftime('%Y-%m-%d')
 
+# 万德数据后端，后端的选择见core.wind_backend
+w = get_wind_backend()
+
 # 颜色配置：包括申万和中信一级行业的配色
 # 申万一级行业配色方案
 sw_industry_colors = {
@@ -92,110 +112,167 @@ zx_industry_colors = {
 
 # ————————————————————————————————————————————数据缓存模块————————————————————————————————————————————
 
-# 缓存指数价格数据
-@st.cache_data
-def get_index_data(indexes):
-    index_data = w.wsd(indexes, "close", f"{st.session_state.start_date}", f"{st.session_state.end_date}",usedf=True)[1]
+# 日频序列本地存储，已获取过的日期直接从磁盘读取
+series_store = get_series_store()
+# 个股字段缓存，以（股票代码, 字段, 交易日）为键在不同指数和会话之间共享
+security_cache = get_security_cache()
+# 已披露年报数据存储，按（指数代码, 报告年度）永久保存
+earnings_store = get_earnings_store()
+# 估值分位数计算状态，新增交易日时只计算新增部分
+percentile_engine = get_percentile_engine()
+
+# 获取指数价格数据，本地存储已覆盖请求区间时直接切片返回，只有缺口部分才请求万德
+def get_index_data(indexes, start_date, end_date):
+    index_data = series_store.get(indexes, "close", start_date, end_date, fetch_wsd)
     return index_data
 
-@st.cache_data
-def get_index_market_value(indexes):
+@st.cache_data(show_spinner=False)
+def get_index_market_value(indexes, end_date):
     index_market_value = w.wss(indexes, 
         "mkt_cap_ard",
         "unit=1",
-        f"tradeDate={st.session_state.end_date}",
+        f"tradeDate={end_date}",
         usedf=True)[1]
     index_market_value = index_market_value.map(lambda x: x/100000000)
     return index_market_value
 
-# 缓存区间收益数据
-@st.cache_data
-def get_return_data(indexes):
-    return_data = pd.DataFrame()
-    curr_year = int(st.session_state.end_date[:4])
-    years = sorted([curr_year - i for i in range(1,5)])
-    for year in years:
-        return_data[str(year)] = w.wss(indexes, "pct_chg_per",
-        f"startDate={year}0101;endDate={year}1231",
-        usedf=True)[1]
-    return_data[f'{curr_year}年至今'] = w.wss(indexes, "pct_chg_per",
-        f"startDate={curr_year}0101;endDate={st.session_state.end_date}",
-        usedf=True)[1]
+# 年度收益对比的默认年数
+YEAR_RETURN_YEARS = 4
+
+# 缓存年度收益数据，由本地收盘价序列计算，缓存时长与序列存储中当天数据的有效时长一致
+@st.cache_data(ttl=INTRADAY_TTL, show_spinner=False)
+def get_return_data(indexes, end_date, years=YEAR_RETURN_YEARS):
+    curr_year = int(end_date[:4])
+    first_year = curr_year - years
+    # 多取上一年末的数据作为首年收益率的基期
+    close = get_index_data(indexes, f"{first_year - 1}-12-01", end_date)
+    return_data = yearly_returns(close).reindex(range(first_year, curr_year + 1)).T
+    return_data.columns = [str(year) for year in return_data.columns[:-1]] + [f'{curr_year}年至今']
     return return_data.round(2)
 
-# 缓存大类资产价格数据
-@st.cache_data
-def get_assets_data():
+# 预取日频序列，只将缺失的日期补进本地存储，板块渲染时直接从内存切片，不在预取线程中重复计算
+def prefetch_series(codes, field, start_date, end_date):
+    series_store.get(codes, field, start_date, end_date, fetch_wsd)
+
+# 获取大类资产价格数据
+def get_assets_data(start_date, end_date):
     assets = ['CBA08301.CS','AU9999.SGE','DCESMFI.DCE','IMCI.SHF','000201.CZC','H11014.CSI']
-    assets_data = w.wsd(assets, "close", f"{st.session_state.start_date}", f"{st.session_state.end_date}", usedf=True)[1]
+    assets_data = series_store.get(assets, "close", start_date, end_date, fetch_wsd)
     return assets_data
 
-# 缓存指数成分股数据
+# 获取A股交易日历，以万得全A有收盘价的日期为准
+def get_trading_calendar(start_date, end_date):
+    benchmark = series_store.get([BETA_BENCHMARK], "close", start_date, end_date, fetch_wsd)[BETA_BENCHMARK]
+    return pd.to_datetime(benchmark.dropna().index)
+
+# 缓存大类资产收益率及资产之间的相关系数，切换指数时只需重新计算指数所在的行
+# 同时返回所用的交易日历，指数一侧按同一日历对齐，当天数据更新前后两侧不会不一致
+@st.cache_data(ttl=INTRADAY_TTL, show_spinner=False)
+def get_asset_correlation(start_date, end_date, window=None):
+    calendar = get_trading_calendar(start_date, end_date)
+    asset_block = ReturnBlock(aligned_log_returns(get_assets_data(start_date, end_date), calendar), window)
+    return calendar, asset_block, cross_correlation(asset_block, asset_block)
+
+# 个股字段分组：每组对应一次w.wss调用，(字段, 参数, 重命名)
+STOCK_FIELD_GROUPS = [
+    ("ev,mkt_freeshares,netprofit_ttm2,val_dividendyield3",
+     "unit=1;tradeDate={end_date};rptDate=20241231",
+     {'EV':'总市值',
+      'MKT_FREESHARES':'自由流通市值',
+      'NETPROFIT_TTM2':'归母净利润TTM',
+      'VAL_DIVIDENDYIELD3':'股息率TTM'}),
+    ("industry_sw_2021,industry_citic",
+     "tradeDate={end_date};industryType=1",
+     {'INDUSTRY_SW_2021':'申万一级行业',
+      'INDUSTRY_CITIC':'中信一级行业'}),
+    ("industry_sw_2021,industry_citic",
+     "tradeDate={end_date};industryType=2",
+     {'INDUSTRY_SW_2021':'申万二级行业',
+      'INDUSTRY_CITIC':'中信二级行业'}),
+    ("industry_sw_2021,industry_citic",
+     "tradeDate={end_date};industryType=3",
+     {'INDUSTRY_SW_2021':'申万三级行业',
+      'INDUSTRY_CITIC':'中信三级行业'}),
+]
+
+# 行业分类标准及级别，与成分股数据中的行业列一一对应
+INDUSTRY_COLUMNS = ["申万一级行业", "中信一级行业", "申万二级行业", "中信二级行业", "申万三级行业", "中信三级行业"]
+# 成分股数据中的数值列，以float32保存
+STOCK_VALUE_COLUMNS = ['权重', '总市值', '自由流通市值', '归母净利润TTM', '股息率TTM']
+
+# 批量获取个股字段数据
+def get_stock_fields(stocks, end_date):
+    """对去重后的成分股并集按字段分组获取数据，个股字段缓存中已有的单元格不再请求万德"""
+    stock_fields = pd.DataFrame(index=pd.Index(stocks))
+    if not stocks:
+        return stock_fields
+
+    for fields, options, columns in STOCK_FIELD_GROUPS:
+        def fetch(missing_stocks, fields=fields, options=options, columns=columns):
+            error_code, df = w.wss(missing_stocks,
+                                   fields,
+                                   options.format(end_date=end_date),
+                                   usedf=True)
+            if error_code != 0:
+                return None
+            return df.rename(columns=columns)
+
+        df = security_cache.get(stocks, list(columns.values()), end_date, fetch)
+        stock_fields = stock_fields.join(df, how='left')
+
+    # 单位处理，将单位从元转换为亿元
+    stock_fields[['总市值', '自由流通市值', '归母净利润TTM']] = stock_fields[['总市值', '自由流通市值', '归母净利润TTM']].map(lambda x: round(x / 100000000, 2))
+    return stock_fields
+
+# 缓存单个指数的成分股代码、名称与权重，增减指数时其余指数无需重新请求
 @st.cache_data
-def get_index_component_data(_indexes):
-    index_component_data = pd.DataFrame()
-
-    # 获取指数成分股代码、名称与权重
-    for index in _indexes:
-        # 获取权重
-        df = w.wset("indexconstituent",
-                f"windcode={index};",
-                "field=wind_code,sec_name,i_weight,industry",
-                usedf=True)[1].set_index('wind_code')
-        stocks=df.index.tolist()
-        # 获取其他字段数据
-        df_1 = w.wss(stocks, 
-                     "ev,mkt_freeshares,netprofit_ttm2,val_dividendyield3",
-                     f"unit=1;tradeDate={st.session_state.end_date};rptDate=20241231",
-                     usedf=True)[1]
-        df_2 = w.wss(stocks, 
-                    "industry_sw_2021,industry_citic",
-                    f"tradeDate={st.session_state.end_date};industryType=1",
-                    usedf=True)[1].rename(
-                    columns={'INDUSTRY_CITIC':'中信一级行业',
-                            'INDUSTRY_SW_2021':'申万一级行业'})
-        df_3 = w.wss(stocks, 
-                    "industry_sw_2021,industry_citic",
-                    f"tradeDate={st.session_state.end_date};industryType=2",
-                    usedf=True)[1].rename(
-                    columns={'INDUSTRY_CITIC':'中信二级行业',
-                            'INDUSTRY_SW_2021':'申万二级行业'})
-        df_4 = w.wss(stocks, 
-                    "industry_sw_2021,industry_citic",
-                    f"tradeDate={st.session_state.end_date};industryType=3",
-                    usedf=True)[1].rename(
-                    columns={'INDUSTRY_CITIC':'中信三级行业',
-                            'INDUSTRY_SW_2021':'申万三级行业'})
-        # 合并两个字段数据
-        df = pd.concat([df, df_1, df_2, df_3, df_4], axis=1)
+def get_index_constituents(index, end_date):
+    constituents = w.wset("indexconstituent",
+            f"windcode={index};",
+            "field=wind_code,sec_name,i_weight,industry",
+            usedf=True)[1].set_index('wind_code')
+    return compact_frame(constituents, categories=['industry'], floats=['i_weight'])
+
+# 缓存指数成分股数据
+@st.cache_data(show_spinner=False)
+def get_index_component_data(indexes, end_date):
+    # 获取指数名称
+    index_name = get_information_data(indexes)['指数名称']
+
+    # 获取各指数成分股代码、名称与权重
+    constituents = {}
+    for index in indexes:
+        constituents[index] = get_index_constituents(index, end_date)
+
+    # 取所有指数成分股的并集，重叠成分股（如沪深300与中证800）只请求一次
+    all_stocks = list(dict.fromkeys(code for df in constituents.values() for code in df.index))
+    stock_fields = get_stock_fields(all_stocks, end_date)
+
+    # 将个股字段数据按指数拆分回各指数的成分股
+    index_component_data = []
+    for index, df in constituents.items():
+        df = df.join(stock_fields, how='left')
         # 重命名字段并输出
-        df = df.reset_index().rename(columns={
-            'index':'股票代码',
+        df = df.rename_axis('股票代码').reset_index().rename(columns={
             'sec_name':'股票名称',
             'i_weight':'权重',
-            'industry':'行业',
-            'EV':'总市值',
-            'MKT_FREESHARES':'自由流通市值',
-            'NETPROFIT_TTM2':'归母净利润TTM',
-            'VAL_DIVIDENDYIELD3':'股息率TTM'})
-        df[['总市值', '自由流通市值', '归母净利润TTM']] = df[['总市值', '自由流通市值', '归母净利润TTM']].map(lambda x: round(x / 100000000, 2))
+            'industry':'行业'})
 
         # 合并指数代码和指数名
         df['指数代码'] = index
-        index_name = get_information_data(_indexes)['指数名称']
-        df = pd.merge(df,
-                    index_name,
-                    left_on='指数代码',
-                    right_on=index_name.index,
-                    how='left'  # 即使右表无对应代码，左表数据仍保留
-                    )
+        df['指数名称'] = index_name.get(index)
 
-        index_component_data = pd.concat([index_component_data, df], axis=0)
-    
-    return index_component_data
+        index_component_data.append(df)
+
+    if not index_component_data:
+        return pd.DataFrame()
+    # 合并后统一列类型：行业、指数代码和指数名称为category，数值列为float32，股票代码和名称为Arrow字符串
+    return compact_frame(pd.concat(index_component_data, axis=0, ignore_index=True),
+                         categories=['行业', *INDUSTRY_COLUMNS, '指数代码', '指数名称'],
+                         floats=STOCK_VALUE_COLUMNS)
 
 # 缓存指数基础信息数据
-@st.cache_data
+@st.cache_data(show_spinner=False)
 def get_information_data(indexes):
     """获取指数基本信息"""
     information_data = w.wss(indexes, 
@@ -211,169 +288,175 @@ def get_information_data(indexes):
                     'CRM_ISSUER':'编制公司',
                     'EXCHANGE_CN':'交易所'}
                     )
-    return information_data
+    return compact_frame(information_data, categories=['指数类别', '编制公司', '交易所'],
+                         floats=['成分股个数'], dates=['基准日', '发布日期'])
 
-# 缓存指数收益风险数据
-@st.cache_data
-def get_risk_data(indexes, start_date=None, end_date=None):
-    # 用户可用控制条选择计算的区间长度
-    if start_date is None:
-        end_date = st.session_state.start_date
-    if end_date is None:
-        end_date = st.session_state.end_date
-
-    risk_table = w.wss(indexes, 
-      "sec_name,pct_chg_per,turn_per,stdevry,sharpe,risk_calmar,risk_maxupside2,risk_maxdownside2,risk_maxdownside_date",
-      f"startDate={start_date};",
-      f"endDate={end_date};",
-      "bondPriceType=2;",
-      "period=2;returnType=1",
-      "yield=1",
-      usedf=True)[1]
-
-    beta_table = pd.DataFrame()
-    # for index in indexes:
-    #     beta_table[f'Beta/弹性（以{index}为基准）'] = w.wss(indexes, 
-    #     "beta",
-    #     f"startDate={start_date};endDate={end_date};period=2;returnType=1;index={index}",
-    #     usedf=True)[1]
-    
-    beta_table['Beta'] = w.wss(indexes, 
-        "beta",
-        f"startDate={start_date};endDate={end_date};period=2;returnType=1;index=881001.wi",
-        usedf=True)[1]
+# 计算Beta使用的基准指数（万得全A）
+BETA_BENCHMARK = "881001.WI"
 
-    risk_table = risk_table.rename(columns={
-    'SEC_NAME':'指数名称',
-    'PCT_CHG_PER':'区间涨跌幅',
-    'TURN_PER':'区间换手率',
-    'RISK_MAXUPSIDE2':'最大上涨',
-    'RISK_MAXDOWNSIDE2':'最大回撤',
-    'RISK_MAXDOWNSIDE_DATE':'最大回撤起止日期',
-    'SHARPE':'区间年化夏普比率',
-    'STDEVRY':'区间年化波动率',
-    'RISK_CALMAR':'区间年化卡玛比率',
-    })
-
-    return risk_table.round(2), beta_table.round(2)
-
-# 缓存指数PB
-@st.cache_data
-def get_PB(indexes):
+# 获取计算收益风险指标所需的收盘价、基准收盘价和换手率序列
+def get_risk_series(indexes, start_date, end_date):
+    # 多取起始日之前的数据，以起始日前最后一个交易日的收盘价为基期
+    base_date = (pd.Timestamp(start_date) - pd.Timedelta(days=15)).strftime('%Y-%m-%d')
+    close = get_index_data(indexes, base_date, end_date)
+    benchmark = series_store.get([BETA_BENCHMARK], "close", base_date, end_date, fetch_wsd)[BETA_BENCHMARK]
+    turnover = series_store.get(indexes, "turn", start_date, end_date, fetch_wsd)
+    return close, benchmark, turnover
+
+# 缓存指数收益风险数据，由本地收盘价和换手率序列计算，缓存时长与序列存储中当天数据的有效时长一致
+@st.cache_data(ttl=INTRADAY_TTL, show_spinner=False)
+def get_risk_data(indexes, start_date, end_date):
+    close, benchmark, turnover = get_risk_series(indexes, start_date, end_date)
+
+    risk_table = risk_metrics(close, start_date, end_date, turnover=turnover)
+    risk_table.insert(0, '指数名称', get_information_data(indexes)['指数名称'])
+
+    # 所有指数及万得全A两两之间的Beta矩阵，行为指数，列为基准
+    window = window_close(pd.concat([close, benchmark], axis=1), start_date, end_date)
+    beta_table = beta_matrix(window).loc[indexes]
+
+    return compact_frame(risk_table.round(2), categories=['指数名称']), beta_table.round(2)
+
+# 获取指数PB
+def get_PB(indexes, start_date, end_date):
     """获取指数估值数据"""
-    PB = w.wsd(indexes, 
-                "pb_lf",
-                f"{st.session_state.start_date}", f"{st.session_state.end_date}",
-                usedf=True)[1]
+    PB = series_store.get(indexes, "pb_lf", start_date, end_date, fetch_wsd)
     return PB
 
-# 缓存指数PE
-@st.cache_data
-def get_PE(indexes):
+# 获取指数PE
+def get_PE(indexes, start_date, end_date):
     """获取指数估值数据"""
-    PE = w.wsd(indexes, 
-                "pe_ttm",
-                f"{st.session_state.start_date}", f"{st.session_state.end_date}",
-                usedf=True)[1]
+    PE = series_store.get(indexes, "pe_ttm", start_date, end_date, fetch_wsd)
     return PE
 
-# 缓存指数PE/PB分位数
-@st.cache_data
-def get_PE_PB_percentile(indexes):
-    """获取市盈率和市净率分位数"""
-    PE_PB_percentile = w.wss(indexes, 
-        "val_pb_percentile,val_pe_percentile",
-        f"tradeDate={st.session_state.end_date};startDate={st.session_state.start_date};endDate={st.session_state.end_date}",
-        usedf=True)[1]
-    PE_PB_percentile.rename(columns={'VAL_PB_PERCENTILE':'市净率分位数',
-                                     'VAL_PE_PERCENTILE':'市盈率分位数'},
-                            inplace=True)
+# 估值分位数的计算窗口，None为区间内全部历史（扩展窗口），其余为滚动窗口的交易日数
+VALUATION_WINDOWS = {'区间全部历史': None, '滚动三年': 750, '滚动五年': 1250}
+
+# 由本地PE/PB序列逐日计算估值分位数及均值、标准差
+def get_valuation_percentile(indexes, field, start_date, end_date, window=None):
+    valuation = series_store.get(indexes, field, start_date, end_date, fetch_wsd)
+    return percentile_engine.get(valuation, field, window)
+
+# 获取指数PE/PB分位数
+def get_PE_PB_percentile(indexes, start_date, end_date):
+    """获取区间最后一个交易日的市盈率和市净率分位数"""
+    PE_percentile = get_valuation_percentile(indexes, "pe_ttm", start_date, end_date)
+    PB_percentile = get_valuation_percentile(indexes, "pb_lf", start_date, end_date)
+    latest = lambda frames: {code: frame['分位数'].iloc[-1] if not frame.empty else np.nan for code, frame in frames.items()}
+    PE_PB_percentile = pd.DataFrame({'市净率分位数': latest(PB_percentile),
+                                     '市盈率分位数': latest(PE_percentile)})
     return PE_PB_percentile
 
+# 从万德获取指数某一年度的年报营收和归母净利润
+def fetch_annual_report(indexes, year):
+    error_code, df = w.wss(indexes,
+        "oper_rev,np_belongto_parcomsh",
+        f"unit=1;rptDate={year}1231;rptType=1",
+        usedf=True)
+    if error_code != 0:
+        return None
+    return df
+
+# 获取指数某一年度的营收和净利润一致预期，历史交易日的预期值保存在年报数据存储中
+def get_consensus_forecast(indexes, year, end_date):
+    def fetch(missing_indexes):
+        error_code, df = w.wss(missing_indexes,
+            "est_sales,est_netprofit",
+            f"unit=1;year={year};tradeDate={end_date}",
+            usedf=True)
+        if error_code != 0:
+            return None
+        return df
+
+    return earnings_store.get_forecast(indexes, year, end_date, ['EST_SALES', 'EST_NETPROFIT'], fetch)
+
 # 缓存指数盈利数据
-@st.cache_data
-def get_earning_data(indexes):
+@st.cache_data(show_spinner=False)
+def get_earning_data(indexes, end_date):
     """获取营收和净利润数据，以及一致预测数据"""
-    # 首先获取当前年份，判断上一年年报出了没
-    curr_year = st.session_state.end_date[:4]
-    # 获取上一年度
-    last_year = str(int(curr_year) - 1)
-    # 实验获取去年年报预测数据，如果没有预测数据，那么就已经出去年的年报了，否则还没出
-    last_year_return = w.wss(indexes,
-        "est_netprofit",
-        f"unit=1;year={last_year};tradeDate={st.session_state.end_date}",
-        usedf=True)[1]  
-    # 判断上一年度是否有年报,即所有数据是否都是NaN
-    if last_year_return.isnull().all().all():
-        # 获取年份时间序列，包括当年年份前五年和后三年
-        years = [int(last_year) - i for i in range(-3,5)]
+    curr_year = int(end_date[:4])
+    last_year = curr_year - 1
+    report_fields = ['OPER_REV', 'NP_BELONGTO_PARCOMSH']
+
+    # 判断上一年度年报是否已披露：已披露的年报保存在本地，未披露时只需这一次小请求
+    last_report = earnings_store.get(indexes, [last_year], report_fields, fetch_annual_report)[last_year]
+    if last_report.notna().all().all():
+        # 上一年度年报出了，以上一年度为最近的历史年度
+        latest_year = last_year
     else:
-        # 上一年度年报出了，以当前年度为基准    
-        years = [int(curr_year) - i for i in range(-3,5)]
-    years.sort()
-
-    # 初始化两个数据帧用于存放收入和利润数据
-    income_data = pd.DataFrame()
-    profit_data = pd.DataFrame()
-    for year in years[:5]:
-        # 获取过去五年历史数据
-        df1 = w.wss(indexes,
-            "oper_rev,np_belongto_parcomsh",
-            f"unit=1;rptDate={year}1231;rptType=1",
-            usedf=True)[1]
-        # 合并数据
-        income_data = pd.concat([income_data, df1['OPER_REV']], axis=1).rename(columns={'OPER_REV': year})
-        profit_data = pd.concat([profit_data, df1['NP_BELONGTO_PARCOMSH']], axis=1).rename(columns={'NP_BELONGTO_PARCOMSH': year})
-    for year in years[5:]:
-        # 获取未来三年一致预期数据
-        df2 = w.wss(indexes,
-            "est_sales,est_netprofit",
-            f"unit=1;year={year};tradeDate={st.session_state.end_date}",
-            usedf=True)[1]
-        # 合并数据
-        income_data = pd.concat([income_data, df2['EST_SALES']], axis=1).rename(columns={'EST_SALES': f'{year}E'})
-        profit_data = pd.concat([profit_data, df2['EST_NETPROFIT']], axis=1).rename(columns={'EST_NETPROFIT': f'{year}E'})
-    
+        # 上一年度年报还没出，以前一年度为最近的历史年度
+        latest_year = last_year - 1
+    # 过去五年历史数据和未来三年一致预期数据
+    history_years = list(range(latest_year - 4, latest_year + 1))
+    forecast_years = list(range(latest_year + 1, latest_year + 4))
+
+    # 历史年报优先从本地读取，一致预期每个年度一次请求；万德会话串行处理请求，依次发出
+    history = earnings_store.get(indexes, history_years, report_fields, fetch_annual_report)
+    forecasts = {year: get_consensus_forecast(indexes, year, end_date) for year in forecast_years}
+
+    # 合并数据
+    income_data = pd.DataFrame({
+        **{year: history[year]['OPER_REV'] for year in history_years},
+        **{f'{year}E': forecasts[year]['EST_SALES'] for year in forecast_years}})
+    profit_data = pd.DataFrame({
+        **{year: history[year]['NP_BELONGTO_PARCOMSH'] for year in history_years},
+        **{f'{year}E': forecasts[year]['EST_NETPROFIT'] for year in forecast_years}})
+
     # 单位处理，将单位从万元转换为亿元
     income_data = income_data / 100000000
     profit_data = profit_data / 100000000
 
     return income_data, profit_data
 
-# 缓存指数前20大成分股数据
-@st.cache_data
-def get_top20_concentration(_indexes):
-    """计算前20大成分股集中度"""
+# 缓存指数行业暴露数据立方体
+@st.cache_data(show_spinner=False)
+def get_industry_cube(indexes, end_date):
+    """
+    按 指数 × 行业分类标准 × 行业 统计成分股数量和权重，成分股加载后只分组一次。
+
+    返回的DataFrame以(分类标准, 行业)为索引，列为(统计口径, 指数代码)，统计口径为"数量"和"权重"。
+    """
+    component_data = get_index_component_data(indexes, end_date)
+    return industry_cube(component_data, indexes, INDUSTRY_COLUMNS)
+
+# 前N大成分股数量，调整数量不会增加万德请求次数
+TOP_N = 20
+
+# 缓存指数前N大成分股数据
+@st.cache_data(show_spinner=False)
+def get_top_concentration(indexes, end_date, top_n=TOP_N):
+    """计算前N大成分股集中度，并一次性获取所有指数前N大成分股的近三个月股价"""
     # 获取成分股数据
-    component_data = get_index_component_data(_indexes)
-    
-    # 计算每个指数的前20大成分股集中度
-    concentration_data = {}
-    stock_data = {}
-
-    for index in _indexes:
-        # 筛选出当前指数的成分股
-        index_components = component_data[component_data['指数代码'] == index].copy().set_index('股票代码')
-        # 按权重排序
-        index_components = index_components.sort_values('权重', ascending=False)
-        # 取前20大成分股
-        index_df_top20 = index_components.head(20)
-        # 计算权重和
-        concentration = index_df_top20['权重'].sum()
-        concentration_data[index] = concentration
-
-        # 获取前20只成分股近三个月股价信息
-        stock_data[index] = w.wsd(index_df_top20.index.tolist(), "close", "ED-3M", f"{st.session_state.end_date}", usedf=True)[1]
-
-    return pd.Series(concentration_data), stock_data
+    component_data = get_index_component_data(indexes, end_date)
 
-# 缓存指数跟踪基金数据
+    # 计算每个指数的前N大成分股及其集中度
+    concentration_data, top_codes, all_codes = top_constituents(component_data, indexes, top_n)
+
+    # 所有指数的前N大成分股去重后一次获取近三个月股价信息
+    start_date = (pd.Timestamp(end_date) - pd.DateOffset(months=3)).strftime('%Y-%m-%d')
+    stock_prices = series_store.get(all_codes, "close", start_date, end_date, fetch_wsd)
+
+    return concentration_data, top_codes, stock_prices
+
+# 成分股原始数据表格中显示热力图的数值列
+CONSTITUENT_GRADIENT_COLUMNS = ['总市值', '自由流通市值', '归母净利润TTM', '股息率TTM']
+
+# 缓存单个指数的成分股原始数据表格及其热力图分箱，翻页、排序和筛选时不再重新计算
 @st.cache_data
-def get_tracking_funds(indexes):
+def get_constituent_view(indexes, end_date, index_code):
+    """返回按权重降序排列、以股票代码为索引的成分股数据，以及数值列的热力图分箱编号"""
+    component_data = get_index_component_data(indexes, end_date)
+    view = component_data.loc[component_data['指数代码'] == index_code].set_index('股票代码')
+    view = view.sort_values('权重', ascending=False, kind='stable')
+    return view, gradient_bins(view, CONSTITUENT_GRADIENT_COLUMNS)
+
+# 缓存指数跟踪基金数据
+@st.cache_data(show_spinner=False)
+def get_tracking_funds(indexes, end_date):
     """获取跟踪指数的所有基金信息"""
     tracking_funds_data = {}
     for index in indexes:
-        tracking_funds_data[index] = w.wset("indexrelevancefund",f"date={st.session_state.end_date};windcode={index}",usedf=True)[1]
+        tracking_funds_data[index] = w.wset("indexrelevancefund",f"date={end_date};windcode={index}",usedf=True)[1]
         tracking_funds_data[index].rename(columns={
             'fundcode':'基金代码',
             'fundname':'基金名称',
@@ -454,6 +537,31 @@ select = alt.selection_point(name="select", on="click", fields=['股票代码'])
 highlight = alt.selection_point(name="highlight", on="pointerover", empty=False)
 legend_selection = alt.selection_point(fields=['指数名称'])
 
+# 显示万德登录提示
+def show_wind_error(e):
+    """万德终端无法连接时提示用户登录"""
+    st.error(
+        """
+        **请登录万德账号**
+        Connection error: %s
+    """
+        % e.reason
+    )
+
+# 板块内捕获万德连接错误
+def handle_wind_errors(func):
+    """
+    板块以@st.fragment运行，其中抛出的异常会被fragment包装后重新抛出，main中无法按URLError捕获，
+    因此在每个板块内部捕获连接错误并显示同样的登录提示。
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        except URLError as e:
+            show_wind_error(e)
+    return wrapper
+
 # 高亮显示默认参数功能
 def highlight_select():
     stroke_width = (
@@ -486,22 +594,83 @@ def zscore_normalize(data):
     else:
         return pd.Series(0, index=data.index)
 
+# 分页表格共用的热力图配色，下标为分箱编号
+GRADIENT_PALETTE = gradient_palette()
+
+# 筛选、排序条件变化后回到第一页
+def reset_page(key):
+    st.session_state[f"{key}_page"] = 1
+
+# 服务端分页显示表格
+def show_paged_table(data, key, bins=None, formats=None):
+    """
+    在服务端完成筛选、排序和分页，只对当前页着色并发送到浏览器。
+
+    参数:
+    data (pd.DataFrame): 表格数据，索引需唯一
+    key (str): 控件键前缀，同一页面内唯一
+    bins (pd.DataFrame): 与data行对齐的热力图分箱编号，为None时不着色
+    formats (dict): 各列的显示格式，同Styler.format
+    """
+    col1, col2, col3, col4 = st.columns([3, 2, 2, 1])
+    with col1:
+        keyword = st.text_input("筛选", key=f"{key}_filter", placeholder="输入代码、名称或行业关键字",
+                                on_change=reset_page, args=(key,))
+    with col2:
+        sort_by = st.selectbox("排序列", [None, *data.columns], key=f"{key}_sort",
+                               format_func=lambda col: "默认顺序" if col is None else col,
+                               on_change=reset_page, args=(key,))
+    with col3:
+        ascending = st.radio("排序方向", ["降序", "升序"], key=f"{key}_order", horizontal=True,
+                             on_change=reset_page, args=(key,)) == "升序"
+
+    positions = query_rows(data, keyword, sort_by, ascending)
+    pages = page_count(len(positions))
+    # 页码只通过Session State设置初始值；数据更新后页数减少时，将页码调整到最后一页
+    page_key = f"{key}_page"
+    if page_key not in st.session_state:
+        st.session_state[page_key] = 1
+    elif st.session_state[page_key] > pages:
+        st.session_state[page_key] = pages
+    with col4:
+        page = st.number_input("页码", min_value=1, max_value=pages, step=1, key=page_key)
+
+    page_positions = positions[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+    styled_page = data.iloc[page_positions].style
+    if bins is not None:
+        styled_page = styled_page.apply(lambda __: page_styles(bins, page_positions, GRADIENT_PALETTE),
+                                        axis=None, subset=list(bins.columns))
+    if formats:
+        styled_page = styled_page.format(formats, na_rep="")
+    st.dataframe(styled_page, use_container_width=True)
+    st.caption(f"共{len(positions)}行，第{page}/{pages}页，每页{PAGE_SIZE}行")
+
 # ————————————————————————————————————————————绘图函数模块————————————————————————————————————————————
 
+# 页面各板块均以st.fragment运行，板块内的控件变化时只重新运行该板块，不重跑整个页面
+
 # 显示指数基本信息
+@st.fragment
+@handle_wind_errors
 def show_information(indexes):
     """绘制指数基本信息表格"""
     information_table = get_information_data(indexes)
-    st.dataframe(information_table.T, use_container_width=True)
+    # 转置后每列会混合文本、日期和数值，先按字段格式化为文本，转置后仍为Arrow字符串列
+    display_table = information_table.assign(**{
+        col: information_table[col].dt.strftime('%Y-%m-%d') for col in ['基准日', '发布日期']
+    }, 成分股个数=information_table['成分股个数'].round().astype('Int64'))
+    st.dataframe(display_table.astype('string[pyarrow]').T, use_container_width=True)
 
 # 显示指数过去5年历史走势和收益率走势
+@st.fragment
+@handle_wind_errors
 def show_plot(indexes):
     """绘制指数走势折线图"""
     # 获取万德的宽格式数据
-    wide_data = get_index_data(indexes)
+    wide_data = get_index_data(indexes, st.session_state.start_date, st.session_state.end_date)
 
     # 创建标签页，使用标签页切换功能显示
-    tabs = st.tabs(["收益率走势", "价格走势"])
+    tabs = st.tabs(["收益率走势", "价格走势", "滚动指标"])
 
     # 获取指数名称
     index_name = get_information_data(indexes)['指数名称']
@@ -544,11 +713,15 @@ def show_plot(indexes):
                             how='left'  # 即使右表无对应代码，左表数据仍保留
                             )
 
+        # 按屏幕分辨率对每条序列降采样，缩小时间范围即可看到完整细节
+        chart_data = downsample_long(long_data, 'date', 'return', 'order_book_id')
+
         # --- 核心代码仅需一行 ---
         fig = px.line(
-            long_data,
+            chart_data,
             x='date',
             y='return',
+            render_mode='webgl' if use_webgl(len(chart_data)) else 'svg',
             color='指数名称',  # 使用 '指数名称' 列来区分不同线条
             title='指数收益率走势对比',
             labels={
@@ -575,6 +748,14 @@ def show_plot(indexes):
 
         st.plotly_chart(fig)
 
+        # 按滑块选定的区间在本地重新计算收益风险指标，以基期收盘价为基准与上图一致
+        # 基准和换手率序列与收益风险表格共用，已加载的区间直接从内存切片
+        __, benchmark, turnover = get_risk_series(indexes, st.session_state.start_date, st.session_state.end_date)
+        window_metrics = risk_metrics(wide_data.loc[base_date:end_date], base_date, end_date, benchmark=benchmark, turnover=turnover)
+        window_metrics = window_metrics.rename(index=index_name.to_dict())
+        st.caption(f"{base_date.strftime('%Y-%m-%d')}至{end_date.strftime('%Y-%m-%d')}区间收益风险指标")
+        st.dataframe(window_metrics.round(2), use_container_width=True)
+
         st.download_button(
             label="点击下载原始数据",
             data=normalized_data.to_csv(index=True).encode('utf-8'),
@@ -606,11 +787,15 @@ def show_plot(indexes):
                             how='left'  # 即使右表无对应代码，左表数据仍保留
                             )
 
+        # 按屏幕分辨率对每条序列降采样，缩小时间范围即可看到完整细节
+        chart_data = downsample_long(long_data, 'date', 'close', 'order_book_id')
+
         # --- 核心代码仅需一行 ---
         fig = px.line(
-            long_data,
+            chart_data,
             x='date',
             y='close',
+            render_mode='webgl' if use_webgl(len(chart_data)) else 'svg',
             color='指数名称',  # 使用 '指数名称' 列来区分不同线条
             title='指数价格走势对比',
             labels={
@@ -645,7 +830,58 @@ def show_plot(indexes):
             icon=":material/download:",
         )
 
+    with tabs[2]:
+        show_rolling_metrics(indexes, wide_data, index_name)
+
+# 显示滚动波动率、Beta和相关系数
+def show_rolling_metrics(indexes, wide_data, index_name):
+    """由本地收盘价计算滚动窗口指标并绘制折线图"""
+    names = index_name.to_dict()
+    names.setdefault(BETA_BENCHMARK, "万得全A")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        window = st.selectbox("滚动窗口（交易日）", ROLLING_WINDOWS, index=1, key="rolling_window")
+    with col2:
+        benchmark_code = st.selectbox("Beta基准指数", indexes + [BETA_BENCHMARK],
+                                      index=len(indexes), format_func=lambda code: names.get(code, code),
+                                      key="rolling_benchmark")
+
+    returns = wide_data.sort_index().pct_change(fill_method=None)
+    if benchmark_code in returns.columns:
+        benchmark = returns[benchmark_code]
+    else:
+        benchmark = series_store.get([benchmark_code], "close", st.session_state.start_date, st.session_state.end_date, fetch_wsd)[benchmark_code]
+        benchmark.index = pd.to_datetime(benchmark.index)
+        benchmark = benchmark.reindex(returns.index).pct_change(fill_method=None)
+
+    volatility = rolling_volatility(returns, window).rename(columns=names)
+    beta = rolling_beta(returns, benchmark, window).rename(columns=names)
+    correlation = rolling_correlation(returns, window)
+    correlation.columns = [f"{names.get(a, a)} / {names.get(b, b)}" for a, b in correlation.columns]
+
+    charts = [(volatility, f"{window}日滚动年化波动率", "年化波动率(%)", "%{y:.2f}%"),
+              (beta, f"{window}日滚动Beta（以{names.get(benchmark_code, benchmark_code)}为基准）", "Beta", "%{y:.2f}"),
+              (correlation, f"{window}日滚动相关系数", "相关系数", "%{y:.2f}")]
+    for data, title, y_title, hover in charts:
+        if data.empty:
+            continue
+        # 相关系数最多有28对，每条序列按屏幕分辨率降采样，点数仍较多时使用WebGL渲染
+        chart_data = downsample_wide(data, 'value', '指数名称')
+        fig = px.line(chart_data, x='date', y='value', color='指数名称', title=title,
+                      render_mode='webgl' if use_webgl(len(chart_data)) else 'svg')
+        fig.update_traces(hovertemplate=hover)
+        fig.update_layout(
+            hovermode='x unified',
+            xaxis_title='日期',
+            yaxis_title=y_title,
+            legend_title='指数名称'
+        )
+        st.plotly_chart(fig)
+
 # 显示指数估值图表
+@st.fragment
+@handle_wind_errors
 def show_valuation_chart(indexes):
     """绘制指数收益估值图表"""
     # 获取指数名称
@@ -653,11 +889,10 @@ def show_valuation_chart(indexes):
     
     # 获取数据
     # 获取未来三年一致预期数据
-    income_data, profit_data = get_earning_data(indexes)
-    # 获取PE、PB和其分位数数据
-    PE = get_PE(indexes)
-    PB = get_PB(indexes)
-    PE_PB_percentile = get_PE_PB_percentile(indexes)
+    income_data, profit_data = get_earning_data(indexes, st.session_state.end_date)
+    # 获取PE、PB数据，分位数在各标签页中按选定的窗口计算
+    PE = get_PE(indexes, st.session_state.start_date, st.session_state.end_date)
+    PB = get_PB(indexes, st.session_state.start_date, st.session_state.end_date)
 
     # 创建标签页
     tabs = st.tabs([name for name in index_info['指数名称']])
@@ -724,37 +959,63 @@ def show_valuation_chart(indexes):
                 )
 
             with col2:
-                selected_valuation = st.radio("选择数据", ['PE','PB'], key=f"valuation_{i}")
-                if selected_valuation == 'PE':
-                    selected_series = PE[index_code]
-                    selected_percentile = PE_PB_percentile.loc[index_code,'市盈率分位数']
-                else:
-                    selected_series = PB[index_code]
-                    selected_percentile = PE_PB_percentile.loc[index_code,'市净率分位数']
+                radio_col, window_col = st.columns(2)
+                with radio_col:
+                    selected_valuation = st.radio("选择数据", ['PE','PB'], key=f"valuation_{i}")
+                with window_col:
+                    selected_window = st.radio("分位数窗口", list(VALUATION_WINDOWS), key=f"percentile_window_{i}")
+                field = "pe_ttm" if selected_valuation == 'PE' else "pb_lf"
+                selected_series = (PE if selected_valuation == 'PE' else PB)[index_code]
+                percentile = get_valuation_percentile([index_code], field,
+                                                      st.session_state.start_date, st.session_state.end_date,
+                                                      VALUATION_WINDOWS[selected_window])[index_code]
                 
+                # 按屏幕分辨率对估值、通道和分位数序列降采样，总点数较多时使用WebGL渲染
+                # 下载按钮导出完整序列，降采样后的序列只用于绘图
+                chart_series = downsample_series(selected_series)
+                bands = [(downsample_series(percentile['均值'] + percentile['标准差']), '均值±1倍标准差', 'dot', True),
+                         (downsample_series(percentile['均值']), '均值', 'dash', True),
+                         (downsample_series(percentile['均值'] - percentile['标准差']), '均值±1倍标准差', 'dot', False)]
+                percentile_series = downsample_series(percentile['分位数'])
+                n_points = len(chart_series) + len(percentile_series) + sum(len(band) for band, *__ in bands)
+                Scatter = go.Scattergl if use_webgl(n_points) else go.Scatter
+
                 # 创建带有副坐标轴的子图
                 fig2 = make_subplots(specs=[[{"secondary_y": True}]])
                 
+                # 添加均值±1倍标准差通道
+                for band, band_name, dash, show_legend in bands:
+                    fig2.add_trace(
+                        Scatter(
+                            x=band.index,
+                            y=band.values,
+                            name=band_name,
+                            legendgroup=band_name,
+                            showlegend=show_legend,
+                            line=dict(color='gray', dash=dash, width=1)
+                        ),
+                        secondary_y=False,
+                    )
+
                 # 添加估值折线图
                 fig2.add_trace(
-                    go.Scatter(
-                        x=selected_series.index, 
-                        y=selected_series.values, 
+                    Scatter(
+                        x=chart_series.index, 
+                        y=chart_series.values, 
                         name=f'{selected_valuation}',
                         line=dict(color='blue')
                     ),
                     secondary_y=False,
                 )
                 
-                # 添加分位数线
+                # 添加逐日分位数走势
                 fig2.add_trace(
-                    go.Scatter(
-                        x=[selected_series.index[0], selected_series.index[-1]],
-                        y=[selected_percentile, selected_percentile],
+                    Scatter(
+                        x=percentile_series.index,
+                        y=percentile_series.values,
                         name='分位数',
-                        line=dict(color='red', dash='dash'),
-                        text=[f'{selected_valuation}分位数: {selected_percentile:.2f}'],
-                        yaxis="y2"
+                        line=dict(color='red', width=1),
+                        hovertemplate="%{y:.2f}%"
                     ),
                     secondary_y=True,
                 )
@@ -762,7 +1023,7 @@ def show_valuation_chart(indexes):
                 # 设置坐标轴标题
                 fig2.update_xaxes(title_text="日期")
                 fig2.update_yaxes(title_text=f"{selected_valuation}", secondary_y=False)
-                fig2.update_yaxes(title_text="分位数", secondary_y=True)
+                fig2.update_yaxes(title_text="分位数(%)", secondary_y=True)
                 
                 # 设置图表标题
                 fig2.update_layout(title_text=f'{name}近五年{selected_valuation}走势和分位数',
@@ -779,32 +1040,24 @@ def show_valuation_chart(indexes):
                 )
 
 # 显示指数风险收益特征表格
+@st.fragment
+@handle_wind_errors
 def show_risk_table(index_codes):
     # 由用户在现有的指数中选定一个指数作为基准指数
     if len(index_codes) > 1:
-        # 选择基准指数
-        # selected_index = st.selectbox("选择基准指数", index_codes)
-
-        # 使用侧边栏中选择的日期
+        # 使用侧边栏中选择的日期，Beta矩阵已包含以每个指数为基准的结果，切换基准无需重新请求
         risk_table_precise, beta_table = get_risk_data(index_codes, st.session_state.start_date, st.session_state.end_date)
-        
-        # 确保要访问的列存在于beta_table中
-        # beta_column_name = f'Beta/弹性（以{selected_index}为基准）'
-        # if beta_column_name in beta_table.columns:
-        risk_table_precise = pd.concat([beta_table, risk_table_precise], axis=1)
-        risk_table_precise.set_index("指数名称", inplace=True)
-        # else:
-        #     st.warning(f"未找到Beta列: {beta_column_name}")
-        #     # 可以选择使用第一列或其他默认列
-        #     if not beta_table.empty:
-        #         first_column = beta_table.columns[0]
-        #         risk_table_precise = pd.concat([risk_table_precise, beta_table[first_column]], axis=1)
-        #         st.info(f"使用默认Beta列: {first_column}")
+        names = risk_table_precise['指数名称'].to_dict()
+        names[BETA_BENCHMARK] = "万得全A"
 
-        # 确保DataFrame列类型与Arrow兼容
-        for col in risk_table_precise.columns:
-            if risk_table_precise[col].dtype == 'object':
-                risk_table_precise[col] = risk_table_precise[col].astype(str)
+        # 选择基准指数
+        selected_index = st.selectbox("选择基准指数", beta_table.columns.tolist(),
+                                      index=beta_table.columns.get_loc(BETA_BENCHMARK),
+                                      format_func=lambda code: names.get(code, code),
+                                      key="beta_benchmark")
+        beta_column_name = f'Beta/弹性（以{names[selected_index]}为基准）'
+        risk_table_precise = pd.concat([beta_table[selected_index].rename(beta_column_name), risk_table_precise], axis=1)
+        risk_table_precise.set_index("指数名称", inplace=True)
 
         # 使用pandas.style添加热力图显示功能
         # 对数值列应用热力图样式
@@ -818,10 +1071,78 @@ def show_risk_table(index_codes):
         else:
             st.dataframe(risk_table_precise, use_container_width=True)
 
+        # 显示完整的Beta矩阵
+        with st.expander("查看指数两两之间的Beta矩阵（行为指数，列为基准）"):
+            beta_matrix_table = beta_table.rename(index=names, columns=names)
+            st.dataframe(beta_matrix_table.style.background_gradient(cmap='Oranges').format("{:.2f}"), use_container_width=True)
+
     else:
         st.info("当前仅选择了一个指数，如需对比相对指数，请添加更多指数。")
 
+# 显示指数回撤区间和水下曲线
+@st.fragment
+@handle_wind_errors
+def show_drawdown(index_codes):
+    """由本地收盘价识别回撤区间，绘制水下曲线并列出各段回撤的修复情况"""
+    close = get_index_data(index_codes, st.session_state.start_date, st.session_state.end_date)
+    names = get_information_data(index_codes)['指数名称'].to_dict()
+
+    threshold = st.slider("回撤幅度阈值(%)", min_value=1, max_value=50, value=10, key="drawdown_threshold")
+
+    # 水下曲线
+    drawdown = underwater(close).rename(columns=names)
+    chart_data = downsample_wide(drawdown, '回撤', '指数名称')
+    fig = px.line(chart_data, x='date', y='回撤', color='指数名称', title='指数水下曲线（相对前期最高点的回撤）',
+                  render_mode='webgl' if use_webgl(len(chart_data)) else 'svg')
+    fig.update_traces(fill='tozeroy', hovertemplate="%{y:.2f}%")
+    fig.update_layout(
+        hovermode='x unified',
+        xaxis_title='日期',
+        yaxis_title='回撤(%)',
+        legend_title='指数名称'
+    )
+    st.plotly_chart(fig)
+
+    # 回撤区间表格
+    episodes = drawdown_episodes(close, threshold)
+    if episodes.empty:
+        st.info(f"所选区间内没有超过{threshold}%的回撤")
+        return
+    episodes.insert(0, '指数名称', episodes.pop('代码').map(names))
+    for col in ['峰值日期', '谷底日期', '修复日期']:
+        episodes[col] = episodes[col].dt.strftime('%Y-%m-%d').fillna('未修复')
+    st.dataframe(
+        episodes.style.background_gradient(cmap='Oranges_r', subset=['回撤幅度(%)']).format({'回撤幅度(%)': "{:.2f}", '修复天数': "{:.0f}"}, na_rep='-'),
+        hide_index=True,
+        use_container_width=True
+    )
+    st.caption("下跌天数、修复天数和水下天数均为交易日数，水下天数为峰值日至修复日（未修复时至区间最后一个交易日）。")
+
+# 显示指数两两之间的成分股重合度
+@st.fragment
+@handle_wind_errors
+def show_overlap(index_codes, df):
+    """基于稀疏权重矩阵计算成分股数量重合、权重重合度和主动份额"""
+    if len(index_codes) < 2:
+        st.info("当前仅选择了一个指数，如需对比成分股重合度，请添加更多指数。")
+        return
+
+    overlap = overlap_tables(df, index_codes)
+    names = get_information_data(index_codes)['指数名称'].to_dict()
+
+    tabs = st.tabs(list(overlap))
+    for tab, (title, table) in zip(tabs, overlap.items()):
+        with tab:
+            table = table.rename(index=names, columns=names)
+            cmap = 'Oranges_r' if title == "主动份额(%)" else 'Oranges'
+            number_format = "{:.0f}" if title == "共同成分股数量" else "{:.2f}"
+            st.dataframe(table.style.background_gradient(cmap=cmap).format(number_format, na_rep="-"), use_container_width=True)
+
+    st.caption("权重重合度为两个指数共同成分股权重较小值之和，主动份额 = 100% - 权重重合度，两者均已将各指数权重归一化为100%，未披露权重的指数显示为“-”。")
+
 # 显示指数多维度信息对比雷达图
+@st.fragment
+@handle_wind_errors
 def show_radar_graph(index_codes):
     """使用plotly绘制指数风险指标雷达图"""
     if len(index_codes) < 2:
@@ -856,7 +1177,7 @@ def show_radar_graph(index_codes):
         radar_data["锐度"] = risk_table["最大上涨"]
         
         # 2. Beta/弹性（以基准指数为基准）
-        radar_data["弹性"] = beta_table['Beta']
+        radar_data["弹性"] = beta_table[BETA_BENCHMARK]
         # beta_column_name = f'Beta/弹性（以{selected_index}为基准）'
         # if beta_column_name in beta_table.columns:
         #     radar_data["弹性"] = beta_table[beta_column_name]
@@ -871,7 +1192,7 @@ def show_radar_graph(index_codes):
         
         # 3. 归母净利润同比增速
         # 获取归母净利润数据
-        _, profit_data = get_earning_data(index_codes)
+        _, profit_data = get_earning_data(index_codes, st.session_state.end_date)
         # 计算最近年度的同比增速
         radar_data["成长"] = (profit_data.iloc[:, 4] - profit_data.iloc[:, 3]) / profit_data.iloc[:, 3].abs() * 100
         
@@ -886,18 +1207,18 @@ def show_radar_graph(index_codes):
         radar_data["流动性"] = risk_table["区间换手率"]
 
         # 5. 前20大成分股集中度
-        concentration_data, __ = get_top20_concentration(index_codes)
+        concentration_data, __, __ = get_top_concentration(index_codes, st.session_state.end_date)
         radar_data["集中度"] = concentration_data
         
         # 6. PE分位数
-        pe_pb_percentile = get_PE_PB_percentile(index_codes)
+        pe_pb_percentile = get_PE_PB_percentile(index_codes, st.session_state.start_date, st.session_state.end_date)
         radar_data["价值"] = pe_pb_percentile["市盈率分位数"]
         
         # 7. 卡玛比率（从风险数据中获取）
         radar_data["风险收益"] = risk_table["区间年化卡玛比率"]
         
         # 8. 市值
-        radar_data["市值"] = get_index_market_value(index_codes)
+        radar_data["市值"] = get_index_market_value(index_codes, st.session_state.end_date)
 
         # 定义要展示的指标列表
         all_metrics = ["锐度", "弹性", "成长", "市值", "集中度", "价值", "风险收益", "流动性"]
@@ -1027,9 +1348,14 @@ def show_radar_graph(index_codes):
     st.dataframe(styled_data, use_container_width=True)
 
 # 显示指数年度收益对比条形图和表格
+@st.fragment
+@handle_wind_errors
 def show_year_return(index_codes):
+    # 选择对比的年数，年度收益由本地收盘价计算，增加年数不会增加万德请求
+    years = st.slider("选择对比年数", min_value=1, max_value=20, value=YEAR_RETURN_YEARS, key="year_return_years")
+
     # 获取年度收益数据
-    return_data = get_return_data(index_codes)
+    return_data = get_return_data(index_codes, st.session_state.end_date, years)
     
     # 获取当前年份
     curr_year = int(st.session_state.end_date[:4])
@@ -1137,16 +1463,17 @@ def show_year_return(index_codes):
     st.dataframe(styled_table, use_container_width=True)
 
 # 显示指数成分股表格
-def show_table(df):
-    data_dict = {}
+@st.fragment
+@handle_wind_errors
+def show_table(index_codes, df):
     # 获取指数名称
-    index_info = get_information_data(list(df['指数代码'].unique()))
+    index_info = get_information_data(index_codes)
     
     # 创建标签页
     tabs = st.tabs([name for name in index_info['指数名称']])
 
-    # 获取指数前20大股票数据
-    __, stock_data = get_top20_concentration(index_info.index)
+    # 获取指数前20大股票数据，与雷达图共用同一份缓存
+    __, top_codes, stock_prices = get_top_concentration(index_codes, st.session_state.end_date)
 
     for i, (index_code, name) in enumerate(zip(index_info.index, index_info['指数名称'])):
         with tabs[i]:
@@ -1155,7 +1482,7 @@ def show_table(df):
 
             # 处理数据
             index_df = index_df.set_index('股票代码').sort_values(by='权重', ascending=False)
-            index_df_top20 = index_df.iloc[:,:8].head(20)
+            index_df_top20 = index_df.loc[top_codes[index_code]].iloc[:,:8]
 
             # 删除列
             index_df_top20.drop('行业', axis=1, inplace=True)
@@ -1164,16 +1491,10 @@ def show_table(df):
             index_df_top20.insert(loc=2, column='累积权重', value=index_df_top20['权重'].cumsum().apply(lambda x: format(x/ 100, '.2%') ))
             index_df_top20['权重'] = index_df_top20['权重'].apply(lambda x: format(float(x)/ 100, '.2%'))
 
-            # 从缓存中获取指数前20大成分股数据
-            stock_prices = stock_data[index_code]
-
-            # 先转换为长格式
-            stock_prices = stock_prices.reset_index().melt(id_vars='index', var_name='股票代码', value_name='close')
-
-            # 直接将价格数据通过groupby转换为列表
+            # 从缓存中获取指数前20大成分股股价，按成分股顺序转换为列表
             index_df_top20.loc[:, '近三个月股价走势'] = [
-                group['close'].tolist() 
-                for _, group in stock_prices.groupby('股票代码')
+                stock_prices[code].dropna().tolist()
+                for code in index_df_top20.index
             ]
 
             index_df_top20.rename(columns=
@@ -1196,9 +1517,7 @@ def show_table(df):
                     '近三个月股价走势': st.column_config.AreaChartColumn("近三个月股价走势"),
                 },
             )
-            
-        # 将原始数据储存在字典里备用
-        data_dict[index_code] = index_df
+
 
     # 5.显示详细的dataframe信息，默认隐藏
     st.divider()
@@ -1212,9 +1531,13 @@ def show_table(df):
             tabs = st.tabs([name for name in index_info['指数名称']])
             for i, (index_code, name) in enumerate(zip(index_info.index, index_info['指数名称'])):
                 with tabs[i]:
-                    st.dataframe(data_dict[index_code])
+                    view, bins = get_constituent_view(index_codes, st.session_state.end_date, index_code)
+                    show_paged_table(view, key=f"constituents_{index_code}", bins=bins,
+                                     formats={col: "{:.2f}" for col in ['权重', *CONSTITUENT_GRADIENT_COLUMNS]})
 
 # 显示指数成分股市值分布条形图
+@st.fragment
+@handle_wind_errors
 def show_bar(df):
     # 复制df以免数据污染
     value_df = df.copy().sort_values(by='权重', ascending=False)
@@ -1329,9 +1652,11 @@ def show_bar(df):
         bar_chart("总市值")
     
 # 显示指数成分股分布饼图
-def show_chart(index_codes, df):
+@st.fragment
+@handle_wind_errors
+def show_chart(index_codes):
     # 行业分类选择改为st.selectbox
-    industry_standard = st.selectbox("选择行业分类标准", ["申万一级行业", "中信一级行业", "申万二级行业", "中信二级行业", "申万三级行业", "中信三级行业"])
+    industry_standard = st.selectbox("选择行业分类标准", INDUSTRY_COLUMNS)
 
     # 使用st.columns将页面分为两列
     col1, col2 = st.columns([2, 1])
@@ -1358,65 +1683,30 @@ def show_chart(index_codes, df):
         pie_industry_column = "中信一级行业"
         selected_colors = zx_industry_colors
     
+    # 从行业暴露数据立方体中取出所选统计口径的切片，切换分类标准和级别无需重新分组
+    value_label = "数量" if size_standard == "按成分股数量计算" else "权重"
+    exposure_cube = get_industry_cube(index_codes, st.session_state.end_date)[value_label]
+    index_names = get_information_data(index_codes)['指数名称']
+    if not {industry_standard, pie_industry_column} <= set(exposure_cube.index.get_level_values('分类标准')):
+        st.info(f"当前指数成分股暂无{industry_standard}分类数据")
+        return
+
     # 创建行业分布饼图
     industry_charts = {}
-    industry_dataframes = {}  # 用于存储每个指数的行业数据
-    
+    pie_table = exposure_cube.loc[pie_industry_column]
+
     for index in index_codes:
-        # 获取该指数的数据
-        index_df = df[df['指数代码'] == index].copy()
-        index_name = get_information_data([index]).loc[index, '指数名称']
-        
-        # 根据选择的行业标准确定数据表使用的行业列
-        data_table_column = industry_standard
-        
-        # 用于饼图的一级行业数据
-        if size_standard == "按成分股数量计算":
-            # 统计一级行业分布
-            pie_industry_counts = index_df[pie_industry_column].value_counts().reset_index()
-            pie_industry_counts.columns = ['行业', '数量']
-            pie_industry_counts['占比'] = pie_industry_counts['数量'] / pie_industry_counts['数量'].sum() * 100
-            
-            # 为数据表准备所选级别的行业数据
-            data_table_counts = index_df[data_table_column].value_counts().reset_index()
-            data_table_counts.columns = ['行业', '数量']
-            data_table_counts['占比(%)'] = (data_table_counts['数量'] / data_table_counts['数量'].sum() * 100).round(2)
-            
-        else:  # 按成分股权重计算
-            # 对每一个一级行业groupby，然后对其"权重"求和
-            pie_industry_weights = index_df.groupby(pie_industry_column)['权重'].sum().reset_index()
-            pie_industry_weights.columns = ['行业', '权重']
-            pie_industry_weights['占比'] = pie_industry_weights['权重'] / pie_industry_weights['权重'].sum() * 100
-            
-            # 为数据表准备所选级别的行业数据
-            data_table_weights = index_df.groupby(data_table_column)['权重'].sum().reset_index()
-            data_table_weights.columns = ['行业', '权重']
-            data_table_weights['占比(%)'] = data_table_weights['占比(%)'].round(2)
-            
-            # 为数据表准备数据
-            data_table_counts = data_table_weights.copy()
-            data_table_counts.columns = ['行业', '权重', '占比(%)']
-            data_table_counts['占比(%)'] = data_table_counts['占比(%)'].round(2)
-        
-        # 为饼图准备数据，并按占比降序排列
-        pie_data = pie_industry_counts.copy() if size_standard == "按成分股数量计算" else pie_industry_weights.copy()
-        if size_standard == "按成分股数量计算":
-            pie_data = pie_data.rename(columns={'数量': '值'})
-        else:
-            pie_data = pie_data.rename(columns={'权重': '值'})
-        
-        # 按占比降序排列
-        pie_data = pie_data.sort_values('值', ascending=True)
-        
-        # 修改hovertemplate中的"数量"为动态显示
-        value_label = "数量" if size_standard == "按成分股数量计算" else "权重"
+        index_name = index_names[index]
+
+        # 为饼图准备一级行业数据，并按占比降序排列
+        pie_data = pie_table[index][pie_table[index] > 0].sort_values(ascending=True)
         
         # 创建plotly饼图，使用固定的颜色映射
         fig = go.Figure(data=[go.Pie(
-            labels=pie_data['行业'],
-            values=pie_data['值'],
+            labels=pie_data.index,
+            values=pie_data.values,
             hole=0.3,  # 创建环形图
-            marker_colors=[selected_colors.get(industry, '#808080') for industry in pie_data['行业']],  # 使用配色方案
+            marker_colors=[selected_colors.get(industry, '#808080') for industry in pie_data.index],  # 使用配色方案
             textinfo='label+percent',
             textposition='inside',
             direction='clockwise',
@@ -1431,7 +1721,6 @@ def show_chart(index_codes, df):
         )
         
         industry_charts[index] = fig
-        industry_dataframes[index] = data_table_counts  # 使用所选级别的数据用于数据表
     
     # 设置一个限制条件，当选定指数超过4个时，不显示饼图
     if len(index_codes) <= 4:
@@ -1444,63 +1733,48 @@ def show_chart(index_codes, df):
         st.warning("当选取的指数数量超过4个时，为保证页面显示效果，不显示饼图。")
     
     # 显示行业分布数据表，使用热力图样式
-
-    # 创建一个index为行业列表，columns为选中的指数的dataframe
-    # 获取所有行业列表（基于所选的行业级别）
-    all_industries = set()
-    for df_temp in industry_dataframes.values():
-        all_industries.update(df_temp['行业'].tolist())
-    all_industries = sorted(list(all_industries))
-    
-    # 根据选择的标准（数量或权重）创建dataframe
-    if size_standard == "按成分股数量计算":
-        # 创建以行业为index，指数为columns的dataframe
-        heatmap_data = pd.DataFrame(index=all_industries, columns=index_codes)
-        for index, df_temp in industry_dataframes.items():
-            for _, row in df_temp.iterrows():
-                heatmap_data.loc[row['行业'], index] = row['数量']
-        heatmap_data = heatmap_data.fillna(0)
-    else:  # 按成分股权重计算
-        # 创建以行业为index，指数为columns的dataframe
-        heatmap_data = pd.DataFrame(index=all_industries, columns=index_codes)
-        for index, df_temp in industry_dataframes.items():
-            for _, row in df_temp.iterrows():
-                heatmap_data.loc[row['行业'], index] = row['权重']
-        heatmap_data = heatmap_data.fillna(0)
+    # 以所选级别的行业为index，选中的指数为columns，只保留至少一个指数涉及的行业
+    heatmap_data = exposure_cube.loc[industry_standard]
+    heatmap_data = heatmap_data[(heatmap_data > 0).any(axis=1)]
     
     # 将列名从指数代码改为指数名称
-    index_name_mapping = {index: get_information_data([index]).loc[index, '指数名称'] for index in index_codes}
-    heatmap_data = heatmap_data.rename(columns=index_name_mapping)
+    heatmap_data = heatmap_data.rename(columns=index_names.to_dict())
     
     # 创建两个标签页
     tab1, tab2 = st.tabs([size_standard[4:6], "占比"])
     
     with tab1:
-        # 显示权重/数量数据
-        # 限制浮点数位数显示为.1f
-        st.dataframe(
-            heatmap_data.style.background_gradient(cmap='Oranges'), 
-            hide_index=False
-        )
+        # 显示权重/数量数据，行业数量较多时分页显示
+        value_format = "{:.0f}" if value_label == "数量" else "{:.2f}"
+        show_paged_table(heatmap_data, key="industry_values", bins=gradient_bins(heatmap_data, heatmap_data.columns),
+                         formats={col: value_format for col in heatmap_data.columns})
     
     with tab2:
         # 显示占比数据
         percentage_data = heatmap_data.div(heatmap_data.sum(axis=0), axis=1) *100
-        st.dataframe(
-            percentage_data.style.background_gradient(cmap='Oranges').format("{:.2f}%"), 
-            hide_index=False
-        )
+        show_paged_table(percentage_data, key="industry_percentage", bins=gradient_bins(percentage_data, percentage_data.columns),
+                         formats={col: "{:.2f}%" for col in percentage_data.columns})
 
 # 显示大类资产相关系数矩阵热力图
+@st.fragment
+@handle_wind_errors
 def show_assets_heatmap(indexes):
     """绘制选定指数与大类资产的相关性热力图"""
-    # 获取指数数据
-    df = get_index_data(indexes)
-    # 获取其他大类资产数据
-    asset_df = get_assets_data()
-    # 合并数据
-    df = pd.concat([df, asset_df], axis=1)
-    
+    col1, col2 = st.columns(2)
+    with col1:
+        estimator = st.radio("估计区间", ["全区间", "滚动窗口"], horizontal=True, key="corr_estimator")
+        window = None
+        if estimator == "滚动窗口":
+            window = st.selectbox("窗口长度（交易日）", ROLLING_WINDOWS, index=len(ROLLING_WINDOWS) - 1, key="corr_window")
+    with col2:
+        shrinkage = st.slider("收缩强度（向单位矩阵收缩）", min_value=0.0, max_value=1.0, value=0.0, step=0.05, key="corr_shrinkage")
+
+    # 大类资产一侧的收益率和相关系数来自缓存，只计算指数相关的行
+    calendar, asset_block, asset_corr = get_asset_correlation(st.session_state.start_date, st.session_state.end_date, window)
+    # 指数收盘价对齐到大类资产所用的交易日历后计算对数收益率
+    index_df = get_index_data(indexes, st.session_state.start_date, st.session_state.end_date)
+    index_block = ReturnBlock(aligned_log_returns(index_df, calendar), window)
+
     # 获取资产名称映射
     asset_names = {
         'CBA08301.CS': '1-5 年国开债指数',
@@ -1514,8 +1788,8 @@ def show_assets_heatmap(indexes):
     index_names = get_information_data(indexes)['指数名称'].to_dict()
     names_dict = {**index_names, **asset_names}
     
-    # 计算相关性矩阵
-    corr = df.corr()
+    # 计算基于对数收益率的相关系数矩阵
+    corr = correlation_matrix(index_block, asset_block, asset_corr, shrinkage)
     
     # 将相关系数矩阵转换为长格式
     corr_df = corr.reset_index()
@@ -1568,7 +1842,7 @@ def show_assets_heatmap(indexes):
 
     # 组合图层并设置属性
     chart = (heatmap + text).properties(
-        title=f"指数与主要大类资产相关系数热力图",
+        title=f"指数与主要大类资产相关系数热力图（日对数收益率{'，近' + str(window) + '个交易日' if window else ''}）",
         width=600,
         height=600
     ).configure_axis(
@@ -1579,13 +1853,15 @@ def show_assets_heatmap(indexes):
         anchor='middle'
     ).add_params(selection)
 
-    return chart
+    st.altair_chart(chart, use_container_width=True)
 
 # 显示跟踪各指数的基金竞争格局
+@st.fragment
+@handle_wind_errors
 def show_tracking_funds(indexes):
     """显示跟踪各指数的基金竞争格局"""
     # 获取跟踪各指数的基金数据
-    tracking_funds_data = get_tracking_funds(indexes)
+    tracking_funds_data = get_tracking_funds(indexes, st.session_state.end_date)
     
     # 获取指数名称
     index_info = get_information_data(indexes)
@@ -1647,81 +1923,170 @@ def show_tracking_funds(indexes):
 
 # ————————————————————————————————————————————主程序模块——————————————————————————————————————————————
 
+# 各板块依赖的数据加载函数，表单提交后统一预取
+def build_prefetch_plan(index_codes, start_date, end_date):
+    """
+    返回 {板块: [(加载函数, 参数元组), ...]} 形式的预取计划。
+
+    计划中只有两类任务：带@st.cache_data(show_spinner=False)的加载函数，参数与板块中的调用完全一致，板块渲染时直接命中缓存，
+    预取线程中缓存未命中时也不会向页面插入加载提示；
+    以及prefetch_series，只把日频序列的缺口补进本地存储，板块中的计算仍在渲染时进行。
+    成分股数据请求最慢，只放在用到它的板块中，首屏板块不等待成分股数据。
+    """
+    valuation_series = [(prefetch_series, (index_codes, "pe_ttm", start_date, end_date)),
+                        (prefetch_series, (index_codes, "pb_lf", start_date, end_date))]
+    return {
+        'information': [(get_information_data, (index_codes,))],
+        'plot': [(prefetch_series, (index_codes, "close", start_date, end_date))],
+        'valuation': [(get_earning_data, (index_codes, end_date)), *valuation_series],
+        'risk': [(get_risk_data, (index_codes, start_date, end_date))],
+        'bar': [(get_index_component_data, (index_codes, end_date))],
+        'chart': [(get_industry_cube, (index_codes, end_date))],
+        'table': [(get_index_component_data, (index_codes, end_date)),
+                  (get_top_concentration, (index_codes, end_date))],
+        'overlap': [(get_index_component_data, (index_codes, end_date))],
+        'radar': [(get_risk_data, (index_codes, start_date, end_date)),
+                  (get_earning_data, (index_codes, end_date)),
+                  (get_top_concentration, (index_codes, end_date)),
+                  (get_index_market_value, (index_codes, end_date)),
+                  *valuation_series],
+        'year_return': [(get_return_data, (index_codes, end_date, YEAR_RETURN_YEARS))],
+        'tracking_funds': [(get_tracking_funds, (index_codes, end_date))],
+        'assets': [(prefetch_series, (index_codes, "close", start_date, end_date)),
+                   (get_asset_correlation, (start_date, end_date, None))],
+    }
+
+# 按需加载模式下首屏直接加载的板块，其余板块显示为占位开关，用户打开后才加载
+EAGER_SECTIONS = ('information', 'plot')
+
+# 判断板块是否需要加载
+def section_requested(section):
+    """非按需加载模式下所有板块都加载；按需加载模式下首屏板块直接加载，其余板块由用户打开开关后加载"""
+    if not st.session_state.get('lazy_loading', False) or section in EAGER_SECTIONS:
+        return True
+    return st.toggle("加载并显示该板块", key=f"load_{section}",
+                     help="按需加载模式下，未打开的板块不会请求数据，其数据在首屏显示后于后台预取")
+
 def main(index_codes):
+    # 表单提交后将所有板块的数据请求一次性并发发出，各板块只等待自己依赖的数据
+    # 按需加载模式下先只预取首屏板块，首屏显示后再在后台预取其余板块
+    # 调度器保存在会话中，只在提交时新建，其余重新运行时复用，已完成的任务等待时直接返回
+    lazy_loading = st.session_state.get('lazy_loading', False)
+    background_plan = {}
+    scheduler = st.session_state.get('prefetch_scheduler')
+    if st.session_state.pop('prefetch_pending', False) or scheduler is None:
+        if scheduler is not None:
+            scheduler.shutdown()
+        scheduler = PrefetchScheduler()
+        st.session_state.prefetch_scheduler = scheduler
+        plan = build_prefetch_plan(index_codes, st.session_state.start_date, st.session_state.end_date)
+        if lazy_loading:
+            scheduler.submit_plan({section: loaders for section, loaders in plan.items() if section in EAGER_SECTIONS})
+            background_plan = {section: loaders for section, loaders in plan.items() if section not in EAGER_SECTIONS}
+        else:
+            scheduler.submit_plan(plan)
     try:
-        # 在主程序头部执行一次万德终端启动
-        w.start()
-
         st.subheader("指数基本信息对比")
         if len(index_codes) > 8:
             st.error("最多只能选择8个指数进行对比")
             st.stop()
         else:
-            # 获取成分股数据
-            index_component_data = get_index_component_data(index_codes)
+            scheduler.wait('information')
             # 显示基本信息表格
             show_information(index_codes)
         
         # 1.显示指数价格走势图
         st.divider()
         st.subheader("指数价格走势和累积收益走势")
+        scheduler.wait('plot')
         show_plot(index_codes)
 
+        # 首屏板块显示完成后，在后台预取其余板块的数据
+        if background_plan:
+            scheduler.submit_plan(background_plan)
+
         # 2.显示指数估值分位对比
         st.divider()
         st.subheader("指数收益和估值情况")
-        show_valuation_chart(index_codes)
+        if section_requested('valuation'):
+            scheduler.wait('valuation')
+            show_valuation_chart(index_codes)
 
         # 2.绘制收益风险表格
         st.divider()
         st.subheader("指数收益风险情况对比")
-        show_risk_table(index_codes)
+        if section_requested('risk'):
+            scheduler.wait('risk')
+            show_risk_table(index_codes)
+
+        # 3.显示指数回撤区间和水下曲线
+        st.divider()
+        st.subheader("指数回撤及修复情况")
+        if section_requested('drawdown'):
+            show_drawdown(index_codes)
 
         # 4.显示指数前50支成分股市值大小
         st.divider()
         st.subheader("指数成分股市值分布情况")
-        show_bar(index_component_data)
+        if section_requested('bar'):
+            scheduler.wait('bar')
+            show_bar(get_index_component_data(index_codes, st.session_state.end_date))
        
         # 5.统计并显示每个指数的行业分布情况
         st.divider()
         st.subheader("指数行业分布情况对比")
-        show_chart(index_codes, index_component_data)
+        if section_requested('chart'):
+            scheduler.wait('chart')
+            show_chart(index_codes)
 
         # 6.按照指数权重排序，获取前20个成分股，分别获取其近三个月股价信息并显示
         st.divider()
         st.subheader("指数前20大成分股对比")
-        show_table(index_component_data)
+        if section_requested('table'):
+            scheduler.wait('table')
+            show_table(index_codes, get_index_component_data(index_codes, st.session_state.end_date))
+
+        # 6.统计指数两两之间的成分股重合度
+        st.divider()
+        st.subheader("指数成分股重合度对比")
+        if section_requested('overlap'):
+            scheduler.wait('overlap')
+            show_overlap(index_codes, get_index_component_data(index_codes, st.session_state.end_date))
 
         # 7.显示指数风险指标雷达图
         st.divider()
         st.subheader("指数风险指标雷达图")
-        show_radar_graph(index_codes)
+        if section_requested('radar'):
+            scheduler.wait('radar')
+            show_radar_graph(index_codes)
 
         # 8.显示指数年度收益对比
         st.divider()
         st.subheader("指数年度收益对比")
-        show_year_return(index_codes)
+        if section_requested('year_return'):
+            scheduler.wait('year_return')
+            show_year_return(index_codes)
 
         # 9.显示跟踪各指数的基金竞争格局
         st.divider()
         st.subheader("跟踪各指数的基金竞争格局（前50大公募基金）")
-        show_tracking_funds(index_codes)
+        if section_requested('tracking_funds'):
+            scheduler.wait('tracking_funds')
+            show_tracking_funds(index_codes)
 
         # 3.显示指数大类资产相关性热力图
         st.divider()
-        st.altair_chart(show_assets_heatmap(index_codes), use_container_width=True)
-
-        # 页面运行完毕关闭万德终端
-        w.stop()
+        st.subheader("指数与主要大类资产相关性")
+        if section_requested('assets'):
+            scheduler.wait('assets')
+            show_assets_heatmap(index_codes)
 
     except URLError as e:
-        st.error(
-            """
-            **请登录万德账号**
-            Connection error: %s
-        """
-            % e.reason
-        )
+        show_wind_error(e)
+    finally:
+        # 非按需加载模式下各板块已等待完自己的任务，释放线程池；按需加载模式下后台预取在本次运行结束后继续进行
+        if not lazy_loading:
+            scheduler.shutdown()
 
 # ————————————————————————————————————————————侧边栏管理模块————————————————————————————————————————————
 
@@ -1777,7 +2142,6 @@ def verify_index_codes_with_wind(codes):
         return [], []
     
     try:
-        w.start()
         # 检查证券类型和指数类型
         error_code, df = w.wss(codes, "sec_type,windtype", usedf=True)
         
@@ -1844,6 +2208,7 @@ def handle_form_submit():
     # 更新状态
     st.session_state.index_codes = valid_codes
     st.session_state.run_analysis = True
+    st.session_state.prefetch_pending = True
 
 # 侧边栏UI
 with st.sidebar:
@@ -1867,6 +2232,9 @@ with st.sidebar:
         st.markdown("选择分析日期范围")
         st.session_state.start_date = st.date_input("起始日期", value=FIVE_YEARS_AGO, min_value=datetime.date(2000, 1, 1)).strftime('%Y-%m-%d')
         st.session_state.end_date = st.date_input("结束日期", value=TODAY, max_value=datetime.date.today()).strftime('%Y-%m-%d')
+
+        # 按需加载模式：首屏只加载基本信息和走势图，其余板块打开后才加载
+        st.toggle("按需加载", key="lazy_loading", help="开启后，除基本信息和走势图外的板块需手动打开，未打开板块的数据在后台预取")
         
         submit_button = st.form_submit_button(
             label="确定",
@@ -1879,7 +2247,9 @@ with st.sidebar:
     elif st.session_state.run_analysis:
         st.success(f"已选择 {len(st.session_state.index_codes)} 个指数")
         st.info(f"分析日期范围: {st.session_state.start_date} 至 {st.session_state.end_date}")
-    w.stop()
+
+    # 显示万德连接状态
+    show_wind_status(w)
 
 # 主页面逻辑
 if st.session_state.run_analysis:
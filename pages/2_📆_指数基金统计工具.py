@@ -2,7 +2,6 @@ from calendar import c
 import datetime
 import re
 import numpy as np
-from WindPy import w
 from math import log
 
 import streamlit as st
@@ -12,7 +11,10 @@ from urllib.error import URLError
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-import statsmodels.api as sm
+
+from core.regression import pairwise_ols
+from core.series_store import get_series_store
+from core.wind_backend import fetch_wsd, get_wind_backend, show_wind_status
 
 st.set_page_config(page_title="指数基金统计工具", page_icon="📆", layout="wide")
 
@@ -21,15 +23,24 @@ st.set_page_config(page_title="指数基金统计工具", page_icon="📆", layo
 FIVE_YEARS_AGO = (datetime.datetime.now() - datetime.timedelta(days=5*365)).date().strftime('%Y-%m-%d')
 TODAY = datetime.datetime.now().date().strftime('%Y-%m-%d')
 
+# 万德数据后端，后端的选择见core.wind_backend
+w = get_wind_backend()
+
 # ————————————————————————————————————————————数据缓存模块————————————————————————————————————————————
 
+# 日频序列本地存储，已获取过的日期直接从磁盘读取
+series_store = get_series_store()
+
+# 每次万德wsd请求的基金数量，跟踪宽基指数的基金常有上百只，分批请求避免单次请求数据量过大
+FUND_CHUNK_SIZE = 50
+
 # 缓存指数跟踪基金数据
 @st.cache_data
-def get_tracking_funds(indexes):
+def get_tracking_funds(indexes, end_date):
     """获取跟踪指数的所有基金信息"""
     tracking_funds_data = {}
     for index in indexes:
-        tracking_funds_data[index] = w.wset("indexrelevancefund",f"date={st.session_state.end_date};windcode={index}",usedf=True)[1]
+        tracking_funds_data[index] = w.wset("indexrelevancefund",f"date={end_date};windcode={index}",usedf=True)[1]
         tracking_funds_data[index].rename(columns={
             'fundcode':'基金代码',
             'fundname':'基金名称',
@@ -56,6 +67,14 @@ def get_tracking_funds(indexes):
         # TODO: 获取近三个月基金走势信息并嵌入文件中
     return tracking_funds_data
 
+# 获取多只基金的日频份额数据，按FUND_CHUNK_SIZE分批请求，已获取过的日期从本地存储读取
+def get_fund_shares(fund_codes, start_date, end_date):
+    if not fund_codes:
+        return pd.DataFrame()
+    chunks = [fund_codes[i:i + FUND_CHUNK_SIZE] for i in range(0, len(fund_codes), FUND_CHUNK_SIZE)]
+    share_data = [series_store.get(chunk, "unit_fundshare_total", start_date, end_date, fetch_wsd) for chunk in chunks]
+    return pd.concat(share_data, axis=1)
+
 # TODO：为show_corr_scatter函数提供数据接口，从万德获取数据
 @st.cache_data
 def get_tracking_error(fund_codes, start_date, end_date):
@@ -73,30 +92,13 @@ def get_tracking_error(fund_codes, start_date, end_date):
         # 删掉没有数据的基金代码，避免重复计算
         fund_codes_available = tracking_error_data.dropna().index.tolist()
 
-        # 计算基金份额波动率：对每个基金获取日频份额数据，然后计算波动率
-        volatility_data = {}
-        for fund_code in fund_codes_available:
-            try:
-                # 获取基金份额日频数据（根据指定的日期范围）
-                share_data = w.wsd(fund_code, "unit_fundshare_total", start_date, end_date, usedf=True)[1]
-                
-                if not share_data.empty and len(share_data) > 1:
-                    # 计算日收益率
-                    daily_returns = share_data.pct_change().dropna()
-                    # 计算年化波动率（假设252个交易日）
-                    annualized_volatility = daily_returns.std() * np.sqrt(252) * 100
-                    volatility_data[fund_code] = annualized_volatility.iloc[0] if not annualized_volatility.empty else np.nan
-                else:
-                    volatility_data[fund_code] = np.nan
-            except Exception as e:
-                volatility_data[fund_code] = np.nan
-        
-        # 将波动率数据转换为DataFrame
-        volatility_df = pd.DataFrame(list(volatility_data.items()), columns=['基金代码', '份额波动率(%)'])
-        volatility_df.set_index('基金代码', inplace=True)
+        # 计算基金份额波动率：分批获取所有基金的日频份额数据，再对份额矩阵逐列一次计算年化波动率（假设252个交易日）
+        share_data = get_fund_shares(fund_codes_available, start_date, end_date)
+        daily_changes = share_data.pct_change(fill_method=None)
+        volatility_df = (daily_changes.std() * np.sqrt(252) * 100).rename('份额波动率(%)').to_frame()
         
         # 合并数据
-        result_data = pd.concat([tracking_error_data, volatility_df], axis=1)
+        result_data = pd.concat([tracking_error_data, volatility_df.reindex(tracking_error_data.index)], axis=1)
         result_data.columns = ['基金名称', '跟踪误差(%)', '超额收益(%)', '基金规模（亿元）', '份额波动率(%)']
         
         # 清理数据，移除空值，对数化规模避免图像绘制差别过大
@@ -181,10 +183,10 @@ def MAD(data, threshold=3):
     upper_bound = median + threshold * mad
     return data[(data < lower_bound) | (data > upper_bound)].index
 
-# TODO:对数据进行回归分析
+# 对数据进行回归分析
 def regress(data, x_col, y_col):
     """
-    对数据进行简单线性回归分析。
+    对数据进行简单线性回归分析，由闭式解直接计算。
     
     参数:
     data (pd.DataFrame): 输入数据，包含x_col和y_col列
@@ -194,9 +196,14 @@ def regress(data, x_col, y_col):
     返回:
     tuple: 包含回归系数(params)、R²值(rsquared)、p值(pvalues)
     """
-    X = sm.add_constant(data[x_col])
-    model = sm.OLS(data[y_col], X).fit()
-    return model.params, model.rsquared, model.pvalues
+    result = pairwise_ols(data, [x_col, y_col])
+    result = result[result['自变量'] == x_col].iloc[0]
+    params = pd.Series({'const': result['截距'], x_col: result['斜率']})
+    pvalues = pd.Series({'const': result['截距p值'], x_col: result['p值']})
+    return params, result['R²'], pvalues
+
+# 参与两两回归的基金变量
+REGRESSION_COLUMNS = ['跟踪误差(%)', '超额收益(%)', '份额波动率(%)', '基金规模（对数）']
 
 # 变量选择表单函数
 def create_variable_selection_form(fund_data, form_key, title_prefix=""):
@@ -211,6 +218,9 @@ def create_variable_selection_form(fund_data, form_key, title_prefix=""):
     返回:
     tuple: (x_var, y_var) 选中的变量，如果未选择或选择不完整则返回(None, None)
     """
+    # 先显示全部变量两两之间的散点矩阵和回归结果
+    show_scatter_matrix(fund_data, form_key, title_prefix)
+
     # 变量选择表单 - 先选择变量再提交
     with st.form(key=form_key):
         # 获取可用的变量列
@@ -251,7 +261,7 @@ def create_variable_selection_form(fund_data, form_key, title_prefix=""):
 def show_tracking_funds(indexes):
     """显示跟踪各指数的基金竞争格局"""
     # 获取跟踪各指数的基金数据
-    tracking_funds_data = get_tracking_funds(indexes)
+    tracking_funds_data = get_tracking_funds(indexes, st.session_state.end_date)
     
     # 获取指数名称
     index_info = get_information_data(indexes)
@@ -501,13 +511,45 @@ def show_corr_scatter(fund_data, x_var, y_var, chart_title="基金变量散点
         '基金规模（亿元）': "{:.2f}"
     }), use_container_width=True)
 
+# 显示基金变量两两散点矩阵和回归结果
+def show_scatter_matrix(fund_data, key, title_prefix=""):
+    """绘制基金变量散点矩阵，并列出全部样本和各基金类型中每对变量的回归结果"""
+    columns = [col for col in REGRESSION_COLUMNS if col in fund_data.columns]
+    if fund_data.empty or len(columns) < 2:
+        return
+
+    st.subheader(f"{title_prefix}变量散点矩阵")
+    fig = px.scatter_matrix(
+        fund_data,
+        dimensions=columns,
+        color='基金类型',
+        hover_name='基金名称',
+        color_discrete_map={'ETF': '#1f77b4', 'ETF联接': '#ff7f0e', '场外基金': '#d2b48c'}
+    )
+    fig.update_traces(diagonal_visible=False, marker=dict(size=4))
+    fig.update_layout(height=800, legend_title_text='基金类型')
+    st.plotly_chart(fig, use_container_width=True)
+
+    # 所有变量对在全部样本和各基金类型中的回归结果一次算出
+    results = pairwise_ols(fund_data, columns, '基金类型')
+    group = st.radio("回归样本", results['分组'].unique().tolist(), horizontal=True, key=f"{key}_regression_group")
+    group_results = results[results['分组'] == group].drop(columns=['分组', '截距p值'])
+    st.dataframe(
+        group_results.style.background_gradient(cmap='Oranges', subset=['R²']).format({
+            '截距': "{:.4f}",
+            '斜率': "{:.4f}",
+            'R²': "{:.4f}",
+            't值': "{:.2f}",
+            'p值': "{:.4f}"
+        }),
+        use_container_width=True,
+        hide_index=True
+    )
+
 # ————————————————————————————————————————————主程序模块——————————————————————————————————————————————
 
 def main(index_codes):
     try:
-        # 在主程序头部执行一次万德终端启动
-        w.start()
-
         # 检查是否有上传的文件
         uploaded_file = st.session_state.get('uploaded_file', None)
         
@@ -520,7 +562,7 @@ def main(index_codes):
 
             # 如果没有上传文件，使用当前选择的指数对应的基金
             # 获取当前选择指数的基金
-            tracking_funds_data = get_tracking_funds(index_codes)
+            tracking_funds_data = get_tracking_funds(index_codes, st.session_state.end_date)
             
             # 收集所有基金代码
             all_fund_codes = []
@@ -551,9 +593,6 @@ def main(index_codes):
                 else:
                     st.warning("未能获取到有效的基金数据")
 
-        # 页面运行完毕关闭万德终端
-        w.stop()
-
     except URLError as e:
         st.error(
             """
@@ -621,7 +660,6 @@ def verify_index_codes_with_wind(codes):
         return [], []
     
     try:
-        w.start()
         # 检查证券类型和指数类型
         error_code, df = w.wss(codes, "sec_type,windtype", usedf=True)
         
@@ -769,7 +807,9 @@ with st.sidebar:
     elif st.session_state.run_analysis:
         st.success(f"已选择 {len(st.session_state.index_codes)} 个指数")
         st.info(f"分析日期范围: {st.session_state.start_date} 至 {st.session_state.end_date}")
-    w.stop()
+
+    # 显示万德连接状态
+    show_wind_status(w)
 
 # 主页面逻辑
 if st.session_state.run_analysis or (st.session_state.uploaded_file and st.session_state.get('file_processed', False)):
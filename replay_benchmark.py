@@ -0,0 +1,90 @@
+"""
+使用录制/回放后端对页面进行性能测试
+
+先在装有万德终端的电脑上录制：
+    python replay_benchmark.py --backend record --indexes 000300,000905,000906
+再在任意电脑上回放并计时（可加 --latency recorded 按录制时的耗时重现慢请求）：
+    python replay_benchmark.py --indexes 000300,000905,000906 --profile compare.prof
+"""
+import argparse
+import cProfile
+import datetime
+import glob
+import os
+import pstats
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PAGES = {
+    "compare": "1_*.py",
+    "funds": "2_*.py",
+}
+
+
+def run_page(page, index_input, start_date, end_date, timeout):
+    """模拟用户在侧边栏输入指数代码并提交表单，返回页面完整运行耗时（秒）"""
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    script_path = glob.glob(os.path.join(BASE_DIR, "pages", PAGES[page]))[0]
+    st.cache_data.clear()
+
+    at = AppTest.from_file(script_path, default_timeout=timeout)
+    at.run()
+    at.text_area(key="index_input").set_value(index_input)
+    at.date_input[0].set_value(start_date)
+    at.date_input[1].set_value(end_date)
+
+    started = time.perf_counter()
+    at.button[0].click().run()
+    elapsed = time.perf_counter() - started
+
+    if at.exception:
+        raise RuntimeError(f"页面运行出错：{at.exception[0].message}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="使用录制/回放后端对页面进行性能测试")
+    parser.add_argument("--page", choices=list(PAGES), nargs="+", default=list(PAGES))
+    parser.add_argument("--indexes", required=True, help="指数代码，用逗号分隔")
+    parser.add_argument("--start-date", default=None, help="起始日期，默认为五年前")
+    parser.add_argument("--end-date", default=None, help="结束日期，默认为今天")
+    parser.add_argument("--backend", choices=["record", "replay"], default="replay")
+    parser.add_argument("--fixture-dir", default=os.path.join(BASE_DIR, "data_cache", "fixtures"))
+    parser.add_argument("--latency", default="0", help="回放延迟秒数，或recorded")
+    parser.add_argument("--repeat", type=int, default=1, help="每个页面运行次数，第二次起使用已写入的本地序列存储")
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--profile", default=None, help="保存cProfile结果的文件路径")
+    args = parser.parse_args()
+
+    end_date = datetime.date.fromisoformat(args.end_date) if args.end_date else datetime.date.today()
+    start_date = (datetime.date.fromisoformat(args.start_date) if args.start_date
+                  else end_date - datetime.timedelta(days=5 * 365))
+
+    # 后端在首次导入时根据环境变量创建，必须在运行页面之前设置
+    # 本地序列存储使用临时目录，保证录制和回放时请求的日期区间一致
+    os.environ["INDEX_ANALYSIS_WIND_BACKEND"] = args.backend
+    os.environ["INDEX_ANALYSIS_FIXTURE_DIR"] = os.path.abspath(args.fixture_dir)
+    os.environ["INDEX_ANALYSIS_REPLAY_LATENCY"] = args.latency
+    os.environ["INDEX_ANALYSIS_DATA_DIR"] = tempfile.mkdtemp(prefix="index_analysis_")
+    os.chdir(BASE_DIR)
+
+    profiler = cProfile.Profile() if args.profile else None
+    for page in args.page:
+        for i in range(args.repeat):
+            if profiler:
+                profiler.enable()
+            elapsed = run_page(page, args.indexes, start_date, end_date, args.timeout)
+            if profiler:
+                profiler.disable()
+            print(f"{page} 第{i + 1}次运行耗时 {elapsed:.2f} 秒")
+
+    if profiler:
+        profiler.dump_stats(args.profile)
+        pstats.Stats(args.profile).sort_stats("cumulative").print_stats(20)
+
+
+if __name__ == "__main__":
+    main()
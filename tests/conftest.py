@@ -0,0 +1,5 @@
+"""将项目根目录加入模块搜索路径，测试中与页面一样以 from core.xxx import ... 导入"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,94 @@
+"""LTTB降采样与逐点循环的标准实现对比"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.chart_data import (WEBGL_THRESHOLD, downsample_long, downsample_series,
+                             downsample_wide, lttb_indices, use_webgl)
+
+
+def reference_lttb(x, y, n_out):
+    """按LTTB原始描述逐桶、逐点计算三角形面积"""
+    n = len(x)
+    every = (n - 2) / (n_out - 2)
+    selected = [0]
+    a = 0
+    for i in range(n_out - 2):
+        next_start = int(np.floor((i + 1) * every)) + 1
+        next_end = min(int(np.floor((i + 2) * every)) + 1, n)
+        avg_x = sum(x[next_start:next_end]) / (next_end - next_start)
+        avg_y = sum(y[next_start:next_end]) / (next_end - next_start)
+        best, best_area = None, -1.0
+        for j in range(int(np.floor(i * every)) + 1, next_start):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a])) / 2
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+    selected.append(n - 1)
+    return np.array(selected)
+
+
+@pytest.mark.parametrize("n, n_out", [(1000, 100), (2437, 500), (503, 17), (10, 3)])
+def test_lttb_matches_reference(n, n_out):
+    rng = np.random.default_rng(n)
+    x = np.arange(n, dtype=float)
+    y = np.cumsum(rng.normal(0, 1, n))
+    result = lttb_indices(x, y, n_out)
+    np.testing.assert_array_equal(result, reference_lttb(x, y, n_out))
+    assert len(result) == n_out and result[0] == 0 and result[-1] == n - 1
+    assert (np.diff(result) > 0).all()
+
+
+def test_lttb_short_input_keeps_all():
+    x = np.arange(50, dtype=float)
+    np.testing.assert_array_equal(lttb_indices(x, x, 50), np.arange(50))
+    np.testing.assert_array_equal(lttb_indices(x, x, 80), np.arange(50))
+
+
+def test_downsample_series_drops_nan():
+    dates = pd.bdate_range("2010-01-01", periods=3000)
+    rng = np.random.default_rng(11)
+    series = pd.Series(np.cumsum(rng.normal(0, 1, 3000)), index=dates)
+    series.iloc[::50] = np.nan
+    result = downsample_series(series, 300)
+    assert len(result) == 300 and result.notna().all()
+    clean = series.dropna()
+    assert result.index[0] == clean.index[0] and result.index[-1] == clean.index[-1]
+    x = pd.DatetimeIndex(clean.index).asi8.astype(float)
+    pd.testing.assert_series_equal(result, clean.iloc[reference_lttb(x, clean.to_numpy(), 300)])
+    assert downsample_series(series.iloc[:200], 300).equals(series.iloc[:200].dropna())
+
+
+def test_downsample_long_per_group():
+    dates = pd.bdate_range("2015-01-01", periods=1500)
+    rng = np.random.default_rng(12)
+    data = pd.concat([
+        pd.DataFrame({'日期': dates, '指数': 'A', '收益率': np.cumsum(rng.normal(0, 1, 1500))}),
+        pd.DataFrame({'日期': dates[:100], '指数': 'B', '收益率': np.arange(100.0)}),
+    ], ignore_index=True).sample(frac=1, random_state=0)
+    result = downsample_long(data, '日期', '收益率', '指数', max_points=200)
+    assert result.groupby('指数').size().to_dict() == {'A': 200, 'B': 100}
+    part = data[data['指数'] == 'A'].sort_values('日期')
+    expected = lttb_indices(pd.DatetimeIndex(part['日期']).asi8.astype(float), part['收益率'].to_numpy(), 200)
+    pd.testing.assert_frame_equal(result[result['指数'] == 'A'], part.iloc[expected])
+
+
+def test_downsample_wide_matches_per_column():
+    dates = pd.bdate_range("2012-01-01", periods=1200)
+    rng = np.random.default_rng(13)
+    data = pd.DataFrame({'A': np.cumsum(rng.normal(0, 1, 1200)), 'B': np.nan}, index=dates.strftime('%Y-%m-%d'))
+    data.iloc[-80:, 1] = np.arange(80.0)
+    result = downsample_wide(data, '回撤', '指数名称', max_points=150)
+    assert result.groupby('指数名称').size().to_dict() == {'A': 150, 'B': 80}
+    series = data['A'].copy()
+    series.index = dates
+    expected = downsample_series(series, 150)
+    part = result[result['指数名称'] == 'A']
+    np.testing.assert_array_equal(part['date'].to_numpy(), expected.index.to_numpy())
+    np.testing.assert_allclose(part['回撤'].to_numpy(), expected.to_numpy())
+
+
+def test_use_webgl_threshold():
+    assert not use_webgl(WEBGL_THRESHOLD)
+    assert use_webgl(WEBGL_THRESHOLD + 1)
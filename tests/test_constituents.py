@@ -0,0 +1,82 @@
+"""成分股分组统计与逐指数直接计算的对比"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.constituents import industry_cube, top_constituents
+
+
+@pytest.fixture
+def component_data():
+    rng = np.random.default_rng(10)
+    stocks = [f"{i:06d}.SZ" for i in range(80)]
+    rows = []
+    for code, size in [("000300.SH", 50), ("000905.SH", 30), ("H30184.CSI", 8)]:
+        weights = np.round(rng.lognormal(0, 1, size), 1)
+        rows.append(pd.DataFrame({'指数代码': code, '股票代码': rng.choice(stocks, size, replace=False), '权重': weights}))
+    data = pd.concat(rows, ignore_index=True).sample(frac=1, random_state=2, ignore_index=True)
+    data['指数代码'] = data['指数代码'].astype('category')
+    return data
+
+
+def test_top_constituents_matches_per_index(component_data):
+    indexes = ["H30184.CSI", "000300.SH", "000905.SH", "000852.SH"]
+    concentration, top_codes, all_codes = top_constituents(component_data, indexes, 20)
+
+    for index in indexes:
+        index_df = component_data[component_data['指数代码'] == index]
+        top = index_df.sort_values('权重', ascending=False, kind='stable').head(20)
+        assert top_codes[index] == top['股票代码'].tolist()
+        if index_df.empty:
+            assert np.isnan(concentration[index])
+        else:
+            np.testing.assert_allclose(concentration[index], top['权重'].sum())
+    assert concentration.index.tolist() == indexes
+    # 不足N只成分股时全部保留
+    assert len(top_codes["H30184.CSI"]) == 8
+    expected_codes = {code for codes in top_codes.values() for code in codes}
+    assert len(all_codes) == len(expected_codes) and set(all_codes) == expected_codes
+
+
+def test_industry_cube_matches_groupby():
+    rng = np.random.default_rng(17)
+    n = 200
+    data = pd.DataFrame({
+        '指数代码': pd.Categorical(rng.choice(["000300.SH", "000905.SH"], n)),
+        '权重': rng.lognormal(0, 1, n),
+        '申万一级行业': pd.Categorical(rng.choice(['银行', '电子', '医药生物'], n)),
+        '中信一级行业': pd.Categorical(rng.choice(['银行', '电子', '医药', '计算机'], n)),
+    })
+    # 缺少行业分类的成分股不计入
+    data.loc[:4, '中信一级行业'] = np.nan
+    columns = ['申万一级行业', '中信一级行业']
+    indexes = ["000905.SH", "000300.SH"]
+    cube = industry_cube(data, indexes, columns)
+
+    assert cube.columns.get_level_values(1)[:2].tolist() == indexes
+    for standard in columns:
+        counts = data.groupby([standard, '指数代码'], observed=True).size().unstack(fill_value=0)
+        weights = data.groupby([standard, '指数代码'], observed=True)['权重'].sum().unstack(fill_value=0)
+        for label, expected in [('数量', counts), ('权重', weights)]:
+            result = cube[label].loc[standard]
+            expected = expected.reindex(index=result.index, columns=indexes, fill_value=0)
+            np.testing.assert_allclose(result.to_numpy(dtype=float), expected.to_numpy(dtype=float))
+    assert set(cube.loc['中信一级行业'].index) == {'银行', '电子', '医药', '计算机'}
+    assert cube['数量'].loc['中信一级行业'].to_numpy().sum() == n - 5
+
+
+def test_industry_cube_counts_constituents_without_weights():
+    data = pd.DataFrame({
+        '指数代码': pd.Categorical(["000300.SH", "000300.SH", "000300.SH", "000905.SH", "000905.SH"]),
+        '权重': [np.nan, np.nan, np.nan, 2.0, np.nan],
+        '申万一级行业': pd.Categorical(['银行', '银行', '电子', '银行', '电子']),
+    })
+    cube = industry_cube(data, ["000300.SH", "000905.SH"], ['申万一级行业'])
+
+    counts = cube['数量'].loc['申万一级行业']
+    weights = cube['权重'].loc['申万一级行业']
+    # 未披露权重的指数仍按成分股行数统计数量，权重合计为0
+    assert counts.loc['银行'].tolist() == [2, 1]
+    assert counts.loc['电子'].tolist() == [1, 1]
+    assert weights['000300.SH'].tolist() == [0, 0]
+    assert weights.loc['银行', '000905.SH'] == 2.0
@@ -0,0 +1,68 @@
+"""对数收益率相关系数与pandas DataFrame.corr逐对计算的对比"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.correlation import (ReturnBlock, aligned_log_returns, correlation_matrix,
+                              cross_correlation, shrink_correlation)
+
+
+@pytest.fixture
+def returns():
+    rng = np.random.default_rng(5)
+    dates = pd.bdate_range("2023-01-02", periods=250)
+    factor = rng.normal(0, 0.01, (250, 1))
+    data = pd.DataFrame(factor + rng.normal(0, 0.01, (250, 6)), index=dates,
+                        columns=["I1", "I2", "S1", "S2", "S3", "S4"])
+    # 停牌与晚上市造成的缺失
+    data.iloc[40:60, 2] = np.nan
+    data.iloc[:120, 3] = np.nan
+    data.iloc[::17, 4] = np.nan
+    return data
+
+
+def test_cross_correlation_matches_pandas(returns):
+    index_block = ReturnBlock(returns[["I1", "I2"]])
+    asset_block = ReturnBlock(returns[["S1", "S2", "S3", "S4"]])
+    result = cross_correlation(index_block, asset_block)
+    expected = returns.corr(min_periods=20).loc[["I1", "I2"], ["S1", "S2", "S3", "S4"]]
+    # 收益率以float32存储
+    np.testing.assert_allclose(result, expected, atol=1e-5)
+
+
+def test_window_and_min_periods(returns):
+    block = ReturnBlock(returns, window=100)
+    result = cross_correlation(block, block, min_periods=96)
+    expected = returns.iloc[-100:].corr(min_periods=96)
+    # 窗口内S3每17天缺一天，有效天数不足96，与其相关的系数均为NaN
+    assert result.isna().equals(expected.isna())
+    assert result["S3"].isna().all() and result.drop(index="S3", columns="S3").notna().all().all()
+    np.testing.assert_allclose(result, expected, atol=1e-5)
+
+
+def test_mismatched_calendar_raises(returns):
+    with pytest.raises(ValueError):
+        cross_correlation(ReturnBlock(returns), ReturnBlock(returns, window=100))
+
+
+def test_correlation_matrix_and_shrinkage(returns):
+    index_block = ReturnBlock(returns[["I1", "I2"]])
+    asset_block = ReturnBlock(returns[["S1", "S2", "S3", "S4"]])
+    expected = returns.corr(min_periods=20)
+    np.testing.assert_allclose(correlation_matrix(index_block, asset_block), expected, atol=1e-5)
+
+    shrunk = correlation_matrix(index_block, asset_block, shrinkage=0.3)
+    np.testing.assert_allclose(shrunk, expected * 0.7 + np.eye(6) * 0.3, atol=1e-5)
+    np.testing.assert_allclose(np.diag(shrink_correlation(expected, 0.5)), 1)
+
+
+def test_aligned_log_returns_does_not_fill_gaps():
+    calendar = pd.bdate_range("2024-01-01", periods=8)
+    close = pd.DataFrame({"A": [10, 11, np.nan, 12, 13, 12, 0, 14]}, index=calendar.strftime("%Y-%m-%d"), dtype=float)
+    # 乱序且缺少一个交易日
+    close = close.drop(close.index[4]).iloc[::-1]
+    result = aligned_log_returns(close, calendar)
+    prices = close.sort_index().set_axis(pd.to_datetime(close.sort_index().index)).reindex(calendar)
+    expected = np.log(prices.where(prices > 0)).diff().iloc[1:]
+    pd.testing.assert_frame_equal(result, expected)
+    assert result["A"].notna().sum() == 1
@@ -0,0 +1,94 @@
+"""回撤区间识别与逐日循环的直接实现对比"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.drawdown import drawdown_episodes, underwater
+
+
+def reference_episodes(series, threshold):
+    """逐日扫描：跌破此前最高点开始一段回撤，回到该最高点结束"""
+    series = series.ffill()
+    dates = series.index
+    episodes = []
+    peak_row, trough_row, in_drawdown = None, None, False
+    running_max = -np.inf
+    for row, price in enumerate(series.to_numpy()):
+        if np.isnan(price):
+            continue
+        if price >= running_max:
+            if in_drawdown:
+                episodes.append((peak_row, trough_row, row))
+                in_drawdown = False
+            running_max = price
+            peak_row = row
+        else:
+            if not in_drawdown:
+                in_drawdown, trough_row = True, row
+            elif price < series.iloc[trough_row]:
+                trough_row = row
+    if in_drawdown:
+        episodes.append((peak_row, trough_row, None))
+
+    records = []
+    prices = series.to_numpy()
+    for peak, trough, recovery in episodes:
+        depth = (prices[trough] / prices[peak] - 1) * 100
+        if depth > -threshold:
+            continue
+        end = recovery if recovery is not None else len(series) - 1
+        records.append({
+            '代码': series.name,
+            '峰值日期': dates[peak],
+            '谷底日期': dates[trough],
+            '修复日期': dates[recovery] if recovery is not None else pd.NaT,
+            '回撤幅度(%)': depth,
+            '下跌天数': trough - peak,
+            '修复天数': recovery - trough if recovery is not None else np.nan,
+            '水下天数': end - peak,
+        })
+    return records
+
+
+@pytest.fixture
+def close():
+    rng = np.random.default_rng(4)
+    dates = pd.bdate_range("2021-01-04", periods=600)
+    data = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.015, (600, 3)), axis=0)),
+                        index=dates, columns=["A", "B", "C"])
+    # C晚上市，B中间停牌
+    data.iloc[:150, 2] = np.nan
+    data.iloc[300:320, 1] = np.nan
+    return data
+
+
+@pytest.mark.parametrize("threshold", [0.0, 5.0, 15.0])
+def test_episodes_match_daily_scan(close, threshold):
+    result = drawdown_episodes(close, threshold)
+    expected = pd.DataFrame([record for code in close.columns
+                             for record in reference_episodes(close[code], threshold)])
+    expected = expected.sort_values(['代码', '峰值日期'], ignore_index=True)
+    assert len(result) == len(expected)
+    for column in ['代码', '峰值日期', '谷底日期', '修复日期']:
+        assert result[column].tolist() == expected[column].tolist() or \
+            result[column].equals(expected[column])
+    np.testing.assert_allclose(result['回撤幅度(%)'], expected['回撤幅度(%)'])
+    for column in ['下跌天数', '修复天数', '水下天数']:
+        np.testing.assert_array_equal(result[column].to_numpy(dtype=float), expected[column].to_numpy(dtype=float))
+
+
+def test_underwater_matches_cummax(close):
+    expected = (close.ffill() / close.ffill().cummax() - 1) * 100
+    pd.testing.assert_frame_equal(underwater(close), expected)
+
+
+def test_unrecovered_and_no_drawdown():
+    dates = pd.bdate_range("2024-01-01", periods=6)
+    close = pd.DataFrame({"up": [1, 2, 3, 4, 5, 6], "down": [10, 9, 8, 9, 9.5, 9.9]}, index=dates, dtype=float)
+    result = drawdown_episodes(close, 5.0)
+    assert result['代码'].tolist() == ["down"]
+    row = result.iloc[0]
+    assert row['峰值日期'] == dates[0] and row['谷底日期'] == dates[2]
+    assert pd.isna(row['修复日期']) and np.isnan(row['修复天数'])
+    assert row['水下天数'] == 5
+    assert drawdown_episodes(close[["up"]]).empty
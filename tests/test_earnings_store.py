@@ -0,0 +1,81 @@
+"""年报数据存储：各字段齐全的年度永久保存，一致预期按交易日保存"""
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from core.earnings_store import EarningsStore
+
+FIELDS = ["营业收入", "归母净利润"]
+
+
+def make_fetch(calls, values):
+    """values为 {(代码, 年度): (营业收入, 归母净利润)}，未列出的代码返回空值"""
+    def fetch(codes, year):
+        calls.append((list(codes), year))
+        rows = [values.get((code, year), (np.nan, np.nan)) for code in codes]
+        return pd.DataFrame(rows, index=codes, columns=FIELDS)
+    return fetch
+
+
+def test_complete_reports_are_kept_and_incomplete_refetched(tmp_path):
+    values = {("A", 2023): (10.0, 1.0), ("B", 2023): (20.0, np.nan), ("A", 2024): (11.0, 1.1)}
+    calls = []
+    result = EarningsStore(str(tmp_path)).get(["A", "B"], [2023, 2024], FIELDS, make_fetch(calls, values))
+    assert calls == [(["A", "B"], 2023), (["A", "B"], 2024)]
+    assert result[2023].loc["A"].tolist() == [10.0, 1.0]
+    assert np.isnan(result[2023].loc["B", "归母净利润"])
+
+    # 重新打开的存储中只有各字段齐全的记录不再请求，B的2023年报和2024年报仍需请求
+    values[("B", 2023)] = (20.0, 2.0)
+    calls = []
+    store = EarningsStore(str(tmp_path))
+    result = store.get(["A", "B"], [2023, 2024], FIELDS, make_fetch(calls, values))
+    assert calls == [(["B"], 2023), (["B"], 2024)]
+    assert result[2023].loc["B"].tolist() == [20.0, 2.0]
+    assert result[2024].loc["A"].tolist() == [11.0, 1.1]
+
+    calls = []
+    store.get(["A", "B"], [2023], FIELDS, make_fetch(calls, values))
+    assert calls == []
+
+
+def test_failed_fetch_keeps_cached_years(tmp_path):
+    store = EarningsStore(str(tmp_path))
+    store.get(["A"], [2023], FIELDS, make_fetch([], {("A", 2023): (10.0, 1.0)}))
+    result = store.get(["A", "B"], [2023], FIELDS, lambda codes, year: None)
+    assert result[2023].loc["A"].tolist() == [10.0, 1.0]
+    assert result[2023].loc["B"].isna().all()
+
+
+def test_forecasts_are_keyed_by_trade_date(tmp_path):
+    calls = []
+
+    def fetch_for(value):
+        def fetch(codes):
+            calls.append(list(codes))
+            return pd.DataFrame({FIELDS[0]: value, FIELDS[1]: np.nan}, index=codes)
+        return fetch
+
+    store = EarningsStore(str(tmp_path))
+    first = store.get_forecast(["A", "B"], 2025, "2024-06-27", FIELDS, fetch_for(1.0))
+    # 同一交易日不再请求，万德返回的空值也会保存
+    again = store.get_forecast(["A"], 2025, "2024-06-27", FIELDS, fetch_for(9.0))
+    assert calls == [["A", "B"]]
+    assert again.loc["A", FIELDS[0]] == 1.0 and np.isnan(again.loc["A", FIELDS[1]])
+
+    # 其他交易日或预测年度分别请求，已保存的值不受影响
+    other_day = store.get_forecast(["A"], 2025, "2024-06-28", FIELDS, fetch_for(2.0))
+    other_year = store.get_forecast(["A"], 2026, "2024-06-27", FIELDS, fetch_for(3.0))
+    assert calls == [["A", "B"], ["A"], ["A"]]
+    assert other_day.loc["A", FIELDS[0]] == 2.0 and other_year.loc["A", FIELDS[0]] == 3.0
+    assert first.loc["B", FIELDS[0]] == 1.0
+
+    # 历史交易日写入磁盘，当天的预期值只保留在内存中
+    today = datetime.date.today().isoformat()
+    store.get_forecast(["A"], 2025, today, FIELDS, fetch_for(4.0))
+    reopened = EarningsStore(str(tmp_path))
+    calls.clear()
+    assert reopened.get_forecast(["A"], 2025, "2024-06-28", FIELDS, fetch_for(9.0)).loc["A", FIELDS[0]] == 2.0
+    assert reopened.get_forecast(["A"], 2025, today, FIELDS, fetch_for(5.0)).loc["A", FIELDS[0]] == 5.0
+    assert calls == [["A"]]
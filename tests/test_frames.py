@@ -0,0 +1,40 @@
+"""compact_frame列类型转换"""
+import numpy as np
+import pandas as pd
+
+from core.frames import ARROW_STRING, compact_frame
+
+
+def test_column_types():
+    data = pd.DataFrame({
+        '行业': ['银行', '电子', '银行', None],
+        '权重': ['1.5', 2, None, '3.25'],
+        '市值': [1.0, 2.5, np.nan, 4.0],
+        '上市日期': ['2010-01-04', '2015-06-30', 'N/A', None],
+        '简称': ['平安银行', '万科A', None, '五粮液'],
+        '备注': ['a', 1, None, 2.5],
+        '数量': [1, 2, 3, 4],
+    })
+    result = compact_frame(data, categories=['行业'], floats=['权重'], dates=['上市日期'])
+    assert isinstance(result['行业'].dtype, pd.CategoricalDtype)
+    assert result['行业'].cat.categories.tolist() == ['电子', '银行'] and result['行业'].isna().iloc[3]
+    assert result['权重'].dtype == np.float32 and result['市值'].dtype == np.float32
+    np.testing.assert_allclose(result['权重'], [1.5, 2, np.nan, 3.25])
+    assert result['上市日期'].dtype == 'datetime64[ns]'
+    assert result['上市日期'].isna().tolist() == [False, False, True, True]
+    assert result['简称'].dtype == ARROW_STRING and result['简称'].isna().iloc[2]
+    # 混合类型保持object，整数列不变
+    assert result['备注'].dtype == object and result['备注'].tolist()[:2] == ['a', 1]
+    assert result['数量'].dtype == np.int64
+    # 不修改原数据
+    assert data['权重'].dtype == object
+
+
+def test_values_preserved_against_pandas():
+    rng = np.random.default_rng(13)
+    data = pd.DataFrame({'收益率': rng.normal(0, 1, 100), '名称': [f"指数{i % 7}" for i in range(100)]})
+    result = compact_frame(data, categories=['名称'])
+    np.testing.assert_allclose(result['收益率'], data['收益率'].astype('float32'))
+    assert result['名称'].astype(str).tolist() == data['名称'].tolist()
+    empty = compact_frame(pd.DataFrame({'名称': pd.Series([], dtype=object)}))
+    assert empty['名称'].dtype == ARROW_STRING
@@ -0,0 +1,76 @@
+"""成分股重合度的稀疏矩阵计算与逐对集合运算的对比"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.overlap import overlap_tables
+
+
+def reference_tables(component_data, indexes):
+    """逐对取共同成分股，权重按指数归一化为100后取较小值求和"""
+    weights = {}
+    for code in indexes:
+        data = component_data[(component_data['指数代码'] == code) & (component_data['权重'] > 0)]
+        data = data.groupby('股票代码')['权重'].sum()
+        weights[code] = data / data.sum() * 100
+    count = pd.DataFrame(0, index=indexes, columns=indexes)
+    overlap = pd.DataFrame(0.0, index=indexes, columns=indexes)
+    for a in indexes:
+        for b in indexes:
+            common = weights[a].index.intersection(weights[b].index)
+            count.loc[a, b] = len(common)
+            overlap.loc[a, b] = np.minimum(weights[a][common], weights[b][common]).sum()
+    return count, overlap
+
+
+@pytest.fixture
+def component_data():
+    rng = np.random.default_rng(8)
+    stocks = [f"{i:06d}.SZ" for i in range(300)]
+    rows = []
+    for code, size in [("000300.SH", 120), ("000905.SH", 150), ("000852.SH", 200), ("H30184.CSI", 40)]:
+        members = rng.choice(stocks, size, replace=False)
+        # 权重保留两位小数，制造相同权重
+        weights = np.round(rng.lognormal(0, 1, size), 2)
+        rows.append(pd.DataFrame({'指数代码': code, '股票代码': members, '权重': weights}))
+    data = pd.concat(rows, ignore_index=True)
+    # 同一股票重复出现时权重合并，零权重不计入成分股
+    data = pd.concat([data, pd.DataFrame({'指数代码': ["000300.SH", "000905.SH"],
+                                          '股票代码': [data['股票代码'][0], "999999.SZ"],
+                                          '权重': [1.5, 0.0]})], ignore_index=True)
+    return data
+
+
+def test_overlap_matches_pairwise_sets(component_data):
+    indexes = ["000300.SH", "000905.SH", "000852.SH", "H30184.CSI"]
+    result = overlap_tables(component_data, indexes)
+    count, overlap = reference_tables(component_data, indexes)
+    pd.testing.assert_frame_equal(result["共同成分股数量"], count, check_dtype=False)
+    np.testing.assert_allclose(result["权重重合度(%)"], overlap, atol=1e-9)
+    np.testing.assert_allclose(result["主动份额(%)"], 100 - overlap, atol=1e-9)
+    np.testing.assert_allclose(np.diag(result["权重重合度(%)"]), 100)
+
+
+def test_identical_and_disjoint_indexes():
+    data = pd.DataFrame({'指数代码': ["A", "A", "B", "B", "C"],
+                         '股票代码': ["s1", "s2", "s1", "s2", "s3"],
+                         '权重': [30.0, 70.0, 3.0, 7.0, 1.0]})
+    result = overlap_tables(data, ["A", "B", "C"])
+    np.testing.assert_allclose(result["权重重合度(%)"].loc["A", "B"], 100)
+    assert result["共同成分股数量"].loc["A", "C"] == 0
+    assert result["主动份额(%)"].loc["B", "C"] == 100
+
+
+def test_constituents_without_weights():
+    data = pd.DataFrame({'指数代码': ["A", "A", "B", "B", "C", "C"],
+                         '股票代码': ["s1", "s2", "s1", "s3", "s1", "s2"],
+                         '权重': [np.nan, np.nan, 40.0, 60.0, 50.0, np.nan]})
+    result = overlap_tables(data, ["A", "B", "C"])
+    # 数量按成分股统计，不依赖权重是否披露
+    assert result["共同成分股数量"].loc["A", "A"] == 2
+    assert result["共同成分股数量"].loc["A", "C"] == 2
+    assert result["共同成分股数量"].loc["B", "C"] == 1
+    # 完全没有权重的指数无法计算权重重合度
+    assert result["权重重合度(%)"].loc["A"].isna().all()
+    assert result["主动份额(%)"]["A"].isna().all()
+    np.testing.assert_allclose(result["权重重合度(%)"].loc["B", "C"], 40)
@@ -0,0 +1,145 @@
+"""指数对比分析页面的冒烟测试：用按请求参数生成数据的万德后端运行完整页面"""
+import glob
+import os
+import zlib
+from urllib.error import URLError
+
+import numpy as np
+import pandas as pd
+import pytest
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from core import earnings_store, security_cache, series_store, wind_backend
+from core.earnings_store import EarningsStore
+from core.prefetch import PrefetchScheduler
+from core.security_cache import SecurityAttributeCache
+from core.series_store import SeriesStore
+from core.wind_backend import WindBackend
+
+PAGE = glob.glob(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "pages", "1_*.py"))[0]
+
+STRING_FIELDS = {"sec_name", "repo_briefing", "officialstyle", "crm_issuer", "exchange_cn",
+                 "industry_sw_2021", "industry_citic"}
+DATE_FIELDS = {"basedate", "launchdate"}
+INDUSTRIES = ["银行", "电子", "医药生物", "计算机"]
+
+
+def seeded(*keys):
+    """同一组参数每次生成相同的数据"""
+    return np.random.default_rng(zlib.crc32("|".join(map(str, keys)).encode("utf-8")))
+
+
+class StubWindBackend(WindBackend):
+    """按请求的代码和字段生成数据，接口与万德usedf=True时一致"""
+
+    name = "stub"
+
+    def _request(self, method, *args, usedf=True):
+        return getattr(self, f"_{method}")(*args)
+
+    def _wss(self, codes, fields, *options):
+        codes = [codes] if isinstance(codes, str) else list(codes)
+        fields = [field.strip() for field in fields.split(",")]
+        data = {}
+        for field in fields:
+            rng = seeded(field, *options)
+            if field == "sec_type":
+                values = ["指数"] * len(codes)
+            elif field == "windtype":
+                values = ["股票指数"] * len(codes)
+            elif field in DATE_FIELDS:
+                values = [pd.Timestamp("2004-12-31")] * len(codes)
+            elif field in STRING_FIELDS:
+                values = [INDUSTRIES[zlib.crc32(code.encode()) % len(INDUSTRIES)] if field.startswith("industry")
+                          else f"{field}{code}" for code in codes]
+            else:
+                values = rng.uniform(1e8, 1e10, len(codes))
+            data[field.upper()] = values
+        return 0, pd.DataFrame(data, index=codes)
+
+    def _wsd(self, codes, field, start_date, end_date, *options):
+        dates = pd.bdate_range(start_date, end_date)
+        data = {}
+        for code in codes:
+            rng = seeded(code, field)
+            # 按固定起点生成整条序列后截取，分段请求的数据与一次请求一致
+            full = pd.bdate_range("2015-01-01", pd.Timestamp.today())
+            values = 1000 * np.exp(np.cumsum(rng.normal(0, 0.01, len(full))))
+            data[code] = pd.Series(values, index=full).reindex(dates)
+        return 0, pd.DataFrame(data, index=dates)
+
+    def _wset(self, table_name, options, *more):
+        index = options.split("windcode=")[1].split(";")[0]
+        rng = seeded(table_name, index)
+        if table_name == "indexconstituent":
+            stocks = [f"{i:06d}.SZ" for i in rng.choice(60, 30, replace=False)]
+            return 0, pd.DataFrame({"wind_code": stocks, "sec_name": [f"股票{code[:6]}" for code in stocks],
+                                    "i_weight": rng.dirichlet(np.ones(30)) * 100,
+                                    "industry": rng.choice(INDUSTRIES, 30)})
+        funds = [f"{i:06d}.OF" for i in range(3)]
+        return 0, pd.DataFrame({"fundcode": funds, "fundname": funds, "scale": rng.uniform(1e8, 1e10, 3),
+                                "excessreturn": rng.normal(0, 2, 3), "establishmentday": "2015-01-01",
+                                "fundmanager": "基金经理", "company": "基金公司", "unitnav": rng.uniform(1, 2, 3),
+                                "managementrate": 0.5, "windavg": 3.0, "fundtype": "被动指数型"})
+
+
+class UnreachableWindBackend(WindBackend):
+    """万德终端无法连接时，每次请求都抛出URLError"""
+
+    name = "unreachable"
+
+    def _request(self, method, *args, **kwargs):
+        raise URLError("wind down")
+
+
+@pytest.fixture
+def page(tmp_path, monkeypatch):
+    """将页面使用的万德后端和本地存储替换为测试用实例，返回运行页面的函数"""
+    monkeypatch.setattr(series_store, "_store", SeriesStore(str(tmp_path)))
+    monkeypatch.setattr(security_cache, "_cache", SecurityAttributeCache(str(tmp_path)))
+    monkeypatch.setattr(earnings_store, "_store", EarningsStore(str(tmp_path)))
+    st.cache_data.clear()
+
+    def run(backend, index_input="000300.SH,000905.SH"):
+        monkeypatch.setattr(wind_backend, "_backend", backend)
+        at = AppTest.from_file(PAGE, default_timeout=120)
+        at.run()
+        at.text_area(key="index_input").set_value(index_input)
+        at.button[0].click().run()
+        return at
+
+    yield run
+    st.cache_data.clear()
+
+
+def test_compare_two_indexes(page):
+    at = page(StubWindBackend())
+    assert not at.exception, at.exception
+    assert not at.error
+    subheaders = [header.value for header in at.subheader]
+    assert subheaders[0] == "指数基本信息对比"
+    assert "指数成分股重合度对比" in subheaders and "指数与主要大类资产相关性" in subheaders
+    assert any("主动份额" in caption.value for caption in at.caption)
+    # 预取线程不向页面插入加载提示或空占位元素，主区域中只有各板块自身的元素
+    assert [node.type for node in at.main.children.values() if node.type == "empty"] == []
+
+
+def test_unreachable_wind_shows_login_message(page, monkeypatch):
+    at = page(StubWindBackend())
+    # 表单提交后万德断开，各板块显示登录提示而不是异常堆栈
+    monkeypatch.setattr(wind_backend, "_backend", UnreachableWindBackend())
+    st.cache_data.clear()
+    at.run()
+    assert not at.exception, at.exception
+    assert at.error and all("请登录万德账号" in error.value for error in at.error)
+
+
+def test_rerun_reuses_prefetch_scheduler(page, monkeypatch):
+    at = page(StubWindBackend())
+    scheduler = at.session_state["prefetch_scheduler"]
+    # 未重新提交表单的运行复用会话中的调度器，不新建线程池
+    monkeypatch.setattr(PrefetchScheduler, "__init__", lambda self, *args, **kwargs: pytest.fail("新建了调度器"))
+    at.run()
+    assert not at.exception, at.exception
+    assert at.session_state["prefetch_scheduler"] is scheduler
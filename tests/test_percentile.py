@@ -0,0 +1,86 @@
+"""估值分位数增量计算与pandas扩展、滚动窗口的对比"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.percentile import PercentileEngine, ValuationTracker
+
+
+def reference_frame(series, window=None):
+    """对有效估值逐日计算不高于当天估值的样本占比、均值和标准差"""
+    series = series.dropna()
+    windows = series.expanding() if window is None else series.rolling(window, min_periods=1)
+    rank = windows.apply(lambda x: (x <= x[-1]).mean() * 100, raw=True)
+    frame = pd.DataFrame({"分位数": rank, "均值": windows.mean(), "标准差": windows.std(ddof=1)})
+    frame.index.name = "日期"
+    return frame
+
+
+@pytest.fixture
+def valuation():
+    rng = np.random.default_rng(6)
+    dates = pd.bdate_range("2020-01-01", periods=400)
+    data = pd.DataFrame(15 + np.cumsum(rng.normal(0, 0.2, (400, 2)), axis=0),
+                        index=dates, columns=["000300.SH", "000905.SH"])
+    # 重复值检验并列时的分位数，缺失值应跳过
+    data.iloc[50:55, 0] = data.iloc[49, 0]
+    data.iloc[100:130, 0] = np.nan
+    data.iloc[::9, 1] = np.nan
+    return data
+
+
+@pytest.mark.parametrize("window", [None, 60])
+def test_tracker_matches_pandas(valuation, window):
+    for code in valuation.columns:
+        tracker = ValuationTracker(window)
+        tracker.update(valuation[code])
+        pd.testing.assert_frame_equal(tracker.frame(), reference_frame(valuation[code], window),
+                                      check_freq=False, rtol=1e-9)
+
+
+@pytest.mark.parametrize("window", [None, 60])
+def test_incremental_append_matches_full(valuation, window):
+    engine = PercentileEngine()
+    engine.get(valuation.iloc[:200], "pe_ttm", window)
+    engine.get(valuation.iloc[:300], "pe_ttm", window)
+    result = engine.get(valuation, "pe_ttm", window)
+    for code in valuation.columns:
+        pd.testing.assert_frame_equal(result[code], reference_frame(valuation[code], window),
+                                      check_freq=False, rtol=1e-9)
+
+
+def test_earlier_end_or_start_recomputes(valuation):
+    engine = PercentileEngine()
+    engine.get(valuation, "pb_lf")
+    # 结束日期提前
+    result = engine.get(valuation.iloc[:150], "pb_lf")
+    pd.testing.assert_frame_equal(result["000905.SH"], reference_frame(valuation["000905.SH"].iloc[:150]),
+                                  check_freq=False, rtol=1e-9)
+    # 起始日期变化
+    result = engine.get(valuation.iloc[30:], "pb_lf")
+    pd.testing.assert_frame_equal(result["000905.SH"], reference_frame(valuation["000905.SH"].iloc[30:]),
+                                  check_freq=False, rtol=1e-9)
+
+
+def test_single_value_has_nan_std():
+    tracker = ValuationTracker()
+    tracker.update(pd.Series([np.nan, 12.0], index=pd.bdate_range("2024-01-01", periods=2)))
+    frame = tracker.frame()
+    assert len(frame) == 1
+    assert frame["分位数"].iloc[0] == 100 and np.isnan(frame["标准差"].iloc[0])
+
+
+@pytest.mark.parametrize("window", [None, 60])
+def test_refreshed_last_day_is_reranked(valuation, window):
+    engine = PercentileEngine()
+    series = valuation["000300.SH"].copy()
+    engine.get(series.to_frame(), "pe_ttm", window)
+    # 当天估值在数据刷新后变化，最后一天的结果按新值重新计算
+    series.iloc[-1] = series.max() + 1
+    result = engine.get(series.to_frame(), "pe_ttm", window)["000300.SH"]
+    pd.testing.assert_frame_equal(result, reference_frame(series, window), check_freq=False, rtol=1e-9)
+    assert result["分位数"].iloc[-1] == 100
+    # 下一个交易日出现后，前一天按刷新后的值写入计算状态
+    series.loc[series.index[-1] + pd.offsets.BDay()] = series.iloc[-2]
+    result = engine.get(series.to_frame(), "pe_ttm", window)["000300.SH"]
+    pd.testing.assert_frame_equal(result, reference_frame(series, window), check_freq=False, rtol=1e-9)
@@ -0,0 +1,73 @@
+"""预取调度器：相同任务只执行一次，板块只等待自己的任务，加载出错不在预取中抛出"""
+import threading
+
+import pytest
+
+from core.prefetch import PrefetchScheduler
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = PrefetchScheduler(max_workers=2)
+    yield scheduler
+    scheduler.shutdown()
+
+
+def test_same_loader_and_args_run_once(scheduler):
+    calls = []
+    lock = threading.Lock()
+
+    def get_index_data(indexes, start_date):
+        with lock:
+            calls.append((tuple(indexes), start_date))
+
+    plan = {
+        'plot': [(get_index_data, (["000300.SH"], "2024-01-01"))],
+        'assets': [(get_index_data, (["000300.SH"], "2024-01-01")),
+                   (get_index_data, (["000905.SH"], "2024-01-01"))],
+    }
+    scheduler.submit_plan(plan)
+    # 参数相同但为新的列表对象时，按repr判断为同一任务
+    scheduler.submit('risk', get_index_data, ["000300.SH"], "2024-01-01")
+    for section in ['plot', 'assets', 'risk']:
+        scheduler.wait(section)
+    assert sorted(calls) == [(("000300.SH",), "2024-01-01"), (("000905.SH",), "2024-01-01")]
+
+
+def test_wait_only_blocks_on_own_section(scheduler):
+    release = threading.Event()
+    done = []
+
+    def slow_loader():
+        release.wait(5)
+        done.append('slow')
+
+    def fast_loader():
+        done.append('fast')
+
+    scheduler.submit('table', slow_loader)
+    scheduler.submit('information', fast_loader)
+    scheduler.wait('information')
+    assert done == ['fast']
+    # 没有预取任务的板块直接返回
+    scheduler.wait('drawdown')
+
+    release.set()
+    scheduler.wait('table')
+    assert done == ['fast', 'slow']
+
+
+def test_loader_errors_do_not_raise_in_wait(scheduler):
+    def get_risk_data(indexes):
+        raise ValueError("万德接口调用失败")
+
+    def get_return_data(indexes):
+        return indexes
+
+    scheduler.submit_plan({'risk': [(get_risk_data, (["000300.SH"],)), (get_return_data, (["000300.SH"],))]})
+    # 出错的任务不影响同一板块的其他任务，错误留给板块重新调用加载函数时报出
+    scheduler.wait('risk')
+    futures = scheduler._sections['risk']
+    assert all(future.done() for future in futures)
+    assert isinstance(futures[0].exception(), ValueError)
+    assert futures[1].result() == ["000300.SH"]
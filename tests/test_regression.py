@@ -0,0 +1,62 @@
+"""闭式两两回归与scipy.stats.linregress逐对拟合的对比"""
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from core.regression import ALL_GROUP, pairwise_ols
+
+COLUMNS = ['规模', '费率', '跟踪误差']
+
+
+def reference_row(data, x, y):
+    """用linregress拟合单个变量对，截距p值由截距标准误计算"""
+    fit = stats.linregress(data[x], data[y])
+    dof = len(data) - 2
+    t_intercept = fit.intercept / fit.intercept_stderr
+    return {
+        '样本数': len(data),
+        '截距': fit.intercept,
+        '斜率': fit.slope,
+        'R²': fit.rvalue ** 2,
+        't值': fit.slope / fit.stderr,
+        'p值': fit.pvalue,
+        '截距p值': 2 * stats.t.sf(abs(t_intercept), dof),
+    }
+
+
+@pytest.fixture
+def fund_data():
+    rng = np.random.default_rng(9)
+    n = 300
+    data = pd.DataFrame({'规模': rng.lognormal(2, 1, n), '基金类型': rng.choice(['ETF', '联接', '增强'], n)})
+    data['费率'] = 0.8 - 0.05 * np.log(data['规模']) + rng.normal(0, 0.1, n)
+    data['跟踪误差'] = 2 + 0.3 * data['费率'] + rng.normal(0, 0.5, n)
+    data.loc[data.sample(20, random_state=1).index, '费率'] = np.nan
+    return data
+
+
+def test_matches_linregress_by_group(fund_data):
+    result = pairwise_ols(fund_data, COLUMNS, '基金类型').set_index(['分组', '因变量', '自变量'])
+    clean = fund_data.dropna(subset=COLUMNS)
+    groups = [(ALL_GROUP, clean)] + list(clean.groupby('基金类型'))
+    assert len(result) == len(groups) * len(COLUMNS) * (len(COLUMNS) - 1)
+    for group, data in groups:
+        for x in COLUMNS:
+            for y in COLUMNS:
+                if x == y:
+                    continue
+                row = result.loc[(group, y, x)]
+                for name, value in reference_row(data, x, y).items():
+                    np.testing.assert_allclose(row[name], value, rtol=1e-7, atol=1e-12, err_msg=f"{group} {y}~{x} {name}")
+
+
+def test_small_samples():
+    data = pd.DataFrame({'x': [1.0, 2.0, 3.0, np.nan], 'y': [2.0, 4.1, np.nan, 5.0], 'g': ['a', 'a', 'b', 'b']})
+    result = pairwise_ols(data, ['x', 'y'], 'g').set_index(['分组', '因变量', '自变量'])
+    # 剔除缺失后只剩两个样本，自由度为0时p值为NaN
+    row = result.loc[(ALL_GROUP, 'y', 'x')]
+    assert row['样本数'] == 2
+    np.testing.assert_allclose(row['斜率'], 2.1)
+    assert np.isnan(row['p值']) and np.isnan(row['截距p值'])
+    assert result.index.get_level_values('分组').unique().tolist() == [ALL_GROUP, 'a']
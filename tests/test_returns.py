@@ -0,0 +1,70 @@
+"""收益率引擎与逐列直接计算的结果对比"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.returns import monthly_returns, range_return, window_close, yearly_returns
+
+
+@pytest.fixture
+def close():
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range("2020-11-02", "2024-05-31")
+    data = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.01, (len(dates), 3)), axis=0)),
+                        index=dates, columns=["A", "B", "C"])
+    # C在2021年中才有数据，B在2022年全年停牌
+    data.loc[:"2021-06-30", "C"] = np.nan
+    data.loc["2022-01-01":"2022-12-31", "B"] = np.nan
+    return data
+
+
+def reference_period_returns(series, freq):
+    """逐期计算：期末收盘价相对此前最后一个收盘价"""
+    series = series.dropna()
+    period_end = series.groupby(series.index.to_period(freq)).last()
+    return (period_end / period_end.shift(1) - 1) * 100
+
+
+def test_yearly_returns_match_reference(close):
+    result = yearly_returns(close)
+    for code in close.columns:
+        expected = reference_period_returns(close[code], "Y")
+        expected.index = expected.index.year
+        actual = result[code].dropna()
+        pd.testing.assert_series_equal(actual, expected.dropna().reindex(actual.index), check_names=False)
+    # 全年停牌的年度没有收益率
+    assert np.isnan(result.loc[2022, "B"])
+    # 2023年以停牌前最后一个收盘价为基期
+    expected_2023 = close.loc["2023", "B"].iloc[-1] / close.loc[:"2021", "B"].iloc[-1] * 100 - 100
+    assert result.loc[2023, "B"] == pytest.approx(expected_2023)
+
+
+def test_monthly_returns_match_reference(close):
+    result = monthly_returns(close)
+    expected = reference_period_returns(close["A"], "M").dropna()
+    pd.testing.assert_series_equal(result["A"].dropna(), expected, check_names=False)
+
+
+def test_range_return_uses_last_close_before_start(close):
+    result = range_return(close, "2023-03-01", "2023-09-30")
+    base = close.loc[:"2023-02-28"].iloc[-1]
+    last = close.loc[:"2023-09-30"].iloc[-1]
+    pd.testing.assert_series_equal(result, (last / base - 1) * 100)
+
+
+def test_range_return_starts_at_first_valid_close(close):
+    # 起始日之前没有数据时以区间内首个有效收盘价为基期
+    result = range_return(close, "2020-01-01", "2021-12-31")
+    expected = close.loc[:"2021-12-31", "C"].dropna()
+    assert result["C"] == pytest.approx((expected.iloc[-1] / expected.iloc[0] - 1) * 100)
+
+
+def test_window_close_keeps_base_row(close):
+    window = window_close(close, "2023-03-01", "2023-03-31")
+    assert window.index[0] == pd.Timestamp("2023-02-28")
+    assert window.index[1] == pd.Timestamp("2023-03-01")
+    assert window.index[-1] == pd.Timestamp("2023-03-31")
+
+
+def test_range_return_short_window_is_nan(close):
+    assert range_return(close, "2019-01-01", "2019-12-31").isna().all()
@@ -0,0 +1,112 @@
+"""区间收益风险指标与pandas逐列计算的结果对比"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.risk import TRADING_DAYS, beta, beta_matrix, risk_metrics
+
+START, END = "2022-03-01", "2023-12-29"
+
+
+@pytest.fixture
+def close():
+    rng = np.random.default_rng(1)
+    dates = pd.bdate_range("2022-01-03", "2024-03-29")
+    data = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.012, (len(dates), 3)), axis=0)),
+                        index=dates, columns=["A", "B", "C"])
+    # B中间停牌一个月，C在区间中途才上市
+    data.loc["2022-09-01":"2022-09-30", "B"] = np.nan
+    data.loc[:"2022-06-30", "C"] = np.nan
+    return data
+
+
+def reference_window(series):
+    """起始日前最后一个收盘价加区间内收盘价，缺失值向前填充，区间内才上市时从首个有效值开始"""
+    series = series.loc[:END].ffill()
+    window = pd.concat([series.loc[:START].iloc[:-1].tail(1), series.loc[START:]])
+    return window.dropna()
+
+
+@pytest.mark.parametrize("code", ["A", "B", "C"])
+def test_metrics_match_pandas(close, code):
+    table = risk_metrics(close, START, END)
+    prices = reference_window(close[code])
+    returns = prices.pct_change().dropna()
+    total = prices.iloc[-1] / prices.iloc[0] - 1
+    annual = (1 + total) ** (TRADING_DAYS / len(returns)) - 1
+    volatility = returns.std() * np.sqrt(TRADING_DAYS)
+    drawdown = prices / prices.cummax() - 1
+    run_up = prices / prices.cummin() - 1
+
+    row = table.loc[code]
+    assert row["区间涨跌幅"] == pytest.approx(total * 100)
+    assert row["区间年化波动率"] == pytest.approx(volatility * 100)
+    assert row["区间年化夏普比率"] == pytest.approx(annual / volatility)
+    assert row["最大回撤"] == pytest.approx(drawdown.min() * 100)
+    assert row["最大上涨"] == pytest.approx(run_up.max() * 100)
+    assert row["区间年化卡玛比率"] == pytest.approx(annual / -drawdown.min())
+
+    trough = drawdown.idxmin()
+    peak = prices.loc[:trough].idxmax()
+    assert row["最大回撤起止日期"] == f"{peak:%Y-%m-%d}至{trough:%Y-%m-%d}"
+
+    run_up_end = run_up.idxmax()
+    run_up_start = prices.loc[:run_up_end].idxmin()
+    assert row["最大上涨起止日期"] == f"{run_up_start:%Y-%m-%d}至{run_up_end:%Y-%m-%d}"
+
+
+def test_run_up_and_drawdown_dates_on_known_path():
+    # 基期100，先涨到120，跌到90，再涨到135，最后回落到108
+    dates = pd.bdate_range("2024-01-01", periods=8)
+    close = pd.DataFrame({"A": [100, 110, 120, 100, 90, 110, 135, 108]}, index=dates, dtype=float)
+    row = risk_metrics(close, "2024-01-02", "2024-01-10").loc["A"]
+    # 最大上涨从最低点90到随后的高点135
+    assert row["最大上涨"] == pytest.approx(50.0)
+    assert row["最大上涨起止日期"] == "2024-01-05至2024-01-09"
+    # 最大回撤从120到90，大于135到108的20%
+    assert row["最大回撤"] == pytest.approx(-25.0)
+    assert row["最大回撤起止日期"] == "2024-01-03至2024-01-05"
+
+
+def test_turnover_is_summed_within_range(close):
+    turnover = pd.DataFrame(1.0, index=close.index, columns=close.columns)
+    table = risk_metrics(close, START, END, turnover=turnover)
+    expected = len(close.loc[START:END])
+    assert (table["区间换手率"] == expected).all()
+
+
+def test_beta_matches_pairwise_regression(close):
+    benchmark = close["A"] * 0.5 + 50
+    result = beta(close, benchmark)
+    bench_returns = benchmark.pct_change()
+    for i, code in enumerate(close.columns):
+        pair = pd.concat([close[code].pct_change(fill_method=None), bench_returns], axis=1).dropna()
+        expected = pair.cov().iloc[0, 1] / pair.iloc[:, 1].var()
+        assert result[i] == pytest.approx(expected)
+
+
+def test_empty_and_short_windows():
+    dates = pd.bdate_range("2023-01-02", periods=10)
+    close = pd.DataFrame({"A": np.linspace(1, 2, 10), "B": np.nan}, index=dates)
+    with np.errstate(all="raise"):
+        table = risk_metrics(close, "2023-01-03", "2023-01-13")
+    assert np.isnan(table.loc["B", "区间年化波动率"])
+    assert table.loc["B", "最大回撤起止日期"] is None
+    # 单调上涨没有回撤
+    assert table.loc["A", "最大回撤"] == 0
+    assert table.loc["A", "最大回撤起止日期"] is None
+    # 最大上涨从起始日前的基期开始计算
+    assert table.loc["A", "最大上涨起止日期"] == "2023-01-02至2023-01-13"
+    assert table.loc["B", "最大上涨起止日期"] is None
+    assert risk_metrics(close, "2024-01-01", "2024-12-31")["区间涨跌幅"].isna().all()
+
+
+def test_beta_matrix_matches_pairwise_pandas(close):
+    # 每对证券只使用两者同时有收益率的交易日
+    result = beta_matrix(close)
+    returns = close.pct_change(fill_method=None)
+    for row in close.columns:
+        assert result.loc[row, row] == pytest.approx(1.0)
+        for col in close.columns.drop(row):
+            pair = returns[[row, col]].dropna()
+            assert result.loc[row, col] == pytest.approx(pair.cov().loc[row, col] / pair[col].var())
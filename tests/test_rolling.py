@@ -0,0 +1,53 @@
+"""滚动统计量与pandas rolling的结果对比"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.rolling import TRADING_DAYS, rolling_beta, rolling_correlation, rolling_volatility
+
+
+@pytest.fixture
+def returns():
+    rng = np.random.default_rng(2)
+    dates = pd.bdate_range("2023-01-02", periods=300)
+    data = pd.DataFrame(rng.normal(0.0005, 0.01, (300, 3)), index=dates, columns=["A", "B", "C"])
+    data["B"] += data["A"] * 0.8
+    # 分散的缺失值和一段连续缺失
+    data.iloc[::17, 1] = np.nan
+    data.iloc[100:140, 2] = np.nan
+    return data
+
+
+@pytest.mark.parametrize("window, min_periods", [(20, None), (60, 40), (250, 200)])
+def test_rolling_volatility_matches_pandas(returns, window, min_periods):
+    result = rolling_volatility(returns, window, min_periods)
+    expected = returns.rolling(window, min_periods=min_periods or window).std() * np.sqrt(TRADING_DAYS) * 100
+    pd.testing.assert_frame_equal(result, expected, rtol=1e-8)
+
+
+@pytest.mark.parametrize("window, min_periods", [(20, None), (60, 40)])
+def test_rolling_beta_matches_pandas(returns, window, min_periods):
+    benchmark = returns["A"].copy()
+    benchmark.iloc[5::23] = np.nan
+    result = rolling_beta(returns, benchmark, window, min_periods)
+    for code in returns.columns:
+        # Beta只使用证券与基准同时有收益率的交易日
+        x = returns[code].where(benchmark.notna())
+        b = benchmark.where(returns[code].notna())
+        rolling = x.rolling(window, min_periods=min_periods or window)
+        expected = rolling.cov(b) / b.rolling(window, min_periods=min_periods or window).var()
+        pd.testing.assert_series_equal(result[code], expected, check_names=False, rtol=1e-8)
+
+
+def test_rolling_correlation_matches_pandas(returns):
+    result = rolling_correlation(returns, 60, 40)
+    assert list(result.columns) == [("A", "B"), ("A", "C"), ("B", "C")]
+    for a, b in result.columns:
+        expected = returns[a].rolling(60, min_periods=40).corr(returns[b])
+        pd.testing.assert_series_equal(result[(a, b)], expected, check_names=False, rtol=1e-8, atol=1e-10)
+
+
+def test_short_series_and_single_column():
+    returns = pd.DataFrame({"A": [0.01, -0.02, 0.03]}, index=pd.bdate_range("2024-01-01", periods=3))
+    assert rolling_volatility(returns, 20).isna().all().all()
+    assert rolling_correlation(returns, 20).columns.empty
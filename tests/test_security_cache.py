@@ -0,0 +1,76 @@
+"""个股字段缓存：只请求缺失的单元格，历史交易日写入磁盘"""
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from core.security_cache import SecurityAttributeCache
+
+FIELDS = ["总市值", "申万一级行业"]
+
+
+def make_fetch(calls):
+    def fetch(codes):
+        calls.append(list(codes))
+        return pd.DataFrame({"总市值": [float(i) for i in range(len(codes))],
+                             "申万一级行业": ["银行"] * len(codes)}, index=codes)
+    return fetch
+
+
+def test_only_missing_codes_are_fetched(tmp_path):
+    calls = []
+    cache = SecurityAttributeCache(str(tmp_path))
+    first = cache.get(["A", "B"], FIELDS, "2024-06-28", make_fetch(calls))
+    second = cache.get(["B", "C"], FIELDS, "2024-06-28", make_fetch(calls))
+    assert calls == [["A", "B"], ["C"]]
+    assert list(first.index) == ["A", "B"]
+    assert second.loc["B", "总市值"] == first.loc["B", "总市值"]
+    assert list(second.columns) == FIELDS
+
+
+def test_historical_dates_persist_and_empty_values_are_cached(tmp_path):
+    def fetch(codes):
+        return pd.DataFrame({"总市值": [np.nan] * len(codes), "申万一级行业": [None] * len(codes)}, index=codes)
+
+    SecurityAttributeCache(str(tmp_path)).get(["A"], FIELDS, "2024-06-28", fetch)
+    calls = []
+    data = SecurityAttributeCache(str(tmp_path)).get(["A"], FIELDS, "2024-06-28", make_fetch(calls))
+    assert calls == []
+    assert data.isna().all().all()
+
+
+def test_failed_fetch_returns_empty_cells(tmp_path):
+    cache = SecurityAttributeCache(str(tmp_path))
+    data = cache.get(["A"], FIELDS, "2024-06-28", lambda codes: None)
+    assert list(data.index) == ["A"]
+    assert data.isna().all().all()
+
+
+def test_fetch_runs_outside_lock_and_concurrent_requests_share_it(tmp_path):
+    cache = SecurityAttributeCache(str(tmp_path))
+    cache.get(["A"], FIELDS, "2024-06-28", make_fetch([]))
+    calls = []
+    started, release = threading.Event(), threading.Event()
+
+    def slow_fetch(codes):
+        started.set()
+        release.wait(5)
+        return make_fetch(calls)(codes)
+
+    results = {}
+    workers = [threading.Thread(target=lambda i=i: results.__setitem__(
+        i, cache.get(["B", "C"], FIELDS, "2024-06-28", slow_fetch))) for i in range(2)]
+    workers[0].start()
+    assert started.wait(5)
+    workers[1].start()
+    # 请求进行中时，已缓存的股票无需等待
+    hit = cache.get(["A"], FIELDS, "2024-06-28", make_fetch(calls))
+    assert hit.loc["A", "总市值"] == 0.0
+    time.sleep(0.1)
+    release.set()
+    for worker in workers:
+        worker.join(5)
+
+    assert calls == [["B", "C"]]
+    pd.testing.assert_frame_equal(results[0], results[1])
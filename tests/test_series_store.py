@@ -0,0 +1,122 @@
+"""日频序列存储：缺口补齐、当天数据的有效时长、缺失代码和并发请求"""
+import datetime
+import json
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core import series_store
+from core.series_store import INTRADAY_TTL, SeriesStore
+
+
+def make_fetch(calls, missing=(), last_valid=None):
+    """按工作日生成各代码的数据，missing中的代码不返回，last_valid之后的日期为空值"""
+    def fetch(codes, field, start_date, end_date):
+        calls.append((list(codes), start_date, end_date))
+        dates = pd.bdate_range(start_date, end_date)
+        data = pd.DataFrame({code: np.arange(len(dates), dtype=float) + i for i, code in enumerate(codes)
+                             if code not in missing}, index=dates)
+        if last_valid is not None:
+            data.loc[data.index > pd.Timestamp(last_valid)] = np.nan
+        return data
+    return fetch
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """可手动推进的time.monotonic"""
+    now = [1000.0]
+    monkeypatch.setattr(series_store.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_gaps_are_bridged_around_coverage(tmp_path):
+    calls = []
+    store = SeriesStore(str(tmp_path))
+    store.get(["A", "B"], "close", "2024-01-01", "2024-01-31", make_fetch(calls))
+    data = store.get(["A", "B"], "close", "2023-12-01", "2024-02-29", make_fetch(calls))
+    assert calls == [(["A", "B"], "2024-01-01", "2024-01-31"),
+                     (["A", "B"], "2023-12-01", "2023-12-31"),
+                     (["A", "B"], "2024-02-01", "2024-02-29")]
+    assert data.index[0] == pd.Timestamp("2023-12-01") and data.index[-1] == pd.Timestamp("2024-02-29")
+    assert data.index.is_unique and data.notna().all().all()
+
+    # 已覆盖区间内的请求和新实例都直接读取本地存储
+    store.get(["A"], "close", "2023-12-15", "2024-02-15", make_fetch(calls))
+    reloaded = SeriesStore(str(tmp_path)).get(["A", "B"], "close", "2023-12-01", "2024-02-29", make_fetch(calls))
+    assert len(calls) == 3
+    pd.testing.assert_frame_equal(reloaded, data, check_freq=False)
+
+
+def test_today_is_refetched_after_intraday_ttl(tmp_path, clock):
+    calls = []
+    store = SeriesStore(str(tmp_path))
+    today = datetime.date.today()
+    start = (today - datetime.timedelta(days=20)).isoformat()
+    store.get(["A"], "close", start, today.isoformat(), make_fetch(calls))
+
+    # 当天数据不计入覆盖区间
+    with open(tmp_path / "wsd" / "close" / "_coverage.json", encoding="utf-8") as f:
+        assert json.load(f)["A"][1] <= (today - datetime.timedelta(days=1)).isoformat()
+
+    store.get(["A"], "close", start, today.isoformat(), make_fetch(calls))
+    assert len(calls) == 1
+    clock[0] += INTRADAY_TTL + 1
+    store.get(["A"], "close", start, today.isoformat(), make_fetch(calls))
+    assert len(calls) == 2 and calls[1][2] == today.isoformat()
+
+
+def test_missing_code_is_not_covered(tmp_path, clock):
+    calls = []
+    store = SeriesStore(str(tmp_path))
+    store.get(["A", "B"], "close", "2024-01-01", "2024-01-31", make_fetch(calls, missing={"B"}))
+    with open(tmp_path / "wsd" / "close" / "_coverage.json", encoding="utf-8") as f:
+        assert list(json.load(f)) == ["A"]
+
+    clock[0] += INTRADAY_TTL + 1
+    data = store.get(["A", "B"], "close", "2024-01-01", "2024-01-31", make_fetch(calls))
+    assert calls[-1] == (["B"], "2024-01-01", "2024-01-31")
+    assert data["B"].notna().all()
+
+
+def test_unpublished_tail_is_requested_again(tmp_path, clock):
+    calls = []
+    store = SeriesStore(str(tmp_path))
+    store.get(["A"], "unit_total", "2024-01-01", "2024-01-31", make_fetch(calls, last_valid="2024-01-24"))
+    # 末尾尚未公布的日期在有效时长内不重复请求，之后只请求最后一个有数据的交易日之后的部分
+    store.get(["A"], "unit_total", "2024-01-01", "2024-01-31", make_fetch(calls))
+    assert len(calls) == 1
+    clock[0] += INTRADAY_TTL + 1
+    data = store.get(["A"], "unit_total", "2024-01-01", "2024-01-31", make_fetch(calls))
+    assert calls[-1] == (["A"], "2024-01-25", "2024-01-31")
+    assert data["A"].notna().all()
+
+
+def test_concurrent_requests_fetch_once(tmp_path):
+    calls = []
+    started, release = threading.Event(), threading.Event()
+    fetch = make_fetch(calls)
+
+    def slow_fetch(*args):
+        started.set()
+        release.wait(5)
+        return fetch(*args)
+
+    store = SeriesStore(str(tmp_path))
+    results = {}
+    workers = [threading.Thread(target=lambda i=i: results.__setitem__(
+        i, store.get(["A"], "close", "2024-01-01", "2024-01-31", slow_fetch))) for i in range(2)]
+    workers[0].start()
+    assert started.wait(5)
+    workers[1].start()
+    # 第二个线程发现该序列正在请求，等待第一个线程完成后直接读取
+    time.sleep(0.1)
+    release.set()
+    for worker in workers:
+        worker.join(5)
+
+    assert len(calls) == 1
+    pd.testing.assert_frame_equal(results[0], results[1])
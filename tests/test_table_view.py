@@ -0,0 +1,96 @@
+"""表格分页视图与pandas Styler、排序筛选的对比"""
+import numpy as np
+import pandas as pd
+import pytest
+from matplotlib import colormaps
+from matplotlib.colors import to_rgb
+
+from core.table_view import (gradient_bins, gradient_palette, page_count, page_styles,
+                             query_rows)
+
+COLUMNS = ['权重', '市值']
+
+
+@pytest.fixture
+def table():
+    rng = np.random.default_rng(14)
+    data = pd.DataFrame({
+        '名称': [f"股票{i}" for i in range(120)],
+        '行业': pd.Categorical(rng.choice(['银行', '电子', '医药'], 120)),
+        '权重': rng.lognormal(0, 1, 120),
+        '市值': rng.integers(1, 20, 120).astype(float),
+    }, index=[f"{i:06d}.SZ" for i in range(120)])
+    data.iloc[::11, 2] = np.nan
+    return data
+
+
+def parse_styles(styles):
+    """从CSS中取出背景色和文字颜色"""
+    props = dict(item.split(":", 1) for item in styles.strip(";").split(";"))
+    return to_rgb(props["background-color"].strip()), props["color"].strip()
+
+
+def test_bins_match_background_gradient(table):
+    bins_count = 256
+    bins = gradient_bins(table, COLUMNS, bins_count)
+    palette = gradient_palette("Oranges", bins_count)
+    styles = page_styles(bins, np.arange(len(table)), palette)
+    ctx = table[COLUMNS].style.background_gradient(cmap="Oranges")._compute().ctx
+
+    # 分箱编号取四舍五入，Styler取颜色表时向下取整，两者最多相差一个颜色表步长
+    lut = colormaps["Oranges"](np.linspace(0, 1, 256))[:, :3]
+    step = np.abs(np.diff(lut, axis=0)).max() + 1 / 255
+    for row in range(len(table)):
+        for col, name in enumerate(COLUMNS):
+            if np.isnan(table[name].iloc[row]):
+                assert bins[name].iloc[row] == -1 and styles[name].iloc[row] == ""
+                continue
+            expected = dict(ctx[(row, col)])
+            background, text_color = parse_styles(styles[name].iloc[row])
+            assert np.abs(np.subtract(background, to_rgb(expected["background-color"]))).max() <= step
+            if background == to_rgb(expected["background-color"]):
+                assert text_color == expected["color"]
+
+
+def test_bins_linear_in_column_range(table):
+    bins = gradient_bins(table, COLUMNS)
+    for name in COLUMNS:
+        values = table[name]
+        scaled = (values - values.min()) / (values.max() - values.min())
+        expected = np.round(scaled * 31).fillna(-1).astype(np.int8)
+        pd.testing.assert_series_equal(bins[name], expected)
+    # 常数列和空表格
+    constant = gradient_bins(pd.DataFrame({'x': [3.0, 3.0]}), ['x'])
+    assert constant['x'].tolist() == [0, 0]
+    assert gradient_bins(table.iloc[:0], COLUMNS).empty
+
+
+@pytest.mark.parametrize("keyword, sort_by, ascending", [
+    ("", None, True), ("银行", '权重', False), ("股票1", '市值', True), ("000003", '权重', True), ("不存在", '市值', True),
+])
+def test_query_rows_matches_pandas(table, keyword, sort_by, ascending):
+    positions = query_rows(table, keyword, sort_by, ascending)
+    expected = table.assign(_pos=np.arange(len(table)))
+    if keyword:
+        mask = expected.index.str.contains(keyword) | expected['名称'].str.contains(keyword) \
+            | expected['行业'].astype(str).str.contains(keyword)
+        expected = expected[mask]
+    if sort_by:
+        expected = expected.sort_values(sort_by, ascending=ascending, kind="stable", na_position="last")
+    np.testing.assert_array_equal(positions, expected['_pos'].to_numpy())
+
+
+def test_page_count():
+    assert page_count(0) == 1
+    assert page_count(50) == 1
+    assert page_count(51) == 2
+    assert page_count(7, page_size=3) == 3
+
+
+def test_page_styles_shape(table):
+    bins = gradient_bins(table, COLUMNS)
+    positions = query_rows(table, sort_by='权重')[10:20]
+    styles = page_styles(bins, positions, gradient_palette())
+    assert styles.shape == (10, 2)
+    assert styles.index.tolist() == table.index[positions].tolist()
+    assert (styles != "").all().all()
@@ -0,0 +1,64 @@
+"""录制/回放后端：录制后回放返回相同的结果，缺少回放文件时报错"""
+import pandas as pd
+import pytest
+
+from core.wind_backend import LiveBackend, RecordingBackend, ReplayBackend
+
+
+class StubSession:
+    """模拟万德会话，按请求参数生成DataFrame并记录调用次数"""
+
+    def __init__(self):
+        self.calls = []
+
+    def wss(self, codes, fields, *options, usedf=True):
+        self.calls.append(("wss", codes, fields, options))
+        return 0, pd.DataFrame({fields.upper(): [float(len(code)) for code in codes]}, index=codes)
+
+    def wsd(self, codes, fields, start_date, end_date, *options, usedf=True):
+        self.calls.append(("wsd", codes, fields, start_date, end_date))
+        dates = pd.bdate_range(start_date, end_date)
+        return 0, pd.DataFrame({code: range(len(dates)) for code in codes}, index=dates, dtype=float)
+
+    def wset(self, table_name, *options, usedf=True):
+        self.calls.append(("wset", table_name, options))
+        return -40520007, pd.DataFrame()
+
+    def metrics(self):
+        return {"connected": True, "uptime_seconds": 1.0, "last_connect_seconds": 0.5,
+                "total_connect_seconds": 0.5, "connect_count": 1, "call_count": len(self.calls)}
+
+
+def test_record_then_replay_round_trip(tmp_path):
+    session = StubSession()
+    recorder = RecordingBackend(LiveBackend(session), str(tmp_path))
+    recorded = [
+        recorder.wss(["000300.SH", "H30184.CSI"], "sec_name", "tradeDate=2024-06-28", usedf=True),
+        recorder.wsd(["000300.SH"], "close", "2024-06-03", "2024-06-28", usedf=True),
+        recorder.wset("indexconstituent", "windcode=000300.SH;", usedf=True),
+    ]
+    assert len(session.calls) == 3
+    assert recorder.metrics()["backend"] == "record"
+
+    replay = ReplayBackend(str(tmp_path))
+    replayed = [
+        replay.wss(["000300.SH", "H30184.CSI"], "sec_name", "tradeDate=2024-06-28", usedf=True),
+        # 代码以元组传入时与列表视为同一请求
+        replay.wsd(("000300.SH",), "close", "2024-06-03", "2024-06-28", usedf=True),
+        replay.wset("indexconstituent", "windcode=000300.SH;", usedf=True),
+    ]
+    for (recorded_code, recorded_df), (replayed_code, replayed_df) in zip(recorded, replayed):
+        assert replayed_code == recorded_code
+        pd.testing.assert_frame_equal(replayed_df, recorded_df)
+    assert len(session.calls) == 3
+    assert replay.metrics()["call_count"] == 3
+
+
+def test_replay_missing_fixture_raises(tmp_path):
+    RecordingBackend(LiveBackend(StubSession()), str(tmp_path)).wsd(["000300.SH"], "close", "2024-06-03", "2024-06-28")
+    replay = ReplayBackend(str(tmp_path))
+    with pytest.raises(LookupError):
+        replay.wsd(["000300.SH"], "close", "2024-06-03", "2024-06-27")
+    with pytest.raises(LookupError):
+        replay.wsd(["000300.SH"], "pe_ttm", "2024-06-03", "2024-06-28")
+    assert replay.metrics()["call_count"] == 0
@@ -0,0 +1,111 @@
+"""万德会话管理：首次请求时连接、定期检查连接状态、断线后重连并重试"""
+from types import SimpleNamespace
+from urllib.error import URLError
+
+import pytest
+
+from core.wind_session import WindSession
+
+
+class StubClient:
+    """模拟WindPy客户端，disconnect()之后isconnected()为False，失败的start不会连上"""
+
+    def __init__(self, start_error=0):
+        self.start_error = start_error
+        self.connected = False
+        self.starts = 0
+        self.calls = []
+        # 下一次wss调用前断开连接，模拟请求过程中掉线
+        self.drop_on_next_call = False
+
+    def start(self, waitTime):
+        self.starts += 1
+        self.connected = self.start_error == 0
+        return SimpleNamespace(ErrorCode=self.start_error)
+
+    def isconnected(self):
+        return self.connected
+
+    def stop(self):
+        self.connected = False
+
+    def disconnect(self):
+        self.connected = False
+
+    def wss(self, codes, fields, usedf=True):
+        if self.drop_on_next_call:
+            self.drop_on_next_call = False
+            self.connected = False
+        self.calls.append((codes, fields))
+        return (0 if self.connected else -40520010), f"{codes}:{fields}"
+
+
+def make_session(client, health_check_interval=30):
+    session = WindSession(wait_time=1, health_check_interval=health_check_interval)
+    session._client = client
+    return session
+
+
+def test_connects_once_on_first_call():
+    client = StubClient()
+    session = make_session(client)
+    assert not session.metrics()["connected"] and client.starts == 0
+
+    assert session.wss("000300.SH", "close") == (0, "000300.SH:close")
+    session.wss("000905.SH", "close")
+    metrics = session.metrics()
+    assert client.starts == 1
+    assert metrics["connected"] and metrics["connect_count"] == 1 and metrics["call_count"] == 2
+
+
+def test_health_check_reconnects_after_interval(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("core.wind_session.time.monotonic", lambda: now[0])
+    client = StubClient()
+    session = make_session(client, health_check_interval=30)
+    session.ensure_connected()
+
+    # 检查间隔内不检查连接状态
+    client.disconnect()
+    now[0] += 10
+    session.ensure_connected()
+    assert client.starts == 1
+
+    now[0] += 30
+    session.ensure_connected()
+    assert client.starts == 2 and client.connected
+    # 强制检查时忽略间隔
+    client.disconnect()
+    session.ensure_connected(force_check=True)
+    assert client.starts == 3
+
+
+def test_failed_call_on_dropped_connection_is_retried():
+    client = StubClient()
+    session = make_session(client)
+    session.ensure_connected()
+    client.drop_on_next_call = True
+
+    assert session.wss("000300.SH", "close") == (0, "000300.SH:close")
+    assert client.starts == 2
+    assert len(client.calls) == 2 and session.metrics()["call_count"] == 2
+
+
+def test_connect_failure_raises_url_error():
+    client = StubClient(start_error=-40520007)
+    session = make_session(client)
+    with pytest.raises(URLError):
+        session.wss("000300.SH", "close")
+    metrics = session.metrics()
+    assert not metrics["connected"] and metrics["connect_count"] == 1
+    assert client.calls == []
+
+
+def test_stop_disconnects_and_next_call_reconnects():
+    client = StubClient()
+    session = make_session(client)
+    session.wss("000300.SH", "close")
+    session.stop()
+    assert not session.metrics()["connected"] and not client.connected
+    session.wss("000300.SH", "close")
+    assert client.starts == 2